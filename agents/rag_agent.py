@@ -1,20 +1,74 @@
-from typing import Annotated, Literal, TypedDict
-from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, SystemMessage
+import os
+import time
+import uuid
+from typing import Annotated, List, Literal, Optional, TypedDict
+from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, SystemMessage, ToolMessage
 from langgraph.graph import StateGraph, END
 from langgraph.graph.message import add_messages
-from langchain_openai import ChatOpenAI
 from langchain_core.tools import tool
-from tools.weather import get_weather
-from tools.advanced_retriever import advanced_retrieve
+from integrations.llm import get_chat_model
+from integrations.upstream import (
+    REQUEST_TIMEOUT, DeadlineExceeded, call_upstream, current_deadline, deadline_after, deadline_scope, remaining
+)
+from tools.weather import fetch_weather
+from tools.advanced_retriever import prefetch, read_chunks, retrieve_results, warm_up as warm_up_retriever
+from tools.tool_results import compact_history, tool_content
 from tools.prompts import AGENT_SYSTEM_PROMPT
+from agents.router import route_message, warm_up as warm_up_router
+
+AGENT_MODEL = "gpt-4.1-mini"
+
+# Seconds of a turn's budget kept for the final answer. Tools must finish
+# before it, and with less time left the chatbot answers without tools.
+ANSWER_RESERVE = float(os.getenv("RAG_ANSWER_RESERVE", "2.0"))
+# Largest share of a turn's budget the answer reserve may take, so a short
+# budget (RAG_REQUEST_TIMEOUT <= RAG_ANSWER_RESERVE) still leaves time for tools
+ANSWER_RESERVE_MAX_SHARE = 0.5
+
+# Reply when the deadline passes before the LLM answers
+DEADLINE_MESSAGE = "Sorry, I couldn't finish answering in time. Please try again."
 
 class AgentState(TypedDict):
     messages: Annotated[list[BaseMessage], add_messages]
+    deadline: Optional[float]  # time.monotonic() deadline of the current turn, if any
+    answer_reserve: Optional[float]  # Seconds of the turn's budget kept for the final answer
 
-def build_rag_agent():
+def _env_flag(name: str) -> bool:
+    return os.getenv(name, "false").lower() in ("1", "true", "yes")
+
+def build_rag_agent(
+    speculative_retrieval: Optional[bool] = None,
+    fast_path: Optional[bool] = None,
+    request_timeout: Optional[float] = None,
+    tenant: Optional[str] = None,
+):
     """
     Builds the RAG agent graph.
+
+    Args:
+        speculative_retrieval: Start a knowledge-base search on each new user
+            message in parallel with the first LLM call, so retriever_tool can
+            reuse it. Defaults to the RAG_SPECULATIVE_RETRIEVAL env var.
+        fast_path: Route obvious weather and knowledge-base questions straight
+            to their tool (see agents/router.py), skipping the first LLM call.
+            Defaults to the RAG_FAST_PATH env var.
+        request_timeout: Per-turn budget in seconds, applied to every LLM,
+            embedding, Qdrant and weather call of the turn. Near the end the
+            retriever returns its best context so far and the chatbot stops
+            calling tools. A caller can instead pass an absolute
+            time.monotonic() "deadline" in the input state. Defaults to the
+            RAG_REQUEST_TIMEOUT env var (unset: no deadline).
+        tenant: Tenant whose collections retriever_tool searches and reads
+            (see get_collections_for in integrations/qdrant_client.py).
+            Defaults to the QDRANT_COLLECTIONS / QDRANT_COLLECTION corpus.
     """
+    if speculative_retrieval is None:
+        speculative_retrieval = _env_flag("RAG_SPECULATIVE_RETRIEVAL")
+    if fast_path is None:
+        fast_path = _env_flag("RAG_FAST_PATH")
+    if request_timeout is None:
+        request_timeout = REQUEST_TIMEOUT
+
     # Define tools
     @tool
     def weather_tool(city: str):
@@ -23,36 +77,106 @@ def build_rag_agent():
                 city: Name of the city to get the weather for.
         
         """
-        return get_weather(city)
+        return call_upstream("weather", fetch_weather, city)
 
     @tool
-    def retriever_tool(query: str):
+    def retriever_tool(query: str, file_name: Optional[str] = None, page: Optional[int] = None,
+                       chunk_ids: Optional[List[str]] = None):
         """Retrieve information from documents with automatic relevance grading and query rewriting.
             Arg:
                 query: The user's query to search for. 
-                
+                file_name: Optional PDF file name (e.g. "report.pdf") to restrict the search to one document.
+                page: Optional 1-based page number to restrict the search to; use together with file_name.
+                chunk_ids: Optional chunk "id"s from earlier retriever_tool results to read those chunks
+                    again in full instead of searching (results from earlier turns only keep their citations).
                 
         Always use this tool for document retrieval from the knowledge base.
+        Only set file_name or page when the user clearly asks about a specific document or page.
         Try to provide relevant query string based on user question rebuilding from the context and previous interactions.
         
         Example:
             if user asks: "Who is Akash and what is his role?"
             call retriever_tool with query: "Who is Akash? What is his role? What are his responsibilities? Information about Akash."
         """
-        return advanced_retrieve(query)
+        if chunk_ids:
+            return read_chunks(query, chunk_ids, tenant=tenant)
+        filters = {"file_name": file_name, "page": page - 1 if page else None}
+        return retrieve_results(query, filters=filters, tenant=tenant)
 
     tools = [weather_tool, retriever_tool]
     
-    # Initialize LLM with tools
-    llm = ChatOpenAI(model="gpt-4.1-mini", temperature=0, max_completion_tokens=2000)
-    llm_with_tools = llm.bind_tools(tools)
+    # LLM with tools is created on the first chatbot call
+    llm_with_tools = None
+    llm_answer_only = None
+
+    def get_llm_with_tools():
+        nonlocal llm_with_tools
+        if llm_with_tools is None:
+            llm = get_chat_model(AGENT_MODEL, temperature=0, max_completion_tokens=2000)
+            llm_with_tools = llm.bind_tools(tools)
+        return llm_with_tools
+
+    def get_llm_answer_only():
+        # Same tools in the schema (the history may contain tool calls), but none may be called
+        nonlocal llm_answer_only
+        if llm_answer_only is None:
+            llm = get_chat_model(AGENT_MODEL, temperature=0, max_completion_tokens=2000)
+            llm_answer_only = llm.bind_tools(tools, tool_choice="none")
+        return llm_answer_only
+
+    def turn_deadline(state: AgentState) -> Optional[float]:
+        # Set by the first node of a turn and carried in the state afterwards
+        return state.get("deadline") or current_deadline() or deadline_after(request_timeout)
+
+    def turn_reserve(state: AgentState, deadline: Optional[float]) -> float:
+        # Clamped to a share of the budget left when the turn starts, then carried in the state
+        if state.get("answer_reserve") is not None:
+            return state["answer_reserve"]
+        if deadline is None:
+            return ANSWER_RESERVE
+        return min(ANSWER_RESERVE, ANSWER_RESERVE_MAX_SHARE * max(0.0, deadline - time.monotonic()))
 
     # Define nodes
+    def compacted(messages: List[BaseMessage]) -> List[ToolMessage]:
+        # At the start of a turn, earlier retrieval results drop their chunk text
+        return compact_history(messages) if isinstance(messages[-1], HumanMessage) else []
+
+    def router(state: AgentState):
+        # Dispatch obvious intents without asking the LLM which tool to call
+        last_message = state["messages"][-1]
+        deadline = turn_deadline(state)
+        budget = {"deadline": deadline, "answer_reserve": turn_reserve(state, deadline)}
+        if not isinstance(last_message, HumanMessage):
+            return budget
+        history = compacted(state["messages"])
+        with deadline_scope(deadline):
+            tool_call = route_message(str(last_message.content))
+        if tool_call is None:
+            return {"messages": history, **budget}
+        tool_call["id"] = f"call_fastpath_{uuid.uuid4().hex[:16]}"
+        return {"messages": history + [AIMessage(content="", tool_calls=[tool_call])], **budget}
+
     def chatbot(state: AgentState):
         messages = state["messages"]
+        deadline = turn_deadline(state)
+        reserve = turn_reserve(state, deadline)
+        if speculative_retrieval and isinstance(messages[-1], HumanMessage):
+            prefetch(str(messages[-1].content))
+        history = compacted(messages)
+        if history:
+            replaced = {message.id: message for message in history}
+            messages = [replaced.get(message.id, message) for message in messages]
     
         messages = [SystemMessage(content=AGENT_SYSTEM_PROMPT)] + messages
-        return {"messages": [llm_with_tools.invoke(messages)]}
+        with deadline_scope(deadline):
+            left = remaining()
+            # Without time for another tool round, answer from what we have
+            llm = get_llm_answer_only() if left is not None and left < reserve else get_llm_with_tools()
+            try:
+                response = call_upstream("llm:chatbot", llm.invoke, messages)
+            except DeadlineExceeded:
+                response = AIMessage(content=DEADLINE_MESSAGE)
+        return {"messages": history + [response], "deadline": deadline, "answer_reserve": reserve}
 
     def tools_node(state: AgentState):
         # Simple tool execution node (in a real app, use ToolNode from langgraph.prebuilt)
@@ -60,38 +184,59 @@ def build_rag_agent():
         if not isinstance(last_message, AIMessage) or not last_message.tool_calls:
             return {}
         
+        # Tools must finish in time for the chatbot to phrase the answer
+        deadline = state.get("deadline") or current_deadline()
+        reserve = state.get("answer_reserve")
+        if reserve is None:
+            reserve = ANSWER_RESERVE
+        tool_deadline = deadline - reserve if deadline is not None else None
+
         results = []
-        for tool_call in last_message.tool_calls:
-            if tool_call["name"] == "weather_tool":
-                res = weather_tool.invoke(tool_call["args"])
-                results.append(res)
-            elif tool_call["name"] == "retriever_tool":
-                res = retriever_tool.invoke(tool_call["args"])
-                results.append(res)
+        with deadline_scope(tool_deadline):
+            for tool_call in last_message.tool_calls:
+                try:
+                    if tool_call["name"] == "weather_tool":
+                        res = weather_tool.invoke(tool_call["args"])
+                        results.append(res)
+                    elif tool_call["name"] == "retriever_tool":
+                        res = retriever_tool.invoke(tool_call["args"])
+                        results.append(res)
+                except DeadlineExceeded:
+                    results.append({"error": f"{tool_call['name']} did not finish in time."})
         
-        # For simplicity in Phase 1, we just append the result as a message
-        # In a full implementation, we'd create ToolMessages
-        from langchain_core.messages import ToolMessage
+        # Typed results are sent as compact JSON (see tools/tool_results.py)
         tool_messages = []
         for tool_call, res in zip(last_message.tool_calls, results):
-             tool_messages.append(ToolMessage(tool_call_id=tool_call["id"], content=str(res)))
+             tool_messages.append(ToolMessage(tool_call_id=tool_call["id"], name=tool_call["name"], content=tool_content(res)))
         
         return {"messages": tool_messages}
 
-    # Define conditional edge
+    # Define conditional edges
     def route_tools(state: AgentState) -> Literal["tools", "__end__"]:
         last_message = state["messages"][-1]
         if isinstance(last_message, AIMessage) and last_message.tool_calls:
             return "tools"
         return "__end__"
 
+    def route_fast_path(state: AgentState) -> Literal["tools", "chatbot"]:
+        last_message = state["messages"][-1]
+        if isinstance(last_message, AIMessage) and last_message.tool_calls:
+            return "tools"
+        return "chatbot"
+
     # Build graph
     graph_builder = StateGraph(AgentState)
     graph_builder.add_node("chatbot", chatbot)
     graph_builder.add_node("tools", tools_node)
 
     graph_builder.add_edge("tools", "chatbot") # Loop back to chatbot after tools
-    graph_builder.set_entry_point("chatbot")
+
+    if fast_path:
+        graph_builder.add_node("router", router)
+        graph_builder.set_entry_point("router")
+        graph_builder.add_conditional_edges("router", route_fast_path)
+    else:
+        graph_builder.set_entry_point("chatbot")
     
     graph_builder.add_conditional_edges(
         "chatbot",
@@ -99,3 +244,15 @@ def build_rag_agent():
     )
 
     return graph_builder.compile()
+
+
+def warm_up(fast_path: Optional[bool] = None):
+    """
+    Creates the LLM, embedding and vector-store clients ahead of the first request,
+    and with fast_path (default: the RAG_FAST_PATH env var) the router's classifier.
+    Intended for servers and autoscaled workers; the CLI skips it and initializes lazily.
+    """
+    get_chat_model(AGENT_MODEL, temperature=0, max_completion_tokens=2000)
+    warm_up_retriever()
+    if _env_flag("RAG_FAST_PATH") if fast_path is None else fast_path:
+        warm_up_router()
@@ -0,0 +1,168 @@
+"""
+Deterministic pre-routing for obvious intents.
+
+Two cheap classifiers run before the first LLM call:
+1. Rules that extract a location from clear current-weather questions.
+2. A nearest-neighbour classifier over embedded example utterances that flags
+   clear knowledge-base lookups.
+When either fires, the agent dispatches the tool directly and only uses the
+LLM to phrase the final answer. Anything ambiguous returns None and goes to
+the LLM as usual.
+"""
+
+import re
+import threading
+from typing import List, Optional
+from integrations.embeddings import get_embeddings
+from integrations.upstream import call_upstream
+
+# --- Weather rules ---
+
+_WEATHER_PATTERNS = [
+    re.compile(
+        r"^(?:what(?:'s| is)|how(?:'s| is)|tell me|show me|get|check)?\s*(?:me\s+)?(?:the\s+)?"
+        r"(?:current\s+)?(?:weather|temperature)(?:\s+like)?\s+(?:in|at|for)\s+(?P<city>.+?)"
+        r"(?:\s+(?:right\s+)?now|\s+today|\s+currently)?\s*[?.!]*$",
+        re.IGNORECASE,
+    ),
+    re.compile(
+        r"^how\s+(?:hot|cold|warm)\s+is\s+it\s+(?:in|at)\s+(?P<city>.+?)(?:\s+(?:right\s+)?now|\s+today)?\s*[?.!]*$",
+        re.IGNORECASE,
+    ),
+    re.compile(
+        r"^(?:is\s+it\s+)?(?:raining|sunny|snowing)\s+in\s+(?P<city>.+?)(?:\s+(?:right\s+)?now|\s+today)?\s*[?.!]*$",
+        re.IGNORECASE,
+    ),
+]
+
+# Questions the weather tool (current conditions only) cannot answer directly
+_WEATHER_EXCLUDE = re.compile(
+    r"\b(?:tomorrow|yesterday|forecast|next|last|week|weekend|compare|versus|vs|and|or|should|will)\b",
+    re.IGNORECASE,
+)
+_CITY_RE = re.compile(r"^[A-Za-z][A-Za-z .,'-]{0,60}$")
+
+
+def extract_weather_city(text: str) -> Optional[str]:
+    """
+    Returns the city of a clear current-weather question, e.g.
+    "What is the weather in London?" -> "London", else None.
+    """
+    text = text.strip()
+    if text.count("?") > 1 or _WEATHER_EXCLUDE.search(text):
+        return None
+    for pattern in _WEATHER_PATTERNS:
+        match = pattern.match(text)
+        if match:
+            city = match.group("city").strip(" ,")
+            if _CITY_RE.match(city) and len(city.split()) <= 4:
+                return city
+    return None
+
+
+# --- Knowledge-base classifier ---
+
+# Example utterances that should go straight to retriever_tool
+KB_EXAMPLES = [
+    "Who is Akash Kumar Shaw?",
+    "Tell me about Akash Kumar Shaw",
+    "What is Akash Kumar Shaw's current role?",
+    "Where does Akash Kumar Shaw work?",
+    "What projects has Akash Kumar Shaw worked on?",
+    "What are Akash's skills?",
+    "What does the document say about Akash's experience?",
+    "Summarize Akash Kumar Shaw's profile",
+    "What is Akash's educational background?",
+    "Which technologies does Akash use?",
+]
+
+# Example utterances that should NOT take the knowledge-base fast path
+OTHER_EXAMPLES = [
+    "Hi, how are you?",
+    "Thanks!",
+    "What can you do?",
+    "What is 12 multiplied by 7?",
+    "What is the weather in Paris?",
+    "Will it rain tomorrow in Berlin?",
+    "Write me a poem about the sea",
+    "What is the capital of France?",
+    "Explain how transformers work",
+    "Can you help me with my code?",
+]
+
+# Minimum cosine similarity to the closest KB example
+KB_MIN_SIMILARITY = 0.6
+# Required lead of the closest KB example over the closest other example
+KB_MIN_MARGIN = 0.08
+
+# Follow-ups like "what is his role?" depend on earlier turns; leave them to the LLM
+_CONTEXT_DEPENDENT = re.compile(
+    r"\b(?:he|him|his|she|her|hers|they|them|their|it|its|that|this|those|these)\b",
+    re.IGNORECASE,
+)
+
+
+class KnowledgeBaseClassifier:
+    """
+    Nearest-neighbour intent classifier over embedded example utterances.
+    Example embeddings are computed once, on first use.
+    """
+
+    def __init__(self, kb_examples: List[str] = KB_EXAMPLES, other_examples: List[str] = OTHER_EXAMPLES,
+                 min_similarity: float = KB_MIN_SIMILARITY, min_margin: float = KB_MIN_MARGIN):
+        self.kb_examples = kb_examples
+        self.other_examples = other_examples
+        self.min_similarity = min_similarity
+        self.min_margin = min_margin
+        self._matrix = None
+        self._lock = threading.Lock()
+
+    def _example_matrix(self):
+        import numpy as np
+
+        with self._lock:
+            if self._matrix is None:
+                vectors = call_upstream("embedding:documents", get_embeddings().embed_documents, self.kb_examples + self.other_examples)
+                vectors = np.asarray(vectors, dtype=np.float32)
+                self._matrix = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+        return self._matrix
+
+    def is_knowledge_base_query(self, text: str) -> bool:
+        import numpy as np
+
+        if _CONTEXT_DEPENDENT.search(text):
+            return False
+        matrix = self._example_matrix()
+        query = np.asarray(call_upstream("embedding:query", get_embeddings().embed_query, text), dtype=np.float32)
+        similarities = matrix @ (query / np.linalg.norm(query))
+
+        kb_best = float(similarities[:len(self.kb_examples)].max())
+        other_best = float(similarities[len(self.kb_examples):].max())
+        return kb_best >= self.min_similarity and kb_best - other_best >= self.min_margin
+
+
+_kb_classifier = KnowledgeBaseClassifier()
+
+
+def warm_up():
+    """Embeds the classifier's example utterances ahead of the first request."""
+    try:
+        _kb_classifier._example_matrix()
+    except Exception as e:
+        print(f"Fast-path classifier unavailable: {e}")
+
+
+def route_message(text: str) -> Optional[dict]:
+    """
+    Returns a tool call ({"name", "args"}) for an obvious intent, or None to
+    let the LLM decide. Classifier errors fall back to the LLM.
+    """
+    city = extract_weather_city(text)
+    if city:
+        return {"name": "weather_tool", "args": {"city": city}}
+    try:
+        if _kb_classifier.is_knowledge_base_query(text):
+            return {"name": "retriever_tool", "args": {"query": text}}
+    except Exception as e:
+        print(f"Fast-path classifier unavailable: {e}")
+    return None
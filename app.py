@@ -7,7 +7,7 @@ import streamlit as st
 from dotenv import load_dotenv
 from langchain_core.messages import HumanMessage, AIMessage
 
-from agents.rag_agent import build_rag_agent
+from agents.rag_agent import build_rag_agent, warm_up
 from integrations.langsmith import configure_tracing
 
 # Load environment variables
@@ -24,8 +24,10 @@ st.set_page_config(page_title="RAG Weather Agent", page_icon="🌤️")
 
 @st.cache_resource
 def get_agent():
-    """Build and cache the RAG agent."""
-    return build_rag_agent()
+    """Build and cache the RAG agent, warming its clients once per server process."""
+    agent = build_rag_agent()
+    warm_up()
+    return agent
 
 
 SUGGESTIONS = [
@@ -0,0 +1,204 @@
+"""
+Record/replay cassettes of upstream calls.
+
+In record mode every call made through call_upstream() (LLM, embedding,
+Qdrant and weather) is appended to a cassette file together with its
+latency. In replay mode the responses are served from the cassette instead,
+either after the recorded latency or immediately, so CPU-side changes can be
+benchmarked deterministically and offline.
+
+Set RAG_CASSETTE_MODE=record|replay and RAG_CASSETTE=<path> before running
+main.py, app.py or an ingestion script, or use use_cassette() in code.
+
+Each call is recorded once, as its caller saw it: a hedged call records
+only the winning response, and the latency includes any rate-limit wait.
+Recorded failures are raised again on replay, DeadlineExceeded as itself
+and anything else as ReplayedError carrying the HTTP status, so 429s are
+still recognized as 429s.
+
+Requests are matched on the upstream name and a canonical form of the call
+arguments (message IDs and other per-run values excluded), so every
+argument a call depends on must be passed to call_upstream() rather than
+closed over. Identical requests are answered in recorded order. Results are
+stored pickled, so only replay cassettes you recorded yourself.
+"""
+
+import base64
+import hashlib
+import json
+import os
+import pickle
+import threading
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Optional
+
+CASSETTE_MODES = ("record", "replay")
+# "recorded" replays each call after its recorded latency, "zero" immediately
+CASSETTE_LATENCIES = ("recorded", "zero")
+
+# Per-run fields left out of request keys. Tool call IDs are generated per run
+# (the fast-path router makes its own), so ToolMessages match on their content.
+_VOLATILE_FIELDS = {"id", "tool_call_id", "run_id", "response_metadata", "usage_metadata"}
+
+
+class CassetteMiss(LookupError):
+    """A replayed request has no recorded response."""
+
+
+class ReplayedError(RuntimeError):
+    """A recorded failure, raised again on replay. status_code is the recorded HTTP status, if any."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _canonical(value):
+    """A JSON-serializable form of a request argument that is stable across runs."""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in sorted(value.items(), key=lambda item: str(item[0]))
+                if k not in _VOLATILE_FIELDS}
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = [_canonical(v) for v in value]
+        return sorted(items, key=json.dumps) if isinstance(value, (set, frozenset)) else items
+    if hasattr(value, "tolist"):
+        # numpy arrays and scalars
+        return _canonical(value.tolist())
+    if hasattr(value, "model_dump"):
+        # Messages, Documents, Qdrant models and other pydantic objects
+        return {"__type__": type(value).__name__, **_canonical(value.model_dump(mode="json"))}
+    if callable(value):
+        return getattr(value, "__qualname__", type(value).__name__)
+    # Clients, stores and other handles: only their type is stable
+    return type(value).__name__
+
+
+def request_key(provider: str, args, kwargs) -> str:
+    """
+    Hash of the upstream name and the call arguments. The function itself is
+    left out, so calls recorded against the real clients replay under the
+    stubs and vice versa.
+    """
+    request = {"provider": provider, "args": _canonical(args), "kwargs": _canonical(kwargs)}
+    return hashlib.sha256(json.dumps(request, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    """An append-only JSON Lines file of recorded upstream calls."""
+
+    def __init__(self, path: str, mode: str, latency: str = "recorded"):
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"Unknown cassette mode '{mode}', expected one of {CASSETTE_MODES}")
+        if latency not in CASSETTE_LATENCIES:
+            raise ValueError(f"Unknown cassette latency '{latency}', expected one of {CASSETTE_LATENCIES}")
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self.recorded = 0
+        self.replayed = 0
+        self._lock = threading.Lock()
+        self._entries = defaultdict(deque)
+        self._last = {}
+        if mode == "replay":
+            self._load()
+        else:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            # Recording starts a fresh cassette
+            open(path, "w", encoding="utf-8").close()
+
+    def _load(self):
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._entries[entry["key"]].append(entry)
+
+    def record(self, provider: str, key: str, latency: float, result=None, error: Optional[BaseException] = None):
+        entry = {"provider": provider, "key": key, "latency_s": round(latency, 6)}
+        if error is not None:
+            entry["error"] = str(error)
+            entry["error_type"] = type(error).__name__
+            status = getattr(error, "status_code", None)
+            if status is None:
+                status = getattr(getattr(error, "response", None), "status_code", None)
+            if isinstance(status, int):
+                entry["status_code"] = status
+        else:
+            entry["result"] = base64.b64encode(pickle.dumps(result)).decode("ascii")
+        line = json.dumps(entry) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+            self.recorded += 1
+
+    def lookup(self, provider: str, key: str) -> dict:
+        """
+        The next recorded response for the request. Once a request's
+        recordings are used up, the last one is served again.
+        """
+        with self._lock:
+            queue = self._entries.get(key)
+            if queue:
+                entry = queue.popleft()
+                self._last[key] = entry
+            elif key in self._last:
+                entry = self._last[key]
+            else:
+                raise CassetteMiss(f"No recorded {provider} response for this request in {self.path}")
+            self.replayed += 1
+        return entry
+
+    def delay(self, entry: dict) -> float:
+        return entry["latency_s"] if self.latency == "recorded" else 0.0
+
+    @staticmethod
+    def result(entry: dict):
+        """
+        Returns the recorded result, or raises the recorded failure as a
+        ReplayedError with its HTTP status, so 429 handling still applies.
+        """
+        if "error" in entry:
+            raise ReplayedError(
+                f"Recorded {entry['provider']} failure: {entry.get('error_type', 'Error')}: {entry['error']}",
+                entry.get("status_code"),
+            )
+        return pickle.loads(base64.b64decode(entry["result"]))
+
+
+_cassette: Optional[Cassette] = None
+_cassette_loaded = False
+_cassette_lock = threading.Lock()
+
+
+def get_cassette() -> Optional[Cassette]:
+    """The active cassette; on first use it is opened from RAG_CASSETTE_MODE / RAG_CASSETTE."""
+    global _cassette, _cassette_loaded
+    if not _cassette_loaded:
+        with _cassette_lock:
+            if not _cassette_loaded:
+                mode = os.getenv("RAG_CASSETTE_MODE", "")
+                if mode:
+                    _cassette = Cassette(
+                        os.getenv("RAG_CASSETTE", "cassettes/session.jsonl"),
+                        mode,
+                        os.getenv("RAG_CASSETTE_LATENCY", "recorded"),
+                    )
+                _cassette_loaded = True
+    return _cassette
+
+
+@contextmanager
+def use_cassette(path: str, mode: str, latency: str = "recorded"):
+    """Records or replays the upstream calls made inside the block."""
+    global _cassette, _cassette_loaded
+    with _cassette_lock:
+        previous = (_cassette, _cassette_loaded)
+        _cassette, _cassette_loaded = Cassette(path, mode, latency), True
+    try:
+        yield _cassette
+    finally:
+        with _cassette_lock:
+            _cassette, _cassette_loaded = previous
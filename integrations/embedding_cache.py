@@ -0,0 +1,61 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+# SQLite file shared by ingestion (which fills it) and serving (which reads it)
+SENTENCE_CACHE_PATH = os.getenv("SENTENCE_CACHE_PATH", ".cache/sentence_embeddings.sqlite")
+
+class EmbeddingCache:
+    """
+    Persistent text -> embedding cache. Vectors are stored as float32 bytes,
+    keyed by the embedding model and a hash of the text, so a model change
+    never serves stale vectors.
+    """
+
+    def __init__(self, path: str = SENTENCE_CACHE_PATH):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(model: str, text: str) -> str:
+        return hashlib.sha1(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, model: str, texts: List[str]) -> Dict[str, "np.ndarray"]:
+        """Returns the cached vectors of the given texts, keyed by text."""
+        import numpy as np
+
+        keys = {self._key(model, text): text for text in texts}
+        found = {}
+        key_list = list(keys)
+        with self._lock:
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(key_list), 500):
+                batch = key_list[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[keys[key]] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def put_many(self, model: str, texts: List[str], vectors):
+        import numpy as np
+
+        rows = [
+            (self._key(model, text), np.asarray(vector, dtype=np.float32).tobytes())
+            for text, vector in zip(texts, vectors)
+        ]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)", rows)
+            self._conn.commit()
+
+@lru_cache(maxsize=None)
+def get_sentence_cache(path: Optional[str] = None) -> EmbeddingCache:
+    return EmbeddingCache(path or SENTENCE_CACHE_PATH)
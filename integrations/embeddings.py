@@ -1,11 +1,15 @@
 import os
-from langchain_cohere import CohereEmbeddings
+from functools import lru_cache
 
+@lru_cache(maxsize=None)
 def get_embeddings():
     """
     Returns the configured embeddings model.
     Uses CohereEmbeddings (embed-english-v3.0).
+    The client is created on first use and shared afterwards.
     """
+    from langchain_cohere import CohereEmbeddings
+
     api_key = os.getenv("COHERE_API_KEY")
     if not api_key:
         # We allow missing key for import time, but it will fail at runtime if used.
@@ -14,4 +18,4 @@ def get_embeddings():
     return CohereEmbeddings(
         cohere_api_key=api_key,
         model="embed-english-v3.0"
-    )
\ No newline at end of file
+    )
@@ -0,0 +1,16 @@
+from functools import lru_cache
+from typing import Optional
+
+
+@lru_cache(maxsize=None)
+def get_chat_model(model: str, temperature: float = 0, max_completion_tokens: Optional[int] = None):
+    """
+    Returns a shared ChatOpenAI client for the given model settings.
+    langchain_openai is imported on first use so that importing the agent stays cheap.
+    """
+    from langchain_openai import ChatOpenAI
+
+    kwargs = {}
+    if max_completion_tokens is not None:
+        kwargs["max_completion_tokens"] = max_completion_tokens
+    return ChatOpenAI(model=model, temperature=temperature, **kwargs)
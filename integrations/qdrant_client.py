@@ -1,63 +1,627 @@
+import gzip
+import hashlib
+import json
+import math
 import os
-from typing import List
+import time
+import uuid
+import warnings
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextvars import copy_context
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 from langchain_core.documents import Document
-from langchain_qdrant import QdrantVectorStore
-from qdrant_client import QdrantClient
-from qdrant_client.http import models
 from integrations.embeddings import get_embeddings
+from integrations.upstream import call_upstream
 
+# qdrant_client and langchain_qdrant are slow to import, so they are loaded
+# inside the functions below rather than at module import time.
+
+# Collection (or alias) the retrievers read and ingestion writes to by default
+COLLECTION_NAME = os.getenv("QDRANT_COLLECTION", "rag_weather_cohere2")
+
+@lru_cache(maxsize=None)
 def get_qdrant_client():
+    from qdrant_client import QdrantClient
+
     url = os.getenv("QDRANT_URL")
     api_key = os.getenv("QDRANT_API_KEY")
-    
+    path = os.getenv("QDRANT_PATH")
+
     if not url:
-        # Fallback to local memory for testing if no URL provided
+        if path:
+            # Local on-disk storage survives restarts (single process per path)
+            return QdrantClient(path=path)
+        # Fallback to local memory for testing if no URL or path provided
         return QdrantClient(location=":memory:")
-    
+
     return QdrantClient(url=url, api_key=api_key)
 
-def create_collection(collection_name: str, vector_size: int = 1536):
+@lru_cache(maxsize=None)
+def get_vector_store(collection_name: str):
+    """
+    Returns a shared LangChain vector store handle for the collection.
+    """
+    from langchain_qdrant import QdrantVectorStore
+
+    return QdrantVectorStore(
+        client=get_qdrant_client(),
+        collection_name=collection_name,
+        embedding=get_embeddings(),
+    )
+
+# Vector quantization: "none", "scalar" (int8, ~4x smaller) or "binary" (~32x smaller).
+# Quantized vectors stay in RAM for search; results are rescored against the
+# full-precision originals, which can be kept on disk with QDRANT_ON_DISK=true.
+QUANTIZATION_MODES = ("none", "scalar", "binary")
+# How many extra candidates the quantized search fetches before rescoring.
+QUANTIZATION_OVERSAMPLING = {"scalar": 2.0, "binary": 3.0}
+
+def _quantization_config(quantization: str):
+    from qdrant_client.http import models
+
+    if quantization == "scalar":
+        return models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(
+                type=models.ScalarType.INT8,
+                quantile=0.99,
+                always_ram=True,
+            )
+        )
+    if quantization == "binary":
+        return models.BinaryQuantization(
+            binary=models.BinaryQuantizationConfig(always_ram=True)
+        )
+    return None
+
+# Payload fields indexed at collection creation so filtered searches stay fast.
+# Keys are filter names accepted by build_filter; chunks store them under metadata.
+PAYLOAD_INDEXES = {
+    "source": "keyword",
+    "file_name": "keyword",
+    "page": "integer",
+    "kind": "keyword",
+}
+
+def create_payload_indexes(collection_name: str):
+    """
+    Creates the PAYLOAD_INDEXES on the collection. Existing indexes are left as is.
+    """
+    client = get_qdrant_client()
+    for field, schema in PAYLOAD_INDEXES.items():
+        with warnings.catch_warnings():
+            # Local (in-memory / on-disk) Qdrant ignores payload indexes and warns about it
+            warnings.simplefilter("ignore", UserWarning)
+            client.create_payload_index(
+                collection_name=collection_name,
+                field_name=f"metadata.{field}",
+                field_schema=schema,
+            )
+
+def build_filter(filters: Optional[dict]):
+    """
+    Builds a Qdrant filter from a {field: value} dict over chunk metadata.
+    A list value matches any of its items; None values are ignored.
+
+    Example: {"file_name": "report.pdf", "page": [0, 1]}
+    """
+    from qdrant_client.http import models
+
+    if not filters:
+        return None
+
+    conditions = []
+    for field, value in filters.items():
+        if value is None:
+            continue
+        if isinstance(value, (list, tuple, set)):
+            match = models.MatchAny(any=list(value))
+        else:
+            match = models.MatchValue(value=value)
+        conditions.append(models.FieldCondition(key=f"metadata.{field}", match=match))
+    if not conditions:
+        return None
+    return models.Filter(must=conditions)
+
+def create_collection(
+    collection_name: str,
+    vector_size: int = 1536,
+    quantization: Optional[str] = None,
+    on_disk: Optional[bool] = None,
+):
     """
     Creates a Qdrant collection if it doesn't exist.
+
+    Args:
+        quantization: "none", "scalar" or "binary". Defaults to QDRANT_QUANTIZATION.
+        on_disk: Store full-precision vectors on disk. Defaults to QDRANT_ON_DISK.
     """
+    from qdrant_client.http import models
+
+    if quantization is None:
+        quantization = os.getenv("QDRANT_QUANTIZATION", "none").lower()
+    if quantization not in QUANTIZATION_MODES:
+        raise ValueError(f"Unknown quantization '{quantization}', expected one of {QUANTIZATION_MODES}")
+    if on_disk is None:
+        on_disk = os.getenv("QDRANT_ON_DISK", "false").lower() in ("1", "true", "yes")
+
     client = get_qdrant_client()
     try:
         client.get_collection(collection_name)
         print(f"Collection '{collection_name}' already exists.")
     except Exception:
-        print(f"Creating collection '{collection_name}'...")
+        print(f"Creating collection '{collection_name}' (quantization={quantization}, on_disk={on_disk})...")
         client.create_collection(
             collection_name=collection_name,
-            vectors_config=models.VectorParams(size=vector_size, distance=models.Distance.COSINE),
+            vectors_config=models.VectorParams(
+                size=vector_size,
+                distance=models.Distance.COSINE,
+                on_disk=on_disk,
+            ),
+            quantization_config=_quantization_config(quantization),
+        )
+        create_payload_indexes(collection_name)
+
+# Keyed by the collection an alias resolves to, so a swap_alias in another
+# process (scripts/migrate_collection.py) takes effect once the alias is
+# looked up again, at most QDRANT_ALIAS_TTL seconds later
+_search_params_cache: Dict[str, object] = {}
+# Seconds an alias resolution is reused before get_aliases() is called again
+QDRANT_ALIAS_TTL = float(os.getenv("QDRANT_ALIAS_TTL", "10"))
+# alias or collection name -> (collection it resolves to, monotonic expiry)
+_alias_cache: Dict[str, Tuple[str, float]] = {}
+
+def _resolved_collection(name: str) -> str:
+    """The collection an alias points to (cached for QDRANT_ALIAS_TTL), or the name itself."""
+    cached = _alias_cache.get(name)
+    now = time.monotonic()
+    if cached is not None and cached[1] > now:
+        return cached[0]
+    try:
+        collection_name = resolve_alias(name) or name
+    except Exception:
+        # Look again next time rather than caching the failure
+        return name
+    _alias_cache[name] = (collection_name, now + QDRANT_ALIAS_TTL)
+    return collection_name
+
+def get_search_params(collection_name: str):
+    """
+    Returns search params that rescore quantized hits against full-precision
+    vectors, or None if the collection is not quantized.
+    collection_name may be an alias; see _resolved_collection().
+    """
+    collection_name = _resolved_collection(collection_name)
+    if collection_name in _search_params_cache:
+        return _search_params_cache[collection_name]
+
+    from qdrant_client.http import models
+
+    try:
+        info = get_qdrant_client().get_collection(collection_name)
+    except Exception:
+        # Not created yet; look again next time rather than caching the miss.
+        return None
+
+    search_params = None
+    config = info.config.quantization_config
+    if config is not None:
+        mode = "binary" if isinstance(config, models.BinaryQuantization) else "scalar"
+        search_params = models.SearchParams(
+            quantization=models.QuantizationSearchParams(
+                rescore=True,
+                oversampling=QUANTIZATION_OVERSAMPLING[mode],
+            )
         )
+    _search_params_cache[collection_name] = search_params
+    return search_params
+
+def document_id(doc: Document) -> str:
+    """
+    Returns a deterministic point ID for a chunk, derived from its source,
+    page and content, so re-ingesting the same chunk overwrites it.
+    Synthetic question points are keyed on their parent chunk instead, so
+    chunks that produce the same question each keep their own point.
+    """
+    digest = hashlib.sha1(doc.page_content.encode("utf-8")).hexdigest()
+    if doc.metadata.get("kind") == QUESTION_KIND:
+        key = f"{doc.metadata.get('chunk_id')}:q:{digest}"
+    else:
+        key = f"{doc.metadata.get('source')}:{doc.metadata.get('page')}:{digest}"
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, key))
 
 def upsert_documents(collection_name: str, docs: List[Document]):
     """
-    Upserts documents into the Qdrant collection.
+    Upserts documents into the Qdrant collection, in the payload layout
+    QdrantVectorStore reads. The chunks are embedded through call_upstream so
+    ingestion shares the embedding rate limit with queries.
+    """
+    from qdrant_client.http import models
+
+    vectors = call_upstream("embedding:documents", get_embeddings().embed_documents, [doc.page_content for doc in docs])
+    points = [
+        models.PointStruct(
+            id=document_id(doc),
+            vector=vector,
+            payload={"page_content": doc.page_content, "metadata": doc.metadata},
+        )
+        for doc, vector in zip(docs, vectors)
+    ]
+    call_upstream("qdrant", get_qdrant_client().upsert, collection_name=collection_name, points=points)
+
+def add_duplicate_provenance(collection_name: str, provenance: Dict[str, List[dict]]):
+    """
+    Records where dropped near-duplicates came from on their kept representative,
+    as `metadata.duplicates` in the point payload.
     """
     client = get_qdrant_client()
-    embeddings = get_embeddings()
-    
-    vector_store = QdrantVectorStore(
-        client=client,
-        collection_name=collection_name,
-        embedding=embeddings,
-    )
-    vector_store.add_documents(documents=docs)
+    for point_id, duplicates in provenance.items():
+        client.set_payload(
+            collection_name=collection_name,
+            payload={"duplicates": duplicates},
+            points=[point_id],
+            key="metadata",
+        )
 
-def get_retriever(collection_name: str, k: int = 3, score_threshold: float = 0.5):
+def delete_documents(collection_name: str, source: str, keep_ids: Optional[Iterable[str]] = None):
     """
-    Returns a LangChain retriever for the Qdrant collection.
+    Deletes the points ingested from one source file, except keep_ids.
+    Re-indexing a changed file upserts its new chunks first and then drops the
+    stale ones, so the file stays searchable throughout.
     """
+    from qdrant_client.http import models
+
     client = get_qdrant_client()
-    embeddings = get_embeddings()
-    
-    vector_store = QdrantVectorStore(
-        client=client,
+    if not client.collection_exists(collection_name):
+        return
+    keep_ids = list(keep_ids or [])
+    client.delete(
         collection_name=collection_name,
-        embedding=embeddings,
+        points_selector=models.FilterSelector(filter=models.Filter(
+            must=[models.FieldCondition(key="metadata.source", match=models.MatchValue(value=source))],
+            must_not=[models.HasIdCondition(has_id=keep_ids)] if keep_ids else None,
+        )),
     )
+
+def get_retriever(collection_name: str, k: int = 3, score_threshold: float = 0.5, filters: Optional[dict] = None):
+    """
+    Returns a LangChain retriever for the Qdrant collection.
+    filters restricts the search to chunks whose metadata matches (see build_filter).
+    The retriever embeds and searches directly, outside call_upstream (no
+    deadlines or rate limits); the app's own searches use search_collections.
+    """
+    vector_store = get_vector_store(collection_name)
+    search_kwargs = {"k": k, "score_threshold": score_threshold}
+    # Synthetic question points are only matched through search_collections
+    search_kwargs["filter"] = exclude_questions(build_filter(filters))
+    search_params = get_search_params(collection_name)
+    if search_params is not None:
+        search_kwargs["search_params"] = search_params
     return vector_store.as_retriever(
         search_type="similarity_score_threshold",
-        search_kwargs={"k": k, "score_threshold": score_threshold}
+        search_kwargs=search_kwargs
     )
+
+# --- Synthetic question points ---
+# The optional question index (tools/question_index.py) stores generated
+# questions as extra points in the chunk collection, with metadata
+# kind="question" and chunk_id set to their chunk's point ID. Searches match
+# questions and chunks together and return the parent chunk.
+
+QUESTION_KIND = "question"
+# Candidates fetched per requested hit while the index is on, since one chunk
+# can match through its own text and several of its questions
+QUESTION_OVERSAMPLING = 3
+
+def question_index_enabled() -> bool:
+    return os.getenv("RAG_QUESTION_INDEX", "false").lower() in ("1", "true", "yes")
+
+def exclude_questions(qdrant_filter=None):
+    """Adds a condition excluding question points to a Qdrant filter (or None)."""
+    from qdrant_client.http import models
+
+    condition = models.FieldCondition(key="metadata.kind", match=models.MatchValue(value=QUESTION_KIND))
+    if qdrant_filter is None:
+        return models.Filter(must_not=[condition])
+    return qdrant_filter.model_copy(update={"must_not": list(qdrant_filter.must_not or []) + [condition]})
+
+def get_documents_by_id(collection_name: str, ids: List[str]) -> List[Document]:
+    """
+    Reads chunks back by point ID, with the same metadata a search returns.
+    IDs missing from the collection are skipped.
+    """
+    points = get_qdrant_client().retrieve(collection_name, ids=ids, with_payload=True, with_vectors=False)
+    docs = []
+    for point in points:
+        payload = point.payload or {}
+        metadata = {**(payload.get("metadata") or {}), "_id": str(point.id), "_collection_name": collection_name}
+        docs.append(Document(page_content=payload.get("page_content", ""), metadata=metadata))
+    return docs
+
+def resolve_question_hits(collection_name: str, hits: List[tuple]) -> List[tuple]:
+    """
+    Replaces question hits [(Document, score)] with their parent chunk, keeps
+    every chunk once at its best score and returns them by descending score.
+    The question that matched is kept in metadata["matched_question"].
+    """
+    chunk_ids = {doc.metadata.get("chunk_id") for doc, _ in hits if doc.metadata.get("kind") == QUESTION_KIND}
+    if not chunk_ids:
+        return hits
+
+    parents = {doc.metadata["_id"]: doc for doc in get_documents_by_id(collection_name, list(chunk_ids))}
+
+    best = {}
+    for doc, score in hits:
+        if doc.metadata.get("kind") == QUESTION_KIND:
+            parent = parents.get(doc.metadata.get("chunk_id"))
+            if parent is None:
+                # Chunk deleted after its questions were written
+                continue
+            doc = parent.model_copy(update={"metadata": {**parent.metadata, "matched_question": doc.page_content}})
+        key = doc.metadata.get("_id") or doc.page_content
+        if key not in best or score > best[key][1]:
+            best[key] = (doc, score)
+    return sorted(best.values(), key=lambda hit: hit[1], reverse=True)
+
+# --- Sharded search ---
+# A corpus can be split across several collections (shards, tenants or
+# document families). Searches embed the query once, query every routed
+# collection concurrently and merge the top-k under a single deadline.
+
+# Default time budget (seconds) for a fan-out search; slower shards are skipped
+FANOUT_TIMEOUT = float(os.getenv("QDRANT_FANOUT_TIMEOUT", "5"))
+# Rank constant for reciprocal rank fusion
+RRF_K = 60
+
+_fanout_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="qdrant-fanout")
+
+def get_collections_for(tenant: Optional[str] = None) -> List[str]:
+    """
+    Returns the collections a search should fan out to.
+
+    QDRANT_TENANT_COLLECTIONS maps tenants to collections as JSON, e.g.
+    {"acme": ["acme_docs", "shared_docs"]}. Without a tenant (or mapping),
+    QDRANT_COLLECTIONS (comma-separated) lists the shards, defaulting to
+    COLLECTION_NAME alone.
+    """
+    if tenant:
+        routes = json.loads(os.getenv("QDRANT_TENANT_COLLECTIONS", "{}"))
+        if tenant in routes:
+            return list(routes[tenant])
+    shards = [c.strip() for c in os.getenv("QDRANT_COLLECTIONS", "").split(",") if c.strip()]
+    return shards or [COLLECTION_NAME]
+
+def merge_results(results: List[List[tuple]], k: int, fusion: str = "score") -> List[tuple]:
+    """
+    Merges per-collection [(Document, score)] lists into one top-k list.
+    fusion="score" ranks by raw similarity (comparable when every collection
+    uses the same embedding model); fusion="rrf" uses reciprocal rank fusion.
+    """
+    merged: Dict[str, list] = {}
+    for hits in results:
+        for rank, (doc, score) in enumerate(hits):
+            key = f"{doc.metadata.get('_collection_name')}:{doc.metadata.get('_id', doc.page_content)}"
+            value = score if fusion == "score" else 1.0 / (RRF_K + rank + 1)
+            if key in merged:
+                merged[key][1] = max(merged[key][1], value) if fusion == "score" else merged[key][1] + value
+            else:
+                merged[key] = [doc, value]
+    ranked = sorted(merged.values(), key=lambda item: item[1], reverse=True)
+    return [(doc, value) for doc, value in ranked[:k]]
+
+# Qdrant scores mapped to the [0, 1] relevance scale that get_retriever's
+# score_threshold uses (the same mapping as langchain_qdrant), by distance metric
+_RELEVANCE_FNS = {
+    "Cosine": lambda score: (score + 1.0) / 2.0,
+    "Dot": lambda score: 1.0 - score if score > 0 else -score,
+    "Euclid": lambda score: 1.0 - score / math.sqrt(2),
+}
+
+def relevance_score_fn(distance):
+    """Returns the score -> relevance mapping for a Qdrant distance metric."""
+    name = getattr(distance, "value", distance)
+    if name not in _RELEVANCE_FNS:
+        raise ValueError(f"Unsupported distance metric: {name}")
+    return _RELEVANCE_FNS[name]
+
+def search_collection(collection_name: str, embedding: List[float], k: int,
+                      score_threshold: Optional[float] = None, qdrant_filter=None,
+                      oversampling: int = 1) -> List[tuple]:
+    """
+    Searches one collection by vector and returns its top-k [(Document, relevance score)],
+    fetching k * oversampling candidates so question hits can collapse onto their chunks.
+    Everything the search depends on is passed in, so recorded calls can be
+    matched by their arguments (see integrations/cassette.py).
+    """
+    store = get_vector_store(collection_name)
+    hits = store.similarity_search_with_score_by_vector(
+        embedding,
+        k=k * oversampling,
+        filter=qdrant_filter,
+        search_params=get_search_params(collection_name),
+    )
+    relevance = relevance_score_fn(store.distance)
+    hits = [(doc, relevance(score)) for doc, score in hits]
+    hits = [(doc, score) for doc, score in hits if score_threshold is None or score >= score_threshold]
+    return resolve_question_hits(collection_name, hits)[:k]
+
+def embed_query(query: str) -> List[float]:
+    """The query embedding search_collections searches with."""
+    return call_upstream("embedding:query", get_embeddings().embed_query, query)
+
+def search_collections(
+    query: str,
+    collections: List[str],
+    k: int = 3,
+    score_threshold: Optional[float] = None,
+    filters: Optional[dict] = None,
+    fusion: str = "score",
+    timeout: Optional[float] = None,
+    embedding: Optional[List[float]] = None,
+) -> List[tuple]:
+    """
+    Searches several collections concurrently with one query embedding and
+    returns the merged top-k [(Document, relevance score)]. Scores and
+    score_threshold use the same [0, 1] relevance scale as get_retriever.
+    Synthetic question hits count as hits on their parent chunk.
+    Collections that fail or do not answer within timeout seconds are left
+    out of the merge. Pass embedding (see embed_query) if the query is
+    already embedded.
+    """
+    if embedding is None:
+        embedding = embed_query(query)
+    oversampling = QUESTION_OVERSAMPLING if question_index_enabled() else 1
+    search_args = (embedding, k, score_threshold, build_filter(filters), oversampling)
+
+    if len(collections) == 1:
+        return call_upstream("qdrant", search_collection, collections[0], *search_args)
+
+    futures = {
+        _fanout_executor.submit(copy_context().run, call_upstream, "qdrant", search_collection, c, *search_args): c
+        for c in collections
+    }
+    done, pending = wait(futures, timeout=FANOUT_TIMEOUT if timeout is None else timeout)
+    for future in pending:
+        future.cancel()
+        print(f"Warning: collection '{futures[future]}' missed the search deadline")
+
+    results = []
+    for future in done:
+        try:
+            results.append(future.result())
+        except Exception as e:
+            print(f"Warning: search in '{futures[future]}' failed: {e}")
+    return merge_results(results, k, fusion)
+
+# Points per scroll/upsert request when exporting, importing or copying
+SNAPSHOT_BATCH_SIZE = 256
+
+def iter_points(collection_name: str) -> Iterator:
+    """
+    Yields every point of the collection with its vector and payload.
+    """
+    client = get_qdrant_client()
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection_name,
+            limit=SNAPSHOT_BATCH_SIZE,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True,
+        )
+        yield from points
+        if offset is None:
+            break
+
+def upsert_points(collection_name: str, points: Iterable[dict]) -> int:
+    """
+    Upserts already-embedded points ({"id", "vector", "payload"} dicts) in batches.
+    Returns the number of upserted points.
+    """
+    from qdrant_client.http import models
+
+    client = get_qdrant_client()
+    count = 0
+    batch = []
+    for point in points:
+        batch.append(models.PointStruct(id=point["id"], vector=point["vector"], payload=point["payload"]))
+        if len(batch) >= SNAPSHOT_BATCH_SIZE:
+            client.upsert(collection_name=collection_name, points=batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        client.upsert(collection_name=collection_name, points=batch)
+        count += len(batch)
+    return count
+
+def get_vector_size(collection_name: str) -> int:
+    return get_qdrant_client().get_collection(collection_name).config.params.vectors.size
+
+def export_collection(collection_name: str, output_path: str) -> int:
+    """
+    Exports every point (ID, vector, payload) of the collection to a gzipped
+    JSON Lines file. The first line is a header with the vector config.
+    Works against server, on-disk and in-memory Qdrant alike.
+    Returns the number of exported points.
+    """
+    vectors_config = get_qdrant_client().get_collection(collection_name).config.params.vectors
+
+    count = 0
+    with gzip.open(output_path, "wt", encoding="utf-8") as f:
+        header = {
+            "collection": collection_name,
+            "vector_size": vectors_config.size,
+            "distance": str(vectors_config.distance.value),
+        }
+        f.write(json.dumps(header) + "\n")
+        for point in iter_points(collection_name):
+            f.write(json.dumps({"id": point.id, "vector": point.vector, "payload": point.payload}) + "\n")
+            count += 1
+    return count
+
+def import_collection(input_path: str, collection_name: Optional[str] = None) -> int:
+    """
+    Loads a file written by export_collection into a collection (created if
+    missing, named as in the snapshot unless collection_name is given).
+    Vectors are restored as-is, so nothing is re-embedded.
+    Returns the number of imported points.
+    """
+    with gzip.open(input_path, "rt", encoding="utf-8") as f:
+        header = json.loads(f.readline())
+        collection_name = collection_name or header["collection"]
+        create_collection(collection_name, vector_size=header["vector_size"])
+        return upsert_points(collection_name, (json.loads(line) for line in f))
+
+def copy_collection(source_name: str, target_name: str) -> int:
+    """
+    Copies all points (vectors included) from one collection to another.
+    Only valid when both use the same embedding model and chunking.
+    """
+    points = ({"id": p.id, "vector": p.vector, "payload": p.payload} for p in iter_points(source_name))
+    return upsert_points(target_name, points)
+
+# --- Aliases ---
+# Retrievers search COLLECTION_NAME, which may be a Qdrant alias pointing at a
+# versioned collection (e.g. rag_weather_cohere2_v3). Rebuilds happen in a new
+# version and swap_alias repoints the alias atomically; rolling back is another swap.
+
+def resolve_alias(alias: str) -> Optional[str]:
+    """
+    Returns the collection the alias points to, or None if it is not an alias.
+    """
+    for description in get_qdrant_client().get_aliases().aliases:
+        if description.alias_name == alias:
+            return description.collection_name
+    return None
+
+def swap_alias(alias: str, collection_name: str) -> Optional[str]:
+    """
+    Atomically points the alias at collection_name.
+    Returns the collection it pointed to before (for rollback), if any.
+    """
+    from qdrant_client.http import models
+
+    previous = resolve_alias(alias)
+    operations = []
+    if previous is not None:
+        operations.append(models.DeleteAliasOperation(delete_alias=models.DeleteAlias(alias_name=alias)))
+    operations.append(models.CreateAliasOperation(
+        create_alias=models.CreateAlias(collection_name=collection_name, alias_name=alias)
+    ))
+    get_qdrant_client().update_collection_aliases(change_aliases_operations=operations)
+    # Other processes see the swap once their cached resolution expires
+    _alias_cache.pop(alias, None)
+    return previous
+
+def next_version_name(alias: str) -> str:
+    """
+    Returns the next free versioned collection name for the alias: <alias>_v<N>.
+    """
+    prefix = f"{alias}_v"
+    versions = [
+        int(c.name[len(prefix):])
+        for c in get_qdrant_client().get_collections().collections
+        if c.name.startswith(prefix) and c.name[len(prefix):].isdigit()
+    ]
+    return f"{prefix}{max(versions, default=0) + 1}"
@@ -0,0 +1,330 @@
+"""
+Process-wide admission control for the quota-limited upstreams.
+
+Each provider (OpenAI, Cohere, OpenWeatherMap) gets token buckets for
+requests per minute and, where the provider meters them, tokens per minute,
+refilled at a little under the account's quota. call_upstream() acquires from
+them before every call, so bursts queue here instead of tripping 429s.
+
+Queued calls are served by priority class (interactive before ingestion) and,
+within a class, round-robin across flows (by default the calling thread), so
+one caller's burst cannot hold back everyone else's requests.
+"""
+
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+# Priority classes; lower is served first
+INTERACTIVE = 0
+INGESTION = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", INGESTION: "ingestion"}
+
+# call_upstream() provider prefix -> the quota it draws from
+UPSTREAM_QUOTAS = {"llm": "openai", "embedding": "cohere", "weather": "openweathermap"}
+
+# Default (requests/min, tokens/min) per quota; 0 disables a limit. Override with
+# RATE_LIMIT_<QUOTA>_RPM / RATE_LIMIT_<QUOTA>_TPM, e.g. RATE_LIMIT_OPENAI_TPM.
+DEFAULT_QUOTAS = {
+    "openai": (500, 200_000),
+    "cohere": (2_000, 0),
+    "openweathermap": (60, 0),
+}
+# Share of each quota the limiter admits
+RATE_LIMIT_HEADROOM = float(os.getenv("RATE_LIMIT_HEADROOM", "0.95"))
+# Seconds of quota that may be spent in one burst
+RATE_LIMIT_BURST_SECONDS = float(os.getenv("RATE_LIMIT_BURST_SECONDS", "2"))
+# Completion tokens reserved per LLM call until its actual usage is known
+LLM_OUTPUT_TOKENS = 256
+
+_priority: ContextVar[int] = ContextVar("rate_limit_priority", default=INTERACTIVE)
+_flow: ContextVar[Optional[str]] = ContextVar("rate_limit_flow", default=None)
+
+
+@contextmanager
+def priority_scope(priority: int):
+    """Runs the upstream calls made inside the block in the given priority class."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+@contextmanager
+def flow_scope(flow: str):
+    """Groups the calls made inside the block into one flow for fair scheduling."""
+    token = _flow.set(flow)
+    try:
+        yield
+    finally:
+        _flow.reset(token)
+
+
+class TokenBucket:
+    """Refills at per_minute / 60 per second, holding at most `burst_seconds` worth."""
+
+    def __init__(self, per_minute: float, burst_seconds: float = RATE_LIMIT_BURST_SECONDS):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` can be taken (0 if it can be taken now)."""
+        self._refill(now)
+        # A request larger than the bucket goes through once it is full and
+        # leaves it in debt, which later requests wait off
+        needed = min(amount, self.capacity)
+        return 0.0 if self.level >= needed else (needed - self.level) / self.rate
+
+    def take(self, amount: float):
+        self.level -= amount
+
+    def give(self, amount: float):
+        self.level = min(self.capacity, self.level + amount)
+
+    def drain(self, now: float):
+        self._refill(now)
+        self.level = min(self.level, 0.0)
+
+
+class _Waiter:
+    __slots__ = ("tokens", "granted")
+
+    def __init__(self, tokens: int):
+        self.tokens = tokens
+        self.granted = False
+
+
+class ProviderLimiter:
+    """Request and token buckets for one quota, with a priority- and flow-fair wait queue."""
+
+    def __init__(self, name: str, rpm: float = 0, tpm: float = 0, headroom: float = RATE_LIMIT_HEADROOM):
+        self.name = name
+        self.requests = TokenBucket(rpm * headroom) if rpm else None
+        self.tokens = TokenBucket(tpm * headroom) if tpm else None
+        self._cond = threading.Condition()
+        # priority -> flow -> waiters in arrival order
+        self._queues: Dict[int, "OrderedDict[object, deque]"] = {}
+        self.granted = 0
+        self.throttled = 0
+        self.timed_out = 0
+        self.wait_total = 0.0
+        self.max_wait = 0.0
+
+    def _wait_time(self, tokens: int, now: float) -> float:
+        delay = self.requests.wait_time(1, now) if self.requests else 0.0
+        if self.tokens and tokens:
+            delay = max(delay, self.tokens.wait_time(tokens, now))
+        return delay
+
+    def _take(self, tokens: int):
+        if self.requests:
+            self.requests.take(1)
+        if self.tokens:
+            self.tokens.take(tokens)
+
+    def _dispatch(self, now: float) -> Optional[float]:
+        """
+        Admits queued calls in scheduling order while the buckets allow.
+        Returns the seconds until the next one can go, or None if none are queued.
+        """
+        while self._queues:
+            priority = min(self._queues)
+            flows = self._queues[priority]
+            flow, waiters = next(iter(flows.items()))
+            delay = self._wait_time(waiters[0].tokens, now)
+            if delay > 0:
+                return delay
+            waiter = waiters.popleft()
+            self._take(waiter.tokens)
+            waiter.granted = True
+            # Round-robin: the flow goes to the back of its class
+            if waiters:
+                flows.move_to_end(flow)
+            else:
+                del flows[flow]
+                if not flows:
+                    del self._queues[priority]
+            self._cond.notify_all()
+        return None
+
+    def _remove(self, priority: int, flow, waiter: _Waiter):
+        flows = self._queues[priority]
+        flows[flow].remove(waiter)
+        if not flows[flow]:
+            del flows[flow]
+            if not flows:
+                del self._queues[priority]
+
+    def acquire(self, tokens: int = 0, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until one request (and `tokens` tokens) may be sent, in the
+        current priority class and flow. Returns False if that takes longer
+        than `timeout` seconds; the call must then not be made.
+        """
+        priority = _priority.get()
+        flow = _flow.get() or threading.get_ident()
+        waiter = _Waiter(tokens)
+        started = time.monotonic()
+        end = None if timeout is None else started + timeout
+        with self._cond:
+            self._queues.setdefault(priority, OrderedDict()).setdefault(flow, deque()).append(waiter)
+            while True:
+                now = time.monotonic()
+                delay = self._dispatch(now)
+                if waiter.granted:
+                    break
+                if end is not None and now >= end:
+                    self._remove(priority, flow, waiter)
+                    self.timed_out += 1
+                    # The head of the queue may have changed
+                    self._cond.notify_all()
+                    return False
+                self._cond.wait(delay if end is None else min(delay, end - now))
+            waited = time.monotonic() - started
+            self.granted += 1
+            if waited > 0.001:
+                self.throttled += 1
+            self.wait_total += waited
+            self.max_wait = max(self.max_wait, waited)
+        return True
+
+    def try_acquire(self, tokens: int = 0) -> bool:
+        """Admits a call only if nothing is queued and the buckets allow it right now."""
+        with self._cond:
+            if self._queues or self._wait_time(tokens, time.monotonic()) > 0:
+                return False
+            self._take(tokens)
+            self.granted += 1
+            return True
+
+    def release(self, tokens: int = 0):
+        """Returns an admission for a call that was not sent."""
+        with self._cond:
+            if self.requests:
+                self.requests.give(1)
+            if self.tokens:
+                self.tokens.give(tokens)
+            self.granted -= 1
+            self._cond.notify_all()
+
+    def settle(self, reserved: int, used: Optional[int]):
+        """Corrects the token bucket by the difference between the estimate and actual usage."""
+        if not self.tokens or used is None or used == reserved:
+            return
+        with self._cond:
+            if used < reserved:
+                self.tokens.give(reserved - used)
+            else:
+                self.tokens.take(used - reserved)
+            self._cond.notify_all()
+
+    def penalize(self):
+        """Empties the buckets after a 429, so queued calls back off for a refill period."""
+        with self._cond:
+            now = time.monotonic()
+            for bucket in (self.requests, self.tokens):
+                if bucket:
+                    bucket.drain(now)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "granted": self.granted,
+                "throttled": self.throttled,
+                "timed_out": self.timed_out,
+                "queued": sum(len(w) for flows in self._queues.values() for w in flows.values()),
+                "avg_wait_s": round(self.wait_total / self.granted, 4) if self.granted else 0.0,
+                "max_wait_s": round(self.max_wait, 4),
+            }
+
+
+def _env_quota(name: str, default: Tuple[float, float]) -> Tuple[float, float]:
+    rpm = os.getenv(f"RATE_LIMIT_{name.upper()}_RPM")
+    tpm = os.getenv(f"RATE_LIMIT_{name.upper()}_TPM")
+    return (float(rpm) if rpm else default[0], float(tpm) if tpm else default[1])
+
+
+_limiters: Dict[str, ProviderLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def configure_rate_limits(quotas: Optional[Dict[str, Tuple[float, float]]] = None, headroom: Optional[float] = None):
+    """
+    Sets the (requests/min, tokens/min) quota per provider and resets the
+    statistics. Providers missing from `quotas` are not limited; None reads the
+    RATE_LIMIT_* environment variables over DEFAULT_QUOTAS.
+    """
+    if quotas is None:
+        quotas = {name: _env_quota(name, default) for name, default in DEFAULT_QUOTAS.items()}
+    headroom = RATE_LIMIT_HEADROOM if headroom is None else headroom
+    with _limiters_lock:
+        _limiters.clear()
+        for name, (rpm, tpm) in quotas.items():
+            if rpm or tpm:
+                _limiters[name] = ProviderLimiter(name, rpm, tpm, headroom)
+
+
+def get_limiter(upstream: str) -> Optional[ProviderLimiter]:
+    """The limiter for a call_upstream() provider name, or None if it is not rate limited."""
+    quota = UPSTREAM_QUOTAS.get(upstream.split(":", 1)[0])
+    return _limiters.get(quota) if quota else None
+
+
+def rate_limit_stats() -> Dict[str, dict]:
+    """Per-quota admissions, throttled calls, timeouts, queue length and wait times."""
+    with _limiters_lock:
+        limiters = dict(_limiters)
+    return {name: limiter.stats() for name, limiter in sorted(limiters.items())}
+
+
+def _text_length(value) -> int:
+    if isinstance(value, str):
+        return len(value)
+    if isinstance(value, dict):
+        return _text_length(value.get("content", ""))
+    if isinstance(value, (list, tuple)):
+        return sum(_text_length(item) for item in value)
+    content = getattr(value, "content", None)
+    return _text_length(content) if content is not None else len(str(value))
+
+
+def estimate_tokens(upstream: str, args) -> int:
+    """
+    Tokens a call will use, from its input (~4 characters per token); LLM
+    calls also reserve LLM_OUTPUT_TOKENS for the completion.
+    """
+    tokens = math.ceil(_text_length(args[0]) / 4) if args else 0
+    if upstream.startswith("llm"):
+        tokens += LLM_OUTPUT_TOKENS
+    return tokens
+
+
+def usage_tokens(result) -> Optional[int]:
+    """Total tokens reported on an LLM response, if any."""
+    usage = getattr(result, "usage_metadata", None)
+    if isinstance(usage, dict) and usage.get("total_tokens"):
+        return int(usage["total_tokens"])
+    return None
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """True for 429 responses from the OpenAI, Cohere or requests clients."""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status == 429
+
+
+configure_rate_limits()
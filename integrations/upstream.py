@@ -0,0 +1,331 @@
+"""
+Per-request deadlines and hedging for upstream calls.
+
+A deadline is an absolute time.monotonic() value carried in a context
+variable. Entry points set it with deadline_scope(), and every LLM, embedding,
+Qdrant and weather call goes through call_upstream(), which raises
+DeadlineExceeded once the budget is spent instead of waiting on a slow
+upstream. Without a deadline (or hedging), call_upstream() is a plain
+function call.
+
+Upstreams are named "<provider>" or "<provider>:<operation>", e.g.
+"llm:grader" or "embedding:query". Hedging (see configure_hedging) is enabled
+per provider and tracks latency and win rates per full name.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from functools import wraps
+from typing import Callable, Dict, Optional
+from integrations.cassette import Cassette, get_cassette, request_key
+from integrations.rate_limiter import ProviderLimiter, estimate_tokens, get_limiter, is_rate_limit_error, usage_tokens
+
+# Default per-turn budget in seconds (0 or unset: no deadline)
+REQUEST_TIMEOUT = float(os.getenv("RAG_REQUEST_TIMEOUT", "0")) or None
+
+_deadline: ContextVar[Optional[float]] = ContextVar("upstream_deadline", default=None)
+
+# Calls under a deadline run here so the caller can stop waiting on them
+_upstream_executor = ThreadPoolExecutor(max_workers=128, thread_name_prefix="upstream")
+
+
+class DeadlineExceeded(TimeoutError):
+    """The request's time budget ran out before an upstream call finished."""
+
+
+def deadline_after(seconds: Optional[float]) -> Optional[float]:
+    """Returns the deadline `seconds` from now, or None for no budget."""
+    return time.monotonic() + seconds if seconds else None
+
+
+def current_deadline() -> Optional[float]:
+    return _deadline.get()
+
+
+def remaining(deadline: Optional[float] = None) -> Optional[float]:
+    """Seconds left before the deadline (the current one by default), or None if unbounded."""
+    deadline = current_deadline() if deadline is None else deadline
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+
+def upstream_timeout(default: float) -> float:
+    """Timeout for a client call: its usual timeout, capped by the time left."""
+    left = remaining()
+    return default if left is None else min(default, left)
+
+
+@contextmanager
+def deadline_scope(deadline: Optional[float]):
+    """
+    Applies a deadline to the calls made inside the block. Nested scopes can
+    only tighten the deadline, never extend it.
+    """
+    outer = current_deadline()
+    if deadline is None or (outer is not None and outer <= deadline):
+        yield outer
+        return
+    token = _deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _deadline.reset(token)
+
+
+def with_state_deadline(node: Callable) -> Callable:
+    """Runs a LangGraph node (or edge function) under the deadline in its state."""
+    @wraps(node)
+    def wrapper(state, *args, **kwargs):
+        with deadline_scope(state.get("deadline")):
+            return node(state, *args, **kwargs)
+    return wrapper
+
+
+# --- Hedging ---
+# A hedged call sends a duplicate request when the first has not returned
+# within the upstream's recent latency percentile; the first response wins.
+# Duplicates are capped at a share of all calls, so a slow upstream sees at
+# most (1 + budget) times its normal load.
+
+# Providers to hedge, e.g. "llm,embedding" (empty: hedging off)
+HEDGE_PROVIDERS = os.getenv("RAG_HEDGE", "")
+# Latency percentile after which the duplicate request is sent
+HEDGE_PERCENTILE = float(os.getenv("RAG_HEDGE_PERCENTILE", "95"))
+# Maximum duplicate requests as a share of calls
+HEDGE_BUDGET = float(os.getenv("RAG_HEDGE_BUDGET", "0.1"))
+# Latencies observed before hedging starts, and the rolling window size
+HEDGE_MIN_SAMPLES = 20
+HEDGE_WINDOW = 500
+
+
+def _percentile(values, p: float) -> float:
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * p / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+class HedgePolicy:
+    """Rolling latency window and hedge accounting for one named upstream."""
+
+    def __init__(self, percentile: float = HEDGE_PERCENTILE, budget: float = HEDGE_BUDGET):
+        self.percentile = percentile
+        self.budget = budget
+        self.latencies = deque(maxlen=HEDGE_WINDOW)
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._lock = threading.Lock()
+
+    def delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None while there are too few samples."""
+        with self._lock:
+            if len(self.latencies) < HEDGE_MIN_SAMPLES:
+                return None
+            return _percentile(self.latencies, self.percentile)
+
+    def record(self, latency: float):
+        with self._lock:
+            self.latencies.append(latency)
+
+    def start_call(self):
+        with self._lock:
+            self.calls += 1
+
+    def try_hedge(self) -> bool:
+        """Reserves a duplicate request if the budget allows one."""
+        with self._lock:
+            if self.hedges + 1 > self.budget * self.calls:
+                return False
+            self.hedges += 1
+            return True
+
+    def record_win(self):
+        with self._lock:
+            self.hedge_wins += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            delay = _percentile(self.latencies, self.percentile) if len(self.latencies) >= HEDGE_MIN_SAMPLES else None
+            return {
+                "calls": self.calls,
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins,
+                "hedge_rate": round(self.hedges / self.calls, 4) if self.calls else 0.0,
+                "win_rate": round(self.hedge_wins / self.hedges, 4) if self.hedges else 0.0,
+                "delay_s": round(delay, 4) if delay is not None else None,
+            }
+
+
+_hedged_providers = {p.strip() for p in HEDGE_PROVIDERS.split(",") if p.strip()}
+_hedge_settings = {"percentile": HEDGE_PERCENTILE, "budget": HEDGE_BUDGET}
+_hedge_policies: Dict[str, HedgePolicy] = {}
+_hedge_lock = threading.Lock()
+
+
+def configure_hedging(providers=None, percentile: Optional[float] = None, budget: Optional[float] = None):
+    """
+    Enables hedging for the given providers (e.g. ["llm", "embedding"]; empty
+    disables it) and resets the statistics.
+    """
+    global _hedged_providers
+    with _hedge_lock:
+        if providers is not None:
+            _hedged_providers = set(providers)
+        if percentile is not None:
+            _hedge_settings["percentile"] = percentile
+        if budget is not None:
+            _hedge_settings["budget"] = budget
+        _hedge_policies.clear()
+
+
+def hedge_stats() -> Dict[str, dict]:
+    """Per-upstream calls, hedges sent, hedge wins and current hedge delay."""
+    with _hedge_lock:
+        policies = dict(_hedge_policies)
+    return {name: policy.stats() for name, policy in sorted(policies.items())}
+
+
+def _hedge_policy(name: str) -> Optional[HedgePolicy]:
+    if name.split(":", 1)[0] not in _hedged_providers:
+        return None
+    with _hedge_lock:
+        if name not in _hedge_policies:
+            _hedge_policies[name] = HedgePolicy(**_hedge_settings)
+        return _hedge_policies[name]
+
+
+def _submit(policy: Optional[HedgePolicy], fn: Callable, args, kwargs):
+    started = time.monotonic()
+    future = _upstream_executor.submit(copy_context().run, fn, *args, **kwargs)
+    if policy is not None:
+        # Every completed request (losers included) feeds the latency window
+        future.add_done_callback(
+            lambda f: policy.record(time.monotonic() - started) if not f.cancelled() and f.exception() is None else None
+        )
+    return future
+
+
+def _admitted(limiter: ProviderLimiter, tokens: int, fn: Callable) -> Callable:
+    """Wraps fn to correct the limiter's token estimate and back off on 429s."""
+    def call(*args, **kwargs):
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            if is_rate_limit_error(e):
+                limiter.penalize()
+            raise
+        limiter.settle(tokens, usage_tokens(result))
+        return result
+    return call
+
+
+def _replay(cassette: Cassette, provider: str, key: str):
+    """Serves a call from the cassette, after its recorded latency (bounded by the deadline)."""
+    entry = cassette.lookup(provider, key)
+    delay = cassette.delay(entry)
+    left = remaining()
+    if left is not None and delay > left:
+        time.sleep(left)
+        raise DeadlineExceeded(f"{provider} call did not finish within the request deadline")
+    if delay:
+        time.sleep(delay)
+    if entry.get("error_type") == DeadlineExceeded.__name__:
+        raise DeadlineExceeded(entry["error"])
+    return Cassette.result(entry)
+
+
+def call_upstream(provider: str, fn: Callable, *args, **kwargs):
+    """
+    Calls fn(*args, **kwargs), giving up with DeadlineExceeded when the current
+    deadline passes first. provider ("llm:grader", "embedding:query",
+    "qdrant", "weather", ...) names the upstream in errors and statistics.
+
+    Rate-limited providers wait for admission first (in the current priority
+    class, see rate_limiter.priority_scope); a deadline bounds that wait too.
+
+    For hedged providers, a duplicate call is sent if the first has not
+    returned within the recent latency percentile; the first successful
+    result wins and the other is cancelled if it has not started (a running
+    call cannot be interrupted, so its result is discarded). Duplicates are
+    only sent when the rate limiter has spare capacity.
+
+    With a cassette active (see integrations/cassette.py) the call's outcome,
+    as the caller sees it, is recorded once, or served from the cassette.
+    """
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded(f"No time left for {provider} call")
+    cassette = get_cassette()
+    if cassette is None:
+        return _call(provider, fn, args, kwargs, left)
+    key = request_key(provider, args, kwargs)
+    if cassette.mode == "replay":
+        return _replay(cassette, provider, key)
+    started = time.monotonic()
+    try:
+        result = _call(provider, fn, args, kwargs, left)
+    except Exception as e:
+        cassette.record(provider, key, time.monotonic() - started, error=e)
+        raise
+    cassette.record(provider, key, time.monotonic() - started, result=result)
+    return result
+
+
+def _call(provider: str, fn: Callable, args, kwargs, left: Optional[float]):
+    limiter = get_limiter(provider)
+    tokens = 0
+    if limiter is not None:
+        tokens = estimate_tokens(provider, args)
+        if not limiter.acquire(tokens, timeout=left):
+            raise DeadlineExceeded(f"{provider} call was not admitted by the rate limiter within the request deadline")
+        fn = _admitted(limiter, tokens, fn)
+        left = remaining()
+
+    policy = _hedge_policy(provider)
+    if left is None and policy is None:
+        return fn(*args, **kwargs)
+    end = None if left is None else time.monotonic() + left
+
+    if policy is not None:
+        policy.start_call()
+    primary = _submit(policy, fn, args, kwargs)
+    futures = [primary]
+    hedge = None
+
+    delay = policy.delay() if policy is not None else None
+    if delay is not None and (left is None or delay < left):
+        done, _ = wait(futures, timeout=delay)
+        if not done and (limiter is None or limiter.try_acquire(tokens)):
+            if policy.try_hedge():
+                hedge = _submit(policy, fn, args, kwargs)
+                futures.append(hedge)
+            elif limiter is not None:
+                limiter.release(tokens)
+
+    error = None
+    while futures:
+        timeout = None if end is None else max(0.0, end - time.monotonic())
+        done, pending = wait(futures, timeout=timeout, return_when=FIRST_COMPLETED)
+        if not done:
+            for future in pending:
+                future.cancel()
+            raise DeadlineExceeded(f"{provider} call did not finish within the request deadline")
+        for future in done:
+            if future.exception() is None:
+                for other in pending:
+                    other.cancel()
+                if future is hedge:
+                    policy.record_win()
+                return future.result()
+            error = error or future.exception()
+        # A failed request only loses if its duplicate fails too
+        futures = list(pending)
+    raise error
@@ -0,0 +1,114 @@
+"""
+Near-duplicate chunk detection for ingestion.
+
+Chunks are fingerprinted with a 64-bit SimHash over word shingles. Two chunks
+whose fingerprints differ in at most `max_distance` bits are treated as
+near-duplicates (repeated headers, footers, disclaimers, duplicated pages).
+Only the first chunk of each group is kept; the source/page of every dropped
+copy is recorded as provenance against the kept representative.
+"""
+
+import hashlib
+import re
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
+from langchain_core.documents import Document
+
+FINGERPRINT_BITS = 64
+SHINGLE_SIZE = 3
+# Default Hamming distance at or below which chunks count as near-duplicates.
+# The fingerprint is split into max_distance + 1 bands, so any near-duplicate
+# shares at least one band exactly with its representative.
+MAX_DISTANCE = 3
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def simhash(text: str, shingle_size: int = SHINGLE_SIZE) -> int:
+    """
+    Computes a 64-bit SimHash fingerprint of the text over word shingles.
+    """
+    words = _WORD_RE.findall(text.lower())
+    if len(words) >= shingle_size:
+        shingles = [" ".join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)]
+    else:
+        shingles = [" ".join(words)]
+
+    weights = [0] * FINGERPRINT_BITS
+    for shingle in shingles:
+        h = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(FINGERPRINT_BITS):
+            weights[bit] += 1 if (h >> bit) & 1 else -1
+
+    fingerprint = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class NearDuplicateFilter:
+    """
+    Streaming near-duplicate filter.
+
+    Keeps one representative per duplicate group across everything passed
+    through it, so it can sit between chunking and batched upserts.
+
+    Args:
+        key: Returns the stored ID of a kept chunk; provenance is keyed by it.
+        max_distance: Maximum Hamming distance between near-duplicate fingerprints.
+    """
+
+    def __init__(self, key: Callable[[Document], str], max_distance: int = MAX_DISTANCE):
+        self.key = key
+        self.max_distance = max_distance
+        self.bands = max_distance + 1
+        self.band_bits = FINGERPRINT_BITS // self.bands
+        # band index -> band value -> [(fingerprint, representative id)]
+        self._index: List[Dict[int, List[Tuple[int, str]]]] = [{} for _ in range(self.bands)]
+        # representative id -> provenance of dropped duplicates
+        self.provenance: Dict[str, List[dict]] = {}
+        self.kept = 0
+        self.dropped = 0
+
+    def _band_values(self, fingerprint: int) -> List[int]:
+        mask = (1 << self.band_bits) - 1
+        return [(fingerprint >> (i * self.band_bits)) & mask for i in range(self.bands)]
+
+    def find_representative(self, fingerprint: int):
+        """Returns the ID of a kept chunk near the fingerprint, or None."""
+        for band, value in enumerate(self._band_values(fingerprint)):
+            for candidate, rep_id in self._index[band].get(value, []):
+                if hamming_distance(fingerprint, candidate) <= self.max_distance:
+                    return rep_id
+        return None
+
+    def add(self, doc: Document) -> bool:
+        """
+        Registers a chunk. Returns True if it should be kept, False if it is a
+        near-duplicate of an earlier chunk (its provenance is then recorded).
+        """
+        fingerprint = simhash(doc.page_content)
+        rep_id = self.find_representative(fingerprint)
+        if rep_id is not None:
+            self.provenance.setdefault(rep_id, []).append({
+                "source": doc.metadata.get("source"),
+                "page": doc.metadata.get("page"),
+            })
+            self.dropped += 1
+            return False
+
+        rep_id = self.key(doc)
+        for band, value in enumerate(self._band_values(fingerprint)):
+            self._index[band].setdefault(value, []).append((fingerprint, rep_id))
+        self.kept += 1
+        return True
+
+    def filter(self, docs: Iterable[Document]) -> Iterator[Document]:
+        """Yields only the chunks that are not near-duplicates of earlier ones."""
+        for doc in docs:
+            if self.add(doc):
+                yield doc
@@ -1,16 +1,17 @@
-from typing import List
+from typing import Iterable, Iterator, List
 from langchain_community.document_loaders import PyPDFLoader
 from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
-def load_pdf(path: str) -> List[Document]:
+def load_pdf(path: str) -> Iterator[Document]:
     """
-    Loads a PDF file and returns a list of Documents.
+    Lazily loads a PDF file, yielding one Document per page.
+    Only the current page is held in memory; wrap in list() to load everything.
     """
     loader = PyPDFLoader(path)
-    return loader.load()
+    return loader.lazy_load()
 
-def chunk_documents(docs: List[Document], chunk_size: int = 1000, overlap: int = 200) -> List[Document]:
+def chunk_documents(docs: Iterable[Document], chunk_size: int = 1000, overlap: int = 200) -> List[Document]:
     """
     Chunks a list of Documents into smaller pieces.
     """
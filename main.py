@@ -1,13 +1,67 @@
+import argparse
 import os
 from dotenv import load_dotenv
-from agents.rag_agent import build_rag_agent
-from langchain_core.messages import HumanMessage
 from integrations.langsmith import configure_tracing
 
+DEFAULT_SCRIPT = os.path.join(os.path.dirname(__file__), "perf", "conversations.jsonl")
+
+def run_script(args):
+    """
+    Runs the scripted conversations one turn at a time instead of starting the
+    interactive loop. With --profile the run is profiled, and upstreams are
+    stubbed unless a replay cassette (RAG_CASSETTE_MODE=replay) serves them.
+    """
+    import random
+    from contextlib import ExitStack
+    from integrations.cassette import get_cassette
+    from perf.loadgen import in_process_turn, load_conversations, run_load
+    from perf.profiling import profiling
+    from perf.stubs import Latencies, stubbed_upstreams
+
+    script = args.script or DEFAULT_SCRIPT
+    cassette = get_cassette()
+    replaying = cassette is not None and cassette.mode == "replay"
+    if args.profile or replaying:
+        # Keep every upstream local, LangSmith included, so runs are reproducible
+        os.environ["LANGSMITH_TRACING"] = "false"
+        os.environ["LANGCHAIN_TRACING_V2"] = "false"
+    else:
+        configure_tracing()
+    random.seed(0)
+    conversations = load_conversations(script)
+
+    with ExitStack() as stack:
+        if args.profile and not replaying:
+            stack.enter_context(stubbed_upstreams(Latencies.parse(args.latency)))
+        if args.profile:
+            stack.enter_context(profiling(args.profile, args.profile_output))
+        from agents.rag_agent import build_rag_agent
+
+        agent = build_rag_agent()
+        report = run_load(in_process_turn(agent), conversations, concurrency=1)
+    print(f"\nRan {report.turns} turns from {script} ({len(report.errors)} errors).")
+    if cassette is not None:
+        print(f"Cassette {cassette.path}: {cassette.recorded} calls recorded, {cassette.replayed} replayed.")
+
 def main():
+    from perf.profiling import PROFILE_LATENCY, PROFILE_MODES
+
+    parser = argparse.ArgumentParser(description="Chat with the RAG weather agent.")
+    parser.add_argument("--profile", choices=PROFILE_MODES, default=None,
+                        help="Profile scripted conversations against stubbed upstreams (or a replay cassette)")
+    parser.add_argument("--profile-output", default="profiles/main", help="Prefix for the profile files")
+    parser.add_argument("--script", default=None,
+                        help="Run a JSON Lines file of {\"turns\": [...]} instead of chatting (--profile default: perf/conversations.jsonl)")
+    parser.add_argument("--latency", default=PROFILE_LATENCY, help="Stub latencies (see scripts/load_test.py)")
+    args = parser.parse_args()
+
     # Load environment variables
     load_dotenv()
-    
+
+    if args.profile or args.script:
+        run_script(args)
+        return
+
     # Configure LangSmith tracing
     configure_tracing()
     
@@ -17,6 +71,11 @@ def main():
     if not os.getenv("OPENWEATHER_API_KEY"):
         print("Warning: OPENWEATHER_API_KEY not found in environment variables.")
 
+    # Heavy imports (LangGraph, LangChain, SDK clients) are deferred until after
+    # startup checks; LLM, embedding and Qdrant clients are created on first use.
+    from langchain_core.messages import HumanMessage
+    from agents.rag_agent import build_rag_agent
+
     # Build the agent
     print("Building RAG Agent...")
     agent = build_rag_agent()
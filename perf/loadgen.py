@@ -0,0 +1,126 @@
+"""
+Concurrent conversation replay for load testing.
+
+Virtual users replay multi-turn conversations, either in-process against a
+compiled agent or against an HTTP endpoint, and every turn's latency and
+outcome is recorded.
+"""
+
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional
+
+
+def percentile(values: List[float], p: float) -> float:
+    """Linear-interpolated percentile (p in 0-100) of the values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * p / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def load_conversations(path: str) -> List[List[str]]:
+    """Reads a JSON Lines corpus of {"turns": ["...", ...]} conversations."""
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line)["turns"] for line in f if line.strip()]
+
+
+@dataclass
+class LoadReport:
+    concurrency: int
+    latencies: List[float] = field(default_factory=list)
+    errors: List[str] = field(default_factory=list)
+    wall_time: float = 0.0
+
+    @property
+    def turns(self) -> int:
+        return len(self.latencies) + len(self.errors)
+
+    @property
+    def error_rate(self) -> float:
+        return len(self.errors) / self.turns if self.turns else 0.0
+
+    @property
+    def throughput(self) -> float:
+        return len(self.latencies) / self.wall_time if self.wall_time else 0.0
+
+    def summary(self) -> dict:
+        return {
+            "concurrency": self.concurrency,
+            "turns": self.turns,
+            "errors": len(self.errors),
+            "error_rate": round(self.error_rate, 4),
+            "throughput_tps": round(self.throughput, 3),
+            "p50_s": round(percentile(self.latencies, 50), 4),
+            "p95_s": round(percentile(self.latencies, 95), 4),
+            "p99_s": round(percentile(self.latencies, 99), 4),
+        }
+
+
+def in_process_turn(agent) -> Callable[[List[dict]], str]:
+    """Returns a turn function that invokes the compiled agent directly."""
+    from langchain_core.messages import AIMessage, HumanMessage
+
+    def run_turn(history: List[dict]) -> str:
+        messages = [
+            HumanMessage(content=m["content"]) if m["role"] == "user" else AIMessage(content=m["content"])
+            for m in history
+        ]
+        result = agent.invoke({"messages": messages})
+        return str(result["messages"][-1].content)
+
+    return run_turn
+
+
+def http_turn(url: str, timeout: float = 60.0) -> Callable[[List[dict]], str]:
+    """
+    Returns a turn function that POSTs {"messages": [{"role", "content"}, ...]}
+    to the endpoint and reads {"content": "..."} from the response.
+    app.py (Streamlit) does not serve this contract; scripts/serve_agent.py
+    does, or point it at your own server that implements it.
+    """
+    import requests
+
+    session = requests.Session()
+
+    def run_turn(history: List[dict]) -> str:
+        response = session.post(url, json={"messages": history}, timeout=timeout)
+        response.raise_for_status()
+        return response.json().get("content", "")
+
+    return run_turn
+
+
+def run_load(run_turn: Callable[[List[dict]], str], conversations: List[List[str]],
+             concurrency: int, total_conversations: Optional[int] = None) -> LoadReport:
+    """
+    Replays conversations with `concurrency` virtual users. Each user sends a
+    conversation's turns in order, carrying the history forward.
+    """
+    total_conversations = total_conversations or len(conversations)
+    report = LoadReport(concurrency=concurrency)
+
+    def replay(index: int):
+        history = []
+        for turn in conversations[index % len(conversations)]:
+            history.append({"role": "user", "content": turn})
+            started = time.perf_counter()
+            try:
+                answer = run_turn(history)
+            except Exception as e:
+                report.errors.append(f"{type(e).__name__}: {e}")
+                # The rest of this conversation depends on the failed turn
+                return
+            report.latencies.append(time.perf_counter() - started)
+            history.append({"role": "assistant", "content": answer})
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(replay, range(total_conversations)))
+    report.wall_time = time.perf_counter() - started
+    return report
@@ -0,0 +1,219 @@
+"""
+CPU and memory profiling of scripted conversations and ingestion runs.
+
+    with profiling("sample", "profiles/main"):
+        run_load(run_turn, conversations, concurrency=1)
+
+Modes:
+- "cprofile": deterministic profile of every thread started inside the block
+  (LangGraph nodes and upstream calls run on worker threads). Writes
+  <prefix>.prof, a pstats file for snakeviz, flameprof or `python -m pstats`.
+- "sample": wall-clock sampler reading sys._current_frames() every few
+  milliseconds. Writes <prefix>.folded, collapsed stacks for flamegraph.pl
+  or speedscope. Time spent waiting on (stubbed) upstreams appears under the
+  stub's sleep(), so Python overhead and I/O wait can be told apart.
+
+tracemalloc runs in both modes and its top allocation sites are written to
+<prefix>.alloc.txt. Its bookkeeping slows the run down, so absolute timings
+are inflated; compare profiles taken with the same settings.
+"""
+
+import cProfile
+import linecache
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+PROFILE_MODES = ("cprofile", "sample")
+# Seconds between stack samples
+SAMPLE_INTERVAL = 0.005
+# Frames kept per tracemalloc traceback
+TRACEMALLOC_FRAMES = 10
+# Fixed stub latencies for profiling runs (no jitter, so runs are comparable)
+PROFILE_LATENCY = "llm=0.3,embed=0.05,qdrant=0.01,weather=0.1"
+
+_PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def _short_path(path: str) -> str:
+    if path.startswith(_PROJECT_ROOT):
+        return os.path.relpath(path, _PROJECT_ROOT)
+    marker = f"site-packages{os.sep}"
+    if marker in path:
+        return path.split(marker, 1)[1]
+    return os.path.basename(path)
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _is_idle(stack: List) -> bool:
+    """An executor worker blocked waiting for work, which would only add noise."""
+    for index, code in enumerate(stack):
+        if code.co_name == "_worker" and code.co_filename.endswith(os.path.join("concurrent", "futures", "thread.py")):
+            return all(
+                os.path.basename(c.co_filename) in ("queue.py", "threading.py")
+                for c in stack[index + 1:]
+            )
+    return False
+
+
+class StackSampler:
+    """Samples the stacks of all threads into collapsed-stack counts."""
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self.counts: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(frame.f_code)
+                    frame = frame.f_back
+                stack.reverse()
+                if _is_idle(stack):
+                    continue
+                # Pool threads are merged, e.g. "ThreadPoolExecutor-0_3" -> "ThreadPoolExecutor-0"
+                thread = re.sub(r"_\d+$", "", names.get(thread_id, str(thread_id)))
+                self.counts[";".join([thread] + [_frame_label(code) for code in stack])] += 1
+            self.samples += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def write_folded(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in sorted(self.counts.items()):
+                f.write(f"{stack} {count}\n")
+
+    def top_frames(self, limit: int) -> List[tuple]:
+        """(label, samples) of the functions most often at the top of a stack (self time)."""
+        leaves: Dict[str, int] = Counter()
+        for stack, count in self.counts.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        return leaves.most_common(limit)
+
+
+class ThreadProfiler:
+    """cProfile for the current thread and every thread started while enabled."""
+
+    def __init__(self):
+        self.profiles: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+
+    def _start_thread(self, frame, event, arg):
+        # Runs as the first profile event of a new thread; enable() replaces this hook
+        profile = cProfile.Profile()
+        with self._lock:
+            self.profiles.append(profile)
+        profile.enable()
+
+    def start(self):
+        threading.setprofile(self._start_thread)
+        self._start_thread(None, None, None)
+
+    def stop(self):
+        threading.setprofile(None)
+        # Only the current thread's profile can be disabled; the others stop
+        # counting once their threads go idle
+        self.profiles[0].disable()
+
+    def stats(self) -> pstats.Stats:
+        with self._lock:
+            profiles = list(self.profiles)
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            profile.create_stats()
+            stats.add(profile)
+        return stats
+
+
+def write_allocation_report(snapshot: tracemalloc.Snapshot, path: str, top: int = 25):
+    """Writes the top allocation sites by size, with the source line and the calling stack."""
+    snapshot = snapshot.filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        # The sampler's own stack counts
+        tracemalloc.Filter(False, __file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        tracemalloc.Filter(False, "<unknown>"),
+    ])
+    current, peak = tracemalloc.get_traced_memory()
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f"Traced memory: {current / 1024:.1f} KiB live, {peak / 1024:.1f} KiB peak\n\n")
+        f.write(f"Top {top} allocation sites by live size:\n")
+        for stat in snapshot.statistics("lineno")[:top]:
+            frame = stat.traceback[0]
+            line = linecache.getline(frame.filename, frame.lineno).strip()
+            f.write(f"  {stat.size / 1024:9.1f} KiB {stat.count:7} blocks  {_short_path(frame.filename)}:{frame.lineno}  {line}\n")
+        f.write(f"\nTop {min(top, 10)} allocating call stacks:\n")
+        for stat in snapshot.statistics("traceback")[:min(top, 10)]:
+            f.write(f"\n  {stat.size / 1024:.1f} KiB in {stat.count} blocks\n")
+            for frame in stat.traceback.format(most_recent_first=True):
+                f.write(f"    {frame}\n")
+
+
+@contextmanager
+def profiling(mode: str, output_prefix: str, interval: float = SAMPLE_INTERVAL, top: int = 20,
+              trace_allocations: bool = True):
+    """
+    Profiles the block with cProfile or the stack sampler (see module docstring)
+    and writes the results under output_prefix. Prints the hottest functions.
+    """
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"Unknown profile mode '{mode}', expected one of {PROFILE_MODES}")
+    os.makedirs(os.path.dirname(output_prefix) or ".", exist_ok=True)
+
+    if trace_allocations:
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+    profiler = ThreadProfiler() if mode == "cprofile" else StackSampler(interval)
+    started = time.perf_counter()
+    profiler.start()
+    try:
+        yield
+    finally:
+        profiler.stop()
+        elapsed = time.perf_counter() - started
+        snapshot: Optional[tracemalloc.Snapshot] = None
+        if trace_allocations:
+            snapshot = tracemalloc.take_snapshot()
+
+        print(f"\nProfiled {elapsed:.2f}s ({mode}).")
+        if mode == "cprofile":
+            stats = profiler.stats()
+            stats.dump_stats(f"{output_prefix}.prof")
+            print(f"Wrote {output_prefix}.prof ({len(profiler.profiles)} threads)")
+            stats.sort_stats("cumulative").print_stats(top)
+        else:
+            profiler.write_folded(f"{output_prefix}.folded")
+            print(f"Wrote {output_prefix}.folded ({profiler.samples} samples every {interval * 1000:.0f} ms)")
+            # Shares are of sampling rounds; busy threads overlap, so they can sum past 100%
+            print(f"Top {top} functions by self samples:")
+            for label, count in profiler.top_frames(top):
+                print(f"  {count:7} {100 * count / max(profiler.samples, 1):6.1f}%  {label}")
+
+        if snapshot is not None:
+            write_allocation_report(snapshot, f"{output_prefix}.alloc.txt")
+            tracemalloc.stop()
+            print(f"Wrote {output_prefix}.alloc.txt")
@@ -0,0 +1,106 @@
+"""
+Offline retrieval evaluation against a golden query set.
+
+Each golden entry names the source files that should back the answer. The
+advanced retriever is run per query, and quality (recall@k) and cost (rewrite
+iterations, LLM calls, context size, latency) are aggregated. Metrics are then compared to a
+stored baseline so that changes to chunking, k, score_threshold or the prompts
+that silently trigger more rewrite loops fail the gate.
+"""
+
+import json
+import os
+import time
+from typing import List
+
+from perf.loadgen import percentile
+
+# Allowed change versus the baseline before a metric counts as a regression
+TOLERANCES = {
+    "recall_at_k": 0.02,        # absolute drop
+    "avg_rewrites": 0.10,       # absolute increase
+    "avg_llm_calls": 0.10,      # absolute increase
+    "avg_context_chars": 0.10,  # relative increase (prompt size sent to the grader/chatbot)
+    "p95_latency_s": 0.25,      # relative increase (only with check_latency)
+}
+
+
+def load_golden(path: str) -> List[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _source_name(doc) -> str:
+    return doc.metadata.get("file_name") or os.path.basename(str(doc.metadata.get("source", "")))
+
+
+def evaluate(golden: List[dict]) -> dict:
+    """
+    Runs every golden query through the advanced retriever and returns
+    aggregate metrics plus per-query details.
+    """
+    from tools import advanced_retriever
+    from tools.compression import compression_enabled
+    from tools.question_index import question_index_enabled
+
+    recalls, rewrites, llm_calls, context_chars, latencies, details = [], [], [], [], [], []
+    for entry in golden:
+        started = time.perf_counter()
+        state = advanced_retriever.run_advanced_retriever(entry["query"], entry.get("filters"))
+        latency = time.perf_counter() - started
+
+        expected = set(entry["expected_sources"])
+        retrieved = {_source_name(doc) for doc in state.get("documents", [])}
+        recall = len(expected & retrieved) / len(expected) if expected else 1.0
+
+        recalls.append(recall)
+        rewrites.append(state["retry_count"])
+        llm_calls.append(state.get("llm_calls", 0))
+        context_chars.append(len(state.get("context", "")) if state.get("is_relevant") else 0)
+        latencies.append(latency)
+        details.append({
+            "query": entry["query"],
+            "recall": recall,
+            "rewrites": state["retry_count"],
+            "llm_calls": state.get("llm_calls", 0),
+            "context_chars": context_chars[-1],
+            "retrieved": sorted(retrieved),
+        })
+
+    count = len(golden) or 1
+    return {
+        "queries": len(golden),
+        "config": {
+            "k": advanced_retriever.RETRIEVAL_K,
+            "score_threshold": advanced_retriever.SCORE_THRESHOLD,
+            "max_retries": advanced_retriever.MAX_RETRIES,
+            "compression": compression_enabled(),
+            "question_index": question_index_enabled(),
+        },
+        "recall_at_k": round(sum(recalls) / count, 4),
+        "avg_rewrites": round(sum(rewrites) / count, 4),
+        "avg_llm_calls": round(sum(llm_calls) / count, 4),
+        "avg_context_chars": round(sum(context_chars) / count, 1),
+        "p50_latency_s": round(percentile(latencies, 50), 4),
+        "p95_latency_s": round(percentile(latencies, 95), 4),
+        "details": details,
+    }
+
+
+def compare(metrics: dict, baseline: dict, check_latency: bool = False) -> List[str]:
+    """Returns a message for every metric that regressed beyond its tolerance."""
+    regressions = []
+    if metrics["recall_at_k"] < baseline["recall_at_k"] - TOLERANCES["recall_at_k"]:
+        regressions.append(f"recall@k dropped: {baseline['recall_at_k']} -> {metrics['recall_at_k']}")
+    for key in ("avg_rewrites", "avg_llm_calls"):
+        if metrics[key] > baseline[key] + TOLERANCES[key]:
+            regressions.append(f"{key} increased: {baseline[key]} -> {metrics[key]}")
+    if baseline.get("avg_context_chars"):
+        limit = baseline["avg_context_chars"] * (1 + TOLERANCES["avg_context_chars"])
+        if metrics["avg_context_chars"] > limit:
+            regressions.append(f"avg_context_chars increased: {baseline['avg_context_chars']} -> {metrics['avg_context_chars']}")
+    if check_latency and baseline.get("p95_latency_s"):
+        limit = baseline["p95_latency_s"] * (1 + TOLERANCES["p95_latency_s"])
+        if metrics["p95_latency_s"] > limit:
+            regressions.append(f"p95 latency increased: {baseline['p95_latency_s']}s -> {metrics['p95_latency_s']}s")
+    return regressions
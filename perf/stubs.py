@@ -0,0 +1,324 @@
+"""
+Local stand-ins for the agent's upstreams (OpenAI, Cohere, Qdrant, OpenWeatherMap).
+
+Each stub sleeps for a latency drawn from a configurable distribution, so the
+agent's own CPU work and concurrency behaviour can be measured without network
+access or API keys. Used by the load-testing and profiling scripts.
+
+    with stubbed_upstreams(Latencies.parse("llm=0.6:0.4,embed=0.08")):
+        agent = build_rag_agent()
+        agent.invoke(...)
+"""
+
+import hashlib
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass, field
+from typing import Any, List, Optional
+from unittest.mock import patch
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import RunnableLambda
+
+EMBEDDING_SIZE = 1024
+
+
+@dataclass
+class LatencyModel:
+    """Log-normal latency with the given median (seconds) and sigma; 0 disables."""
+    median: float = 0.0
+    sigma: float = 0.0
+
+    def sample(self) -> float:
+        if self.median <= 0:
+            return 0.0
+        if self.sigma <= 0:
+            return self.median
+        return random.lognormvariate(math.log(self.median), self.sigma)
+
+    def sleep(self):
+        delay = self.sample()
+        if delay:
+            time.sleep(delay)
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyModel":
+        """Parses "median" or "median:sigma", e.g. "0.5:0.3"."""
+        median, _, sigma = spec.partition(":")
+        return cls(float(median), float(sigma or 0))
+
+
+@dataclass
+class Latencies:
+    llm: LatencyModel = field(default_factory=LatencyModel)
+    embed: LatencyModel = field(default_factory=LatencyModel)
+    qdrant: LatencyModel = field(default_factory=LatencyModel)
+    weather: LatencyModel = field(default_factory=LatencyModel)
+    # Probability that the stub grader accepts documents that pass its word-overlap
+    # check; lower values exercise the rewrite loop
+    relevance_rate: float = 1.0
+    # Probability that any stubbed call raises, to exercise error paths
+    error_rate: float = 0.0
+
+    @classmethod
+    def parse(cls, spec: str) -> "Latencies":
+        """
+        Parses "llm=0.6:0.4,embed=0.08:0.2,qdrant=0.01,weather=0.2,relevance=0.7,errors=0.01".
+        """
+        latencies = cls()
+        for item in filter(None, (part.strip() for part in spec.split(","))):
+            name, _, value = item.partition("=")
+            if name == "relevance":
+                latencies.relevance_rate = float(value)
+            elif name == "errors":
+                latencies.error_rate = float(value)
+            elif name in ("llm", "embed", "qdrant", "weather"):
+                setattr(latencies, name, LatencyModel.parse(value))
+            else:
+                raise ValueError(f"Unknown upstream '{name}' in latency spec")
+        return latencies
+
+    def maybe_fail(self, upstream: str):
+        if self.error_rate and random.random() < self.error_rate:
+            raise RuntimeError(f"Injected {upstream} failure")
+
+
+class StubEmbeddings(Embeddings):
+    """
+    Hashed bag-of-words embeddings: texts sharing words get similar vectors,
+    so stubbed searches return plausible hits.
+    """
+
+    def __init__(self, latencies: Optional[Latencies] = None, size: int = EMBEDDING_SIZE):
+        self.latencies = latencies or Latencies()
+        self.size = size
+
+    def _embed(self, text: str) -> List[float]:
+        vector = [0.0] * self.size
+        for word in re.findall(r"\w+", text.lower()):
+            vector[int(hashlib.md5(word.encode()).hexdigest()[:8], 16) % self.size] += 1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.latencies.maybe_fail("embedding")
+        self.latencies.embed.sleep()
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+class StubChatModel(BaseChatModel):
+    """
+    Scripted chat model. With tools bound it calls weather_tool for messages
+    mentioning weather and retriever_tool otherwise, then answers once it has a
+    tool result. Without tools (the rewriter) it echoes a rewritten question.
+    """
+
+    latencies: Any = None
+    tool_names: List[str] = []
+    # Bound with tool_choice="none": must answer without calling a tool
+    answer_only: bool = False
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub-chat"
+
+    def bind_tools(self, tools, **kwargs):
+        names = [getattr(t, "name", None) or t.get("name") for t in tools]
+        return self.model_copy(update={"tool_names": names, "answer_only": kwargs.get("tool_choice") == "none"})
+
+    def with_structured_output(self, schema, **kwargs):
+        if "passages" in schema.model_fields:
+            return RunnableLambda(lambda messages: self._questions(schema, messages))
+
+        def grade(messages):
+            # Grader prompt (tools/prompts.py GRADE_PROMPT): relevant when most of the
+            # question's longer words appear in the retrieved document
+            self.latencies.maybe_fail("llm")
+            self.latencies.llm.sleep()
+            prompt = messages[-1]["content"]
+            document, _, question = prompt.partition("Here is the user question:")
+            words = {w for w in re.findall(r"\w+", question.split("\n")[0].lower()) if len(w) > 3}
+            overlap = len([w for w in words if w in document.lower()]) / (len(words) or 1)
+            relevant = overlap >= 0.5 and random.random() < self.latencies.relevance_rate
+            return schema(binary_score="yes" if relevant else "no")
+
+        return RunnableLambda(grade)
+
+    def _questions(self, schema, messages):
+        # Question generator (tools/prompts.py SYNTHETIC_QUESTIONS_PROMPT): two
+        # questions per "[n] passage", phrased from the passage's own words
+        self.latencies.maybe_fail("llm")
+        self.latencies.llm.sleep()
+        passages = []
+        for number, text in re.findall(r"^\[(\d+)\] (.+)$", messages[-1]["content"], re.MULTILINE):
+            words = re.findall(r"[A-Za-z']+", text)
+            questions = [f"What is {' '.join(words[:6])}?", f"Which {' '.join(words[-5:])}?"]
+            passages.append({"passage": int(number), "questions": questions})
+        return schema(passages=passages)
+
+    def _reply(self, messages) -> AIMessage:
+        last = messages[-1]
+        if not self.tool_names:
+            # Rewriter: return the question between the REWRITE_PROMPT markers
+            parts = str(last.content).split("------- \n")
+            question = parts[1].strip() if len(parts) > 2 else str(last.content)
+            return AIMessage(content=f"Information about {question}")
+        if isinstance(last, ToolMessage):
+            return AIMessage(content=f"Based on the tools: {str(last.content)[:200]}")
+        if self.answer_only:
+            return AIMessage(content=f"Without tools: {str(last.content)[:200]}")
+        if isinstance(last, HumanMessage):
+            text = str(last.content)
+            if "weather" in text.lower() and "weather_tool" in self.tool_names:
+                words = re.findall(r"[A-Z][a-z]+", text)
+                city = words[-1] if len(words) > 1 else "London"
+                call = {"name": "weather_tool", "args": {"city": city}}
+            else:
+                call = {"name": "retriever_tool", "args": {"query": text}}
+            call["id"] = f"call_{uuid.uuid4().hex[:16]}"
+            return AIMessage(content="", tool_calls=[call])
+        return AIMessage(content="OK.")
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        self.latencies.maybe_fail("llm")
+        self.latencies.llm.sleep()
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
+
+
+def make_stub_qdrant_client(latencies: Latencies):
+    """Returns an in-memory QdrantClient whose searches and writes sleep first."""
+    from qdrant_client import QdrantClient
+
+    class StubQdrantClient(QdrantClient):
+        def query_points(self, *args, **kwargs):
+            latencies.maybe_fail("qdrant")
+            latencies.qdrant.sleep()
+            return super().query_points(*args, **kwargs)
+
+        def upsert(self, *args, **kwargs):
+            latencies.qdrant.sleep()
+            return super().upsert(*args, **kwargs)
+
+    return StubQdrantClient(location=":memory:")
+
+
+def make_stub_weather(latencies: Latencies):
+    def fetch_weather(city: str) -> dict:
+        latencies.maybe_fail("weather")
+        latencies.weather.sleep()
+        return {"city": city, "description": "scattered clouds", "temp_c": 18, "humidity_pct": 60, "wind_mps": 3.1}
+
+    return fetch_weather
+
+
+# Small knowledge base indexed into the stub vector store, as (file name, text)
+SEED_DOCUMENTS = [
+    ("Akash_Profile.pdf", "Akash Kumar Shaw is a Gen AI Developer at TCS working in the BFSI sector."),
+    ("Akash_Profile.pdf", "Akash Kumar Shaw builds retrieval-augmented generation systems with LangChain and LangGraph."),
+    ("Akash_Profile.pdf", "Akash's skills include Python, vector databases such as Qdrant, and prompt engineering."),
+    ("Akash_Profile.pdf", "Akash Kumar Shaw studied computer science and has worked on document intelligence projects."),
+    ("rag_weather_agent.pdf", "The RAG weather agent combines OpenWeatherMap lookups with PDF question answering."),
+    ("rag_weather_agent.pdf", "Qdrant stores document chunk embeddings and supports filtered similarity search."),
+]
+
+
+def seed_collection(collection_name: str, documents: List[tuple] = SEED_DOCUMENTS):
+    """
+    Indexes the seed documents into the (stubbed) vector store, with their
+    synthetic questions when RAG_QUESTION_INDEX is on.
+    """
+    from integrations.qdrant_client import create_collection, upsert_documents
+    from tools.question_index import index_questions, question_index_enabled
+
+    create_collection(collection_name, vector_size=EMBEDDING_SIZE)
+    docs = [
+        Document(page_content=text, metadata={"source": f"data/{file_name}", "file_name": file_name, "page": i})
+        for i, (file_name, text) in enumerate(documents)
+    ]
+    upsert_documents(collection_name, docs)
+    if question_index_enabled():
+        index_questions(collection_name, docs)
+
+
+_stub_lock = threading.Lock()
+
+
+@contextmanager
+def stubbed_upstreams(latencies: Optional[Latencies] = None, seed: bool = True):
+    """
+    Replaces the LLM, embedding, Qdrant and weather clients with local stubs
+    for the duration of the block. Rate limits are lifted inside the block;
+    call configure_rate_limits() within it to model provider quotas.
+    """
+    from integrations.rate_limiter import configure_rate_limits
+    from integrations import qdrant_client
+    from integrations.qdrant_client import COLLECTION_NAME
+    from integrations.embedding_cache import EmbeddingCache
+
+    latencies = latencies or Latencies()
+    embeddings = StubEmbeddings(latencies)
+    client = make_stub_qdrant_client(latencies)
+    models = {}
+    sentence_cache = EmbeddingCache(":memory:")
+
+    def get_chat_model(model: str, temperature: float = 0, max_completion_tokens: Optional[int] = None):
+        with _stub_lock:
+            if model not in models:
+                models[model] = StubChatModel(latencies=latencies)
+            return models[model]
+
+    targets = {
+        # Factories are patched where they are looked up, not where they are defined
+        "agents.rag_agent.get_chat_model": get_chat_model,
+        "tools.advanced_retriever.get_chat_model": get_chat_model,
+        "tools.question_index.get_chat_model": get_chat_model,
+        "integrations.qdrant_client.get_embeddings": lambda: embeddings,
+        "agents.router.get_embeddings": lambda: embeddings,
+        "tools.compression.get_embeddings": lambda: embeddings,
+        "tools.compression.get_sentence_cache": lambda: sentence_cache,
+        "integrations.qdrant_client.get_qdrant_client": lambda: client,
+        "agents.rag_agent.fetch_weather": make_stub_weather(latencies),
+    }
+
+    qdrant_client.get_vector_store.cache_clear()
+    qdrant_client._search_params_cache.clear()
+    qdrant_client._alias_cache.clear()
+    with ExitStack() as stack:
+        for target, replacement in targets.items():
+            stack.enter_context(patch(target, replacement))
+        configure_rate_limits({})
+        stack.callback(configure_rate_limits)
+        # Drop clients cached by earlier, unstubbed calls
+        stack.callback(qdrant_client.get_vector_store.cache_clear)
+        stack.callback(qdrant_client._search_params_cache.clear)
+        stack.callback(qdrant_client._alias_cache.clear)
+        from tools import advanced_retriever
+        from agents import router
+        from tools import question_index
+        advanced_retriever.get_grader_llm.cache_clear()
+        stack.callback(advanced_retriever.get_grader_llm.cache_clear)
+        question_index.get_question_llm.cache_clear()
+        stack.callback(question_index.get_question_llm.cache_clear)
+        router._kb_classifier._matrix = None
+        stack.callback(setattr, router._kb_classifier, "_matrix", None)
+
+        if seed:
+            seed_latencies = (latencies.llm, latencies.embed, latencies.qdrant)
+            latencies.llm, latencies.embed, latencies.qdrant = LatencyModel(), LatencyModel(), LatencyModel()
+            try:
+                seed_collection(COLLECTION_NAME)
+            finally:
+                latencies.llm, latencies.embed, latencies.qdrant = seed_latencies
+        yield latencies
@@ -0,0 +1,87 @@
+"""
+Retrieval quality-and-cost regression gate.
+
+Runs the golden query set through the advanced retriever and compares
+recall@k, average rewrite iterations, LLM calls and context size per query
+(and optionally p95 latency) with the stored baseline. Exits with status 1 on regression.
+
+Usage:
+    python scripts/eval_retrieval.py                     # live upstreams
+    python scripts/eval_retrieval.py --stub              # offline, stubbed upstreams
+    python scripts/eval_retrieval.py --stub --update-baseline
+"""
+import argparse
+import json
+import os
+import random
+import sys
+from contextlib import nullcontext
+from dotenv import load_dotenv
+
+# Add project root to sys.path to allow imports from tools and perf
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from perf.retrieval_eval import load_golden, evaluate, compare
+from perf.stubs import Latencies, stubbed_upstreams
+
+PERF_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'perf'))
+
+def main():
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Evaluate retrieval quality and cost against a baseline.")
+    parser.add_argument("--golden", default=os.path.join(PERF_DIR, "golden_queries.jsonl"))
+    parser.add_argument("--baseline", default=None,
+                        help="Defaults to perf/retrieval_baseline[_stub].json")
+    parser.add_argument("--stub", action="store_true", help="Use stubbed upstreams and the seed corpus")
+    parser.add_argument("--latency", default="",
+                        help="Stub latency/relevance spec (see scripts/load_test.py)")
+    parser.add_argument("--check-latency", action="store_true", help="Also gate on p95 latency")
+    parser.add_argument("--update-baseline", action="store_true", help="Write the results as the new baseline")
+    parser.add_argument("--verbose", action="store_true", help="Print per-query results")
+    args = parser.parse_args()
+
+    baseline_path = args.baseline or os.path.join(
+        PERF_DIR, "retrieval_baseline_stub.json" if args.stub else "retrieval_baseline.json"
+    )
+    golden = load_golden(args.golden)
+
+    if args.stub:
+        # Fix the seed so stubbed runs with relevance < 1 stay comparable
+        random.seed(0)
+        context = stubbed_upstreams(Latencies.parse(args.latency))
+    else:
+        context = nullcontext()
+    with context:
+        metrics = evaluate(golden)
+
+    if args.verbose:
+        for detail in metrics["details"]:
+            print(f"  recall={detail['recall']:.2f} rewrites={detail['rewrites']} "
+                  f"llm_calls={detail['llm_calls']} {detail['query']}")
+    summary = {key: value for key, value in metrics.items() if key != "details"}
+    print(json.dumps(summary, indent=2))
+
+    if args.update_baseline:
+        with open(baseline_path, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+            f.write("\n")
+        print(f"Baseline written to {baseline_path}")
+        return
+
+    if not os.path.exists(baseline_path):
+        print(f"No baseline at {baseline_path}; run with --update-baseline first.")
+        sys.exit(1)
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    regressions = compare(metrics, baseline, check_latency=args.check_latency)
+    if regressions:
+        print("Regressions against baseline:")
+        for regression in regressions:
+            print(f"  - {regression}")
+        sys.exit(1)
+    print("No regressions against baseline.")
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,15 @@
+"""
+Index the PDFs in the data directory into Qdrant.
+
+Usage:
+    python scripts/ingest_data.py [--data-dir data]
+    python scripts/ingest_data.py --profile sample   # profile an ingest against stubbed upstreams
+"""
+import argparse
 import os
 import glob
 import sys
+from contextlib import ExitStack
 from dotenv import load_dotenv
 
 # Add project root to sys.path to allow imports from tools
@@ -8,11 +17,38 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from tools.retriever import index_pdf_documents
 
+def profiled(args, stack: ExitStack):
+    """
+    Enters stubbed embedding and Qdrant clients (PDF loading and chunking stay
+    real) and the profiler, so an ingest can be profiled offline. A replay
+    cassette (RAG_CASSETTE_MODE=replay) takes the place of the stubs.
+    """
+    import random
+    from integrations.cassette import get_cassette
+    from perf.profiling import profiling
+    from perf.stubs import Latencies, stubbed_upstreams
+
+    random.seed(0)
+    cassette = get_cassette()
+    if cassette is None or cassette.mode != "replay":
+        stack.enter_context(stubbed_upstreams(Latencies.parse(args.latency), seed=False))
+    stack.enter_context(profiling(args.profile, args.profile_output))
+
 def main():
+    from perf.profiling import PROFILE_LATENCY, PROFILE_MODES
+
+    parser = argparse.ArgumentParser(description="Index the PDFs in a directory into Qdrant.")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--profile", choices=PROFILE_MODES, default=None,
+                        help="Profile the ingest against stubbed upstreams")
+    parser.add_argument("--profile-output", default="profiles/ingest", help="Prefix for the profile files")
+    parser.add_argument("--latency", default=PROFILE_LATENCY, help="Stub latencies (see scripts/load_test.py)")
+    args = parser.parse_args()
+
     # Load environment variables
     load_dotenv()
     
-    data_dir = "data"
+    data_dir = args.data_dir
     if not os.path.exists(data_dir):
         print(f"Directory '{data_dir}' does not exist.")
         return
@@ -29,11 +65,14 @@ def main():
         print(f" - {f}")
 
     print("\nStarting ingestion...")
-    try:
-        index_pdf_documents(pdf_files)
-        print("\nIngestion complete!")
-    except Exception as e:
-        print(f"\nError during ingestion: {e}")
+    with ExitStack() as stack:
+        if args.profile:
+            profiled(args, stack)
+        try:
+            index_pdf_documents(pdf_files)
+            print("\nIngestion complete!")
+        except Exception as e:
+            print(f"\nError during ingestion: {e}")
 
 if __name__ == "__main__":
     main()
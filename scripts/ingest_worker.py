@@ -0,0 +1,96 @@
+"""
+Long-running ingestion worker.
+
+Watches the data directory and indexes new and changed PDFs in the background
+(removed PDFs are dropped from the index), with lowered CPU priority and
+throttled embedding. Other processes can queue work and check on it.
+
+Usage:
+    python scripts/ingest_worker.py run [--data-dir data] [--rate 20] [--once]
+    python scripts/ingest_worker.py submit data/report.pdf [--priority 0] [--delete]
+    python scripts/ingest_worker.py status [--limit 20]
+"""
+import argparse
+import os
+import sys
+from datetime import datetime
+from dotenv import load_dotenv
+
+# Add project root to sys.path to allow imports from workers
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from workers.ingest_worker import (
+    INGEST_STATE_DIR, POLL_INTERVAL, PRIORITY_SUBMITTED, IngestWorker, submit_job, read_status
+)
+
+def run(args):
+    worker = IngestWorker(
+        watch_dir=args.data_dir,
+        state_dir=args.state_dir,
+        max_chunks_per_second=args.rate,
+        poll_interval=args.poll_interval,
+    )
+    if args.once:
+        # A new file needs two scans to be considered fully written
+        worker.scan_directory()
+        print(f"Ran {worker.run_once()} job(s).")
+        return
+    try:
+        worker.run(niceness=args.niceness)
+    except KeyboardInterrupt:
+        print("\nStopped.")
+
+def submit(args):
+    action = "delete" if args.delete else "index"
+    for path in args.paths:
+        job_id = submit_job(path, priority=args.priority, action=action, state_dir=args.state_dir)
+        print(f"Queued {action} of {path} as job {job_id}")
+
+def status(args):
+    data = read_status(args.state_dir)
+    worker = data.get("worker")
+    if not worker:
+        print("No worker status found.")
+        return
+    updated = datetime.fromtimestamp(worker["updated_at"]).strftime("%Y-%m-%d %H:%M:%S")
+    print(f"Worker pid {worker['pid']} watching '{worker['watch_dir']}' -> '{worker['collection']}' "
+          f"({worker['queued']} queued, updated {updated})")
+    for job in data["jobs"][-args.limit:]:
+        took = f"{job['finished_at'] - job['started_at']:.1f}s" if job.get("finished_at") and job.get("started_at") else ""
+        line = f"  {job['id']} {job['status']:<8} {job['action']:<6} p{job['priority']:<3} {job['path']} {job['chunks']} chunks {took}"
+        if job.get("error"):
+            line += f" ({job['error']})"
+        print(line)
+
+def main():
+    # Load environment variables
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Index PDFs in the background as they change.")
+    parser.add_argument("--state-dir", default=INGEST_STATE_DIR)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Watch the data directory and process jobs")
+    run_parser.add_argument("--data-dir", default="data")
+    run_parser.add_argument("--rate", type=float, default=float(os.getenv("INGEST_MAX_CHUNKS_PER_SECOND", "0")) or None,
+                            help="Max chunks embedded per second")
+    run_parser.add_argument("--poll-interval", type=float, default=POLL_INTERVAL)
+    run_parser.add_argument("--niceness", type=int, default=10, help="Added to the process nice value")
+    run_parser.add_argument("--once", action="store_true", help="Process pending work and exit")
+    run_parser.set_defaults(func=run)
+
+    submit_parser = subparsers.add_parser("submit", help="Queue files for (re)indexing")
+    submit_parser.add_argument("paths", nargs="+")
+    submit_parser.add_argument("--priority", type=int, default=PRIORITY_SUBMITTED, help="Lower runs first")
+    submit_parser.add_argument("--delete", action="store_true", help="Remove the files' chunks instead")
+    submit_parser.set_defaults(func=submit)
+
+    status_parser = subparsers.add_parser("status", help="Show the worker's recent jobs")
+    status_parser.add_argument("--limit", type=int, default=20)
+    status_parser.set_defaults(func=status)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
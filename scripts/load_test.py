@@ -0,0 +1,120 @@
+"""
+Load test the agent with concurrent multi-turn conversations.
+
+By default the agent runs in-process with every upstream (LLM, embeddings,
+Qdrant, weather) replaced by local stubs that inject the given latencies.
+Use --live for the real upstreams, or --url to target an HTTP server that
+takes POST {"messages": [{"role", "content"}, ...]} and returns
+{"content": "..."}, such as scripts/serve_agent.py. The Streamlit app does
+not serve this.
+
+Usage:
+    python scripts/load_test.py --concurrency 1,4,16,32 --conversations 64 \
+        --latency "llm=0.6:0.4,embed=0.08:0.3,qdrant=0.01,weather=0.2:0.5"
+    python scripts/load_test.py --concurrency 16 --rate-limits "openai=500:200000,cohere=2000"
+    python scripts/serve_agent.py --port 8000 &
+    python scripts/load_test.py --url http://localhost:8000/chat --concurrency 8
+"""
+import argparse
+import json
+import os
+import sys
+from contextlib import nullcontext
+from dotenv import load_dotenv
+
+# Add project root to sys.path to allow imports from agents and perf
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from perf.loadgen import load_conversations, run_load, in_process_turn, http_turn
+from perf.stubs import Latencies, stubbed_upstreams
+from integrations.upstream import configure_hedging, hedge_stats
+from integrations.rate_limiter import configure_rate_limits, rate_limit_stats
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), '..', 'perf', 'conversations.jsonl')
+DEFAULT_LATENCY = "llm=0.6:0.4,embed=0.08:0.3,qdrant=0.01:0.3,weather=0.2:0.5"
+
+def parse_quotas(spec: str) -> dict:
+    """Parses "openai=500:200000,cohere=2000" into {quota: (requests/min, tokens/min)}."""
+    quotas = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, value = item.partition("=")
+        rpm, _, tpm = value.partition(":")
+        quotas[name] = (float(rpm), float(tpm or 0))
+    return quotas
+
+def main():
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Replay conversations against the agent under load.")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="JSON Lines file of {\"turns\": [...]}")
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated concurrency levels")
+    parser.add_argument("--conversations", type=int, default=None,
+                        help="Conversations per level (default: corpus size)")
+    parser.add_argument("--latency", default=DEFAULT_LATENCY,
+                        help="Stub latencies, e.g. llm=0.6:0.4,embed=0.08,relevance=0.7,errors=0.01")
+    parser.add_argument("--live", action="store_true", help="Use the real upstreams instead of stubs")
+    parser.add_argument("--url", default=None, help="POST {\"messages\": [...]} to this URL and read {\"content\"} from the response, "
+                             "e.g. scripts/serve_agent.py at http://localhost:8000/chat (app.py does not serve it)")
+    parser.add_argument("--deadline", type=float, default=None,
+                        help="Per-turn budget in seconds (in-process only; default RAG_REQUEST_TIMEOUT)")
+    parser.add_argument("--hedge", default=None,
+                        help="Hedge these providers, e.g. llm,embedding (in-process only; default RAG_HEDGE)")
+    parser.add_argument("--rate-limits", default=None,
+                        help="Provider quotas for stubbed runs, e.g. openai=500:200000,cohere=2000 (default: unlimited)")
+    parser.add_argument("--json", default=None, help="Also write the report to this file")
+    args = parser.parse_args()
+
+    conversations = load_conversations(args.corpus)
+    levels = [int(level) for level in args.concurrency.split(",")]
+
+    if args.url or args.live:
+        context = nullcontext()
+    else:
+        context = stubbed_upstreams(Latencies.parse(args.latency))
+
+    if args.hedge is not None:
+        configure_hedging([p for p in args.hedge.split(",") if p])
+
+    summaries = []
+    with context:
+        if args.rate_limits is not None:
+            configure_rate_limits(parse_quotas(args.rate_limits))
+        if args.url:
+            run_turn = http_turn(args.url)
+        else:
+            from agents.rag_agent import build_rag_agent
+            run_turn = in_process_turn(build_rag_agent(request_timeout=args.deadline))
+
+        print(f"{'conc':>5} {'turns':>6} {'errors':>7} {'err%':>6} {'turns/s':>8} {'p50 s':>7} {'p95 s':>7} {'p99 s':>7}")
+        for concurrency in levels:
+            report = run_load(run_turn, conversations, concurrency, args.conversations)
+            summary = report.summary()
+            summaries.append(summary)
+            print(f"{summary['concurrency']:>5} {summary['turns']:>6} {summary['errors']:>7} "
+                  f"{summary['error_rate'] * 100:>5.1f}% {summary['throughput_tps']:>8.2f} "
+                  f"{summary['p50_s']:>7.3f} {summary['p95_s']:>7.3f} {summary['p99_s']:>7.3f}")
+            for error in sorted(set(report.errors))[:3]:
+                print(f"      e.g. {error}")
+        # Read before the stubs restore the configured limits
+        limits = rate_limit_stats() if args.rate_limits is not None or args.live else {}
+
+    hedging = hedge_stats()
+    if hedging:
+        print(f"\n{'upstream':<20} {'calls':>6} {'hedges':>7} {'hedge%':>7} {'wins':>5} {'win%':>6} {'delay s':>8}")
+        for name, stats in hedging.items():
+            delay = f"{stats['delay_s']:.3f}" if stats["delay_s"] is not None else "-"
+            print(f"{name:<20} {stats['calls']:>6} {stats['hedges']:>7} {stats['hedge_rate'] * 100:>6.1f}% "
+                  f"{stats['hedge_wins']:>5} {stats['win_rate'] * 100:>5.1f}% {delay:>8}")
+
+    if limits:
+        print(f"\n{'quota':<16} {'granted':>8} {'throttled':>10} {'timed out':>10} {'avg wait s':>11} {'max wait s':>11}")
+        for name, stats in limits.items():
+            print(f"{name:<16} {stats['granted']:>8} {stats['throttled']:>10} {stats['timed_out']:>10} "
+                  f"{stats['avg_wait_s']:>11.3f} {stats['max_wait_s']:>11.3f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"levels": summaries, "hedging": hedging, "rate_limits": limits}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
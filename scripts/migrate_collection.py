@@ -0,0 +1,159 @@
+"""
+Zero-downtime rebuild of the vector index behind a Qdrant alias.
+
+The retrievers search COLLECTION_NAME (QDRANT_COLLECTION), which is served as an
+alias to a versioned collection. A migration:
+  1. builds <alias>_v<N> in the background with throttled embedding, or copies
+     vectors from the live collection when they are still compatible,
+  2. validates the new collection against sample queries,
+  3. atomically repoints the alias to it.
+The previous version is kept, so rolling back is a single `swap`.
+
+Usage:
+    python scripts/migrate_collection.py build [--copy-from-live] [--rate 20] [--query "..."]
+    python scripts/migrate_collection.py swap rag_weather_cohere2_v1   # rollback
+    python scripts/migrate_collection.py status
+"""
+import argparse
+import glob
+import os
+import sys
+from dotenv import load_dotenv
+
+# Add project root to sys.path to allow imports from tools
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from integrations.qdrant_client import (
+    COLLECTION_NAME, get_qdrant_client, search_collections, create_collection, copy_collection,
+    get_vector_size, resolve_alias, swap_alias, next_version_name,
+)
+from tools.retriever import index_pdf_documents
+
+def validate_collection(collection_name: str, queries: list, min_hits: int = 1) -> list:
+    """
+    Runs sample queries against the collection.
+    Returns a list of failure messages (empty when validation passes).
+    """
+    failures = []
+    count = get_qdrant_client().count(collection_name).count
+    if count == 0:
+        failures.append(f"Collection '{collection_name}' is empty.")
+        return failures
+
+    for query in queries:
+        hits = search_collections(query, [collection_name], k=3, score_threshold=0.3)
+        print(f"  {len(hits)} hit(s) for: {query}")
+        if len(hits) < min_hits:
+            failures.append(f"Only {len(hits)} hit(s) for query: {query}")
+    return failures
+
+def ensure_alias_free(alias: str, replace_collection: bool):
+    """
+    An alias cannot share its name with a real collection. For a first
+    migration off a plain collection, that collection has to be dropped
+    just before the alias is created.
+    """
+    client = get_qdrant_client()
+    if resolve_alias(alias) is None and client.collection_exists(alias):
+        if not replace_collection:
+            print(
+                f"'{alias}' is a collection, not an alias. Re-run with --replace-collection to "
+                "delete it right before the alias is created (searches fail for that instant)."
+            )
+            sys.exit(1)
+        print(f"Deleting collection '{alias}' so the alias can take its name...")
+        client.delete_collection(alias)
+
+def build(args):
+    alias = args.alias
+    live = resolve_alias(alias) or (alias if get_qdrant_client().collection_exists(alias) else None)
+    target = args.target or next_version_name(alias)
+    print(f"Alias '{alias}' currently serves: {live or '(nothing)'}")
+    print(f"Building '{target}'...")
+
+    if args.copy_from_live:
+        if live is None:
+            print("Nothing live to copy from.")
+            sys.exit(1)
+        create_collection(target, vector_size=get_vector_size(live))
+        count = copy_collection(live, target)
+        print(f"Copied {count} points from '{live}'.")
+    else:
+        pdf_files = glob.glob(os.path.join(args.data_dir, "*.pdf"))
+        if not pdf_files:
+            print(f"No PDF files found in '{args.data_dir}'.")
+            sys.exit(1)
+        index_pdf_documents(pdf_files, collection_name=target, max_chunks_per_second=args.rate)
+
+    queries = list(args.query or [])
+    if args.queries_file:
+        with open(args.queries_file, encoding="utf-8") as f:
+            queries.extend(line.strip() for line in f if line.strip())
+
+    print("Validating...")
+    failures = validate_collection(target, queries, min_hits=args.min_hits)
+    if failures:
+        print("Validation failed; alias left unchanged:")
+        for failure in failures:
+            print(f"  - {failure}")
+        sys.exit(1)
+
+    if args.no_swap:
+        print(f"Validated '{target}'. Run `swap {target}` to serve it.")
+        return
+
+    ensure_alias_free(alias, args.replace_collection)
+    previous = swap_alias(alias, target)
+    print(f"Alias '{alias}' now serves '{target}'.")
+    if previous:
+        print(f"Rollback: python scripts/migrate_collection.py swap {previous}")
+
+def swap(args):
+    if not get_qdrant_client().collection_exists(args.collection):
+        print(f"Collection '{args.collection}' does not exist.")
+        sys.exit(1)
+    ensure_alias_free(args.alias, args.replace_collection)
+    previous = swap_alias(args.alias, args.collection)
+    print(f"Alias '{args.alias}' now serves '{args.collection}' (was: {previous or '(nothing)'}).")
+
+def status(args):
+    print(f"Alias '{args.alias}' -> {resolve_alias(args.alias) or '(not an alias)'}")
+    client = get_qdrant_client()
+    for collection in sorted(c.name for c in client.get_collections().collections):
+        if collection == args.alias or collection.startswith(f"{args.alias}_v"):
+            print(f"  {collection}: {client.count(collection).count} points")
+
+def main():
+    # Load environment variables
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Rebuild the vector index behind an alias without downtime.")
+    parser.add_argument("--alias", default=COLLECTION_NAME)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="Build, validate and swap in a new collection version")
+    build_parser.add_argument("--target", default=None, help="Defaults to the next <alias>_v<N>")
+    build_parser.add_argument("--data-dir", default="data")
+    build_parser.add_argument("--copy-from-live", action="store_true",
+                              help="Copy vectors from the live collection instead of re-embedding")
+    build_parser.add_argument("--rate", type=float, default=None, help="Max chunks embedded per second")
+    build_parser.add_argument("--query", action="append", help="Sample validation query (repeatable)")
+    build_parser.add_argument("--queries-file", default=None, help="File with one validation query per line")
+    build_parser.add_argument("--min-hits", type=int, default=1)
+    build_parser.add_argument("--no-swap", action="store_true", help="Build and validate only")
+    build_parser.add_argument("--replace-collection", action="store_true")
+    build_parser.set_defaults(func=build)
+
+    swap_parser = subparsers.add_parser("swap", help="Point the alias at an existing collection (rollback)")
+    swap_parser.add_argument("collection")
+    swap_parser.add_argument("--replace-collection", action="store_true")
+    swap_parser.set_defaults(func=swap)
+
+    status_parser = subparsers.add_parser("status", help="Show the alias target and collection versions")
+    status_parser.set_defaults(func=status)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Startup profile of the import graph.
+
+Runs `python -X importtime -c "import <module>"` in a fresh interpreter and
+prints the slowest imports by cumulative and self time.
+
+Usage: python scripts/profile_imports.py [module] [--top N]
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def profile_imports(module: str):
+    """Returns a list of (self_us, cumulative_us, module_name) tuples."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing '{module}' failed:\n{result.stderr}")
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((int(self_us), int(cumulative_us), name.rstrip()))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile import time of a module.")
+    parser.add_argument("module", nargs="?", default="agents.rag_agent")
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    rows = profile_imports(args.module)
+    total_us = max((cumulative for _, cumulative, name in rows if name.strip() == args.module), default=0)
+    print(f"Importing '{args.module}' took {total_us / 1000:.1f} ms ({len(rows)} modules)\n")
+
+    print(f"Top {args.top} by cumulative time:")
+    for self_us, cumulative_us, name in sorted(rows, key=lambda r: r[1], reverse=True)[:args.top]:
+        print(f"  {cumulative_us / 1000:9.1f} ms  {name}")
+
+    print(f"\nTop {args.top} by self time:")
+    for self_us, cumulative_us, name in sorted(rows, key=lambda r: r[0], reverse=True)[:args.top]:
+        print(f"  {self_us / 1000:9.1f} ms  {name.strip()}")
+
+
+if __name__ == "__main__":
+    main()
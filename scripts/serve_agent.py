@@ -0,0 +1,89 @@
+"""
+Serve the agent over HTTP for load testing.
+
+POST /chat with {"messages": [{"role": "user" | "assistant", "content": "..."}, ...]}
+returns {"content": "<assistant reply>"}. This is the contract
+scripts/load_test.py --url expects. The Streamlit UI (app.py) has no
+such endpoint.
+
+Usage:
+    python scripts/serve_agent.py --port 8000
+    python scripts/serve_agent.py --port 8000 --stub   # stubbed upstreams
+    python scripts/load_test.py --url http://localhost:8000/chat --concurrency 8
+"""
+import argparse
+import json
+import os
+import sys
+from contextlib import ExitStack
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from dotenv import load_dotenv
+
+# Add project root to sys.path to allow imports from agents and perf
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from perf.loadgen import in_process_turn
+
+CHAT_PATH = "/chat"
+
+def make_handler(run_turn):
+    class ChatHandler(BaseHTTPRequestHandler):
+        def _reply(self, status: int, body: dict):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            if self.path != CHAT_PATH:
+                self._reply(404, {"error": f"POST {CHAT_PATH}"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                messages = json.loads(self.rfile.read(length))["messages"]
+            except (ValueError, KeyError, TypeError) as e:
+                self._reply(400, {"error": f"Expected {{\"messages\": [...]}}: {e}"})
+                return
+            try:
+                self._reply(200, {"content": run_turn(messages)})
+            except Exception as e:
+                self._reply(500, {"error": str(e)})
+
+        def log_message(self, format, *args):
+            # One line per request would swamp a load test's output
+            pass
+
+    return ChatHandler
+
+def main():
+    from perf.stubs import Latencies, stubbed_upstreams
+
+    parser = argparse.ArgumentParser(description="Serve the agent at POST /chat for load testing.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--stub", action="store_true", help="Serve with stubbed upstreams (see perf/stubs.py)")
+    parser.add_argument("--latency", default="", help="Stub latencies (see scripts/load_test.py)")
+    args = parser.parse_args()
+
+    load_dotenv()
+
+    with ExitStack() as stack:
+        if args.stub:
+            stack.enter_context(stubbed_upstreams(Latencies.parse(args.latency)))
+        from agents.rag_agent import build_rag_agent, warm_up
+
+        agent = build_rag_agent()
+        warm_up()
+        server = ThreadingHTTPServer((args.host, args.port), make_handler(in_process_turn(agent)))
+        print(f"Serving the agent at http://{args.host}:{args.port}{CHAT_PATH} (Ctrl+C to stop)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+
+if __name__ == "__main__":
+    main()
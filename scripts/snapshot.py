@@ -0,0 +1,52 @@
+"""
+Export or import a Qdrant collection snapshot (vectors + payloads).
+
+A snapshot built once can be shipped as an artifact and loaded on new nodes
+without re-embedding the corpus.
+
+Usage:
+    python scripts/snapshot.py export [--collection NAME] [--output FILE]
+    python scripts/snapshot.py import FILE [--collection NAME]
+"""
+import argparse
+import os
+import sys
+import time
+from dotenv import load_dotenv
+
+# Add project root to sys.path to allow imports from tools
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from integrations.qdrant_client import COLLECTION_NAME, export_collection, import_collection
+
+def main():
+    # Load environment variables
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Export or import a Qdrant collection snapshot.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Write a collection to a snapshot file")
+    export_parser.add_argument("--collection", default=COLLECTION_NAME)
+    export_parser.add_argument("--output", default=None, help="Defaults to snapshots/<collection>.jsonl.gz")
+
+    import_parser = subparsers.add_parser("import", help="Load a snapshot file into a collection")
+    import_parser.add_argument("file")
+    import_parser.add_argument("--collection", default=None, help="Defaults to the collection named in the snapshot")
+
+    args = parser.parse_args()
+    start = time.perf_counter()
+
+    if args.command == "export":
+        output = args.output or os.path.join("snapshots", f"{args.collection}.jsonl.gz")
+        os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+        count = export_collection(args.collection, output)
+        print(f"Exported {count} points from '{args.collection}' to {output}")
+    else:
+        count = import_collection(args.file, args.collection)
+        print(f"Imported {count} points from {args.file}")
+
+    print(f"Done in {time.perf_counter() - start:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+import time
+import unittest
+from unittest.mock import patch, MagicMock
+from langchain_core.documents import Document
+from tools import advanced_retriever
+from tools.advanced_retriever import (
+    prefetch, take_prefetched, retrieve_node, advanced_retrieve, run_advanced_retriever,
+    NO_RELEVANT_DOCS_MESSAGE, MAX_RETRIES
+)
+from integrations.upstream import deadline_after, deadline_scope, remaining
+
+class TestSpeculativePrefetch(unittest.TestCase):
+
+    def setUp(self):
+        advanced_retriever._prefetches.clear()
+
+    @patch('tools.advanced_retriever.search_documents')
+    def test_prefetch_reused_for_expanded_query(self, mock_search):
+        doc = MagicMock(page_content="Akash is a Gen AI developer.")
+        mock_search.return_value = [doc]
+
+        prefetch("Who is Akash Kumar Shaw?")
+        docs = take_prefetched("Who is Akash Kumar Shaw? What is his role? Information about Akash.")
+
+        self.assertEqual(docs, [doc])
+        mock_search.assert_called_once_with("Who is Akash Kumar Shaw?", None, [advanced_retriever.COLLECTION_NAME])
+        # Consumed: a second lookup has nothing to reuse
+        self.assertIsNone(take_prefetched("Who is Akash Kumar Shaw?"))
+
+    @patch('tools.advanced_retriever.search_documents')
+    def test_prefetch_runs_in_callers_context_and_expires(self, mock_search):
+        mock_search.side_effect = lambda *args: [MagicMock(page_content=f"{remaining():.0f}s left")]
+
+        with deadline_scope(deadline_after(30)):
+            prefetch("Who is Akash Kumar Shaw?")
+            docs = take_prefetched("Who is Akash Kumar Shaw?")
+        self.assertEqual(docs[0].page_content, "30s left")
+
+        prefetch("Who is Akash Kumar Shaw?")
+        later = time.monotonic() + advanced_retriever.PREFETCH_MAX_AGE + 1
+        with patch('tools.advanced_retriever.time.monotonic', return_value=later):
+            self.assertIsNone(take_prefetched("Who is Akash Kumar Shaw?"))
+        self.assertEqual(len(advanced_retriever._prefetches), 0)
+
+    @patch('tools.advanced_retriever.search_documents')
+    def test_prefetch_ignored_for_unrelated_query(self, mock_search):
+        mock_search.return_value = []
+
+        prefetch("What is the weather in London?")
+
+        self.assertIsNone(take_prefetched("Akash Kumar Shaw employment history"))
+
+    @patch('tools.advanced_retriever.take_prefetched')
+    @patch('tools.advanced_retriever.search_documents')
+    def test_retrieve_node_uses_prefetch_on_first_pass_only(self, mock_search, mock_take):
+        mock_take.return_value = [MagicMock(page_content="prefetched")]
+        mock_search.return_value = [MagicMock(page_content="searched")]
+        state = {"query": "q", "original_query": "q", "context": "", "retry_count": 0,
+                 "is_relevant": False, "filters": None}
+
+        self.assertEqual(retrieve_node(state)["context"], "prefetched")
+        self.assertEqual(retrieve_node({**state, "retry_count": 1})["context"], "searched")
+        self.assertEqual(retrieve_node({**state, "filters": {"page": 1}})["context"], "searched")
+
+class TestAdvancedRetrieve(unittest.TestCase):
+
+    @patch('tools.advanced_retriever.get_rewriter_llm')
+    @patch('tools.advanced_retriever.get_grader_llm')
+    @patch('tools.advanced_retriever.search_documents')
+    def test_returns_default_message_after_max_retries(self, mock_search, mock_grader, mock_rewriter):
+        mock_search.return_value = [MagicMock(page_content="Unrelated text.")]
+        mock_grader.return_value.invoke.return_value = {"binary_score": "no"}
+        mock_rewriter.return_value.invoke.return_value = MagicMock(content="better query")
+
+        result = advanced_retrieve("Who is Akash?", filters={"page": 0})
+
+        self.assertEqual(result, NO_RELEVANT_DOCS_MESSAGE)
+        self.assertEqual(mock_search.call_count, MAX_RETRIES + 1)
+        mock_search.assert_called_with("better query", {"page": 0}, [advanced_retriever.COLLECTION_NAME])
+
+    @patch('tools.advanced_retriever.get_grader_llm')
+    @patch('tools.advanced_retriever.search_documents')
+    def test_returns_relevant_context(self, mock_search, mock_grader):
+        mock_search.return_value = [MagicMock(page_content="Akash is a developer.")]
+        mock_grader.return_value.invoke.return_value = {"binary_score": "yes"}
+
+        self.assertEqual(advanced_retrieve("Who is Akash?"), "Akash is a developer.")
+
+    @patch('tools.advanced_retriever.get_rewriter_llm')
+    @patch('tools.advanced_retriever.get_grader_llm')
+    @patch('tools.advanced_retriever.search_documents')
+    def test_final_state_counts_llm_calls(self, mock_search, mock_grader, mock_rewriter):
+        relevant_doc = MagicMock(page_content="Akash is a developer.")
+        # Empty first search (no grading), then one irrelevant and one relevant pass
+        mock_search.side_effect = [[], [MagicMock(page_content="Unrelated.")], [relevant_doc]]
+        mock_grader.return_value.invoke.side_effect = [{"binary_score": "no"}, {"binary_score": "yes"}]
+        mock_rewriter.return_value.invoke.return_value = MagicMock(content="better query")
+
+        state = run_advanced_retriever("Who is Akash?")
+
+        self.assertTrue(state["is_relevant"])
+        self.assertEqual(state["retry_count"], 2)
+        self.assertEqual(state["llm_calls"], 4)
+        self.assertEqual(state["documents"], [relevant_doc])
+
+    @patch('tools.advanced_retriever.maybe_compress', side_effect=lambda query, docs, query_vector: docs)
+    @patch('tools.advanced_retriever.compression_enabled', return_value=True)
+    @patch('tools.advanced_retriever.embed_query', return_value=[0.1, 0.2])
+    @patch('tools.advanced_retriever.get_rewriter_llm')
+    @patch('tools.advanced_retriever.get_grader_llm')
+    @patch('tools.advanced_retriever.search_documents')
+    def test_compression_reuses_query_embedding(self, mock_search, mock_grader, mock_rewriter, mock_embed,
+                                                mock_enabled, mock_compress):
+        mock_search.return_value = [MagicMock(page_content="Unrelated text.")]
+        mock_grader.return_value.invoke.return_value = {"binary_score": "no"}
+        mock_rewriter.return_value.invoke.return_value = MagicMock(content="better query")
+
+        run_advanced_retriever("Who is Akash?", filters={"page": 0})
+
+        # One embedding of the original query for the first search and all compression passes
+        mock_embed.assert_called_once_with("Who is Akash?")
+        self.assertEqual(mock_search.call_args_list[0].kwargs, {"embedding": [0.1, 0.2]})
+        self.assertEqual(mock_compress.call_count, MAX_RETRIES + 1)
+        for call in mock_compress.call_args_list:
+            self.assertEqual(call.args[0], "Who is Akash?")
+            self.assertEqual(call.kwargs, {"query_vector": [0.1, 0.2]})
+
+    @patch('tools.advanced_retriever.RETRY_MIN_BUDGET', 60.0)
+    @patch('tools.advanced_retriever.get_rewriter_llm')
+    @patch('tools.advanced_retriever.get_grader_llm')
+    @patch('tools.advanced_retriever.search_documents')
+    def test_deadline_returns_best_context_instead_of_rewriting(self, mock_search, mock_grader, mock_rewriter):
+        doc = Document(page_content="Akash works at TCS.", metadata={"relevance_score": 0.7})
+        mock_search.return_value = [doc]
+        mock_grader.return_value.invoke.return_value = {"binary_score": "no"}
+
+        # 10s left is less than the 60s a retry needs
+        state = run_advanced_retriever("Who is Akash?", deadline=time.monotonic() + 10)
+
+        self.assertEqual(state["context"], "Akash works at TCS.")
+        self.assertEqual(state["documents"], [doc])
+        self.assertTrue(state["timed_out"])
+        self.assertFalse(state["is_relevant"])
+        mock_rewriter.return_value.invoke.assert_not_called()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import itertools
+import os
+import tempfile
+import time
+import unittest
+from langchain_core.messages import AIMessage, HumanMessage
+from integrations import upstream
+from integrations.cassette import CassetteMiss, use_cassette
+from integrations.rate_limiter import is_rate_limit_error
+from integrations.upstream import DeadlineExceeded, call_upstream, configure_hedging, deadline_after, deadline_scope
+
+def slow_reply(messages):
+    time.sleep(0.05)
+    return AIMessage(content=f"You said: {messages[-1].content}")
+
+class TestCassette(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "cassettes", "run.jsonl")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_replay_serves_recorded_responses(self):
+        with use_cassette(self.path, "record") as cassette:
+            first = call_upstream("llm:chatbot", slow_reply, [HumanMessage(content="hi", id="run-1")])
+            call_upstream("llm:chatbot", slow_reply, [HumanMessage(content="bye")])
+        self.assertEqual(cassette.recorded, 2)
+
+        def unreachable(messages):
+            raise AssertionError("replay must not call the upstream")
+
+        with use_cassette(self.path, "replay", latency="zero") as cassette:
+            started = time.perf_counter()
+            # Message IDs differ between runs and are not part of the key
+            replayed = call_upstream("llm:chatbot", unreachable, [HumanMessage(content="hi", id="run-2")])
+            self.assertLess(time.perf_counter() - started, 0.05)
+            self.assertEqual(replayed.content, first.content)
+            with self.assertRaises(CassetteMiss):
+                call_upstream("llm:chatbot", unreachable, [HumanMessage(content="something new")])
+        self.assertEqual(cassette.replayed, 1)
+
+    def test_hedged_call_records_only_the_winner(self):
+        configure_hedging(["llm"], percentile=95, budget=1.0)
+        self.addCleanup(configure_hedging, [])
+        policy = upstream._hedge_policy("llm:grader")
+        for _ in range(upstream.HEDGE_MIN_SAMPLES):
+            policy.record(0.01)
+            policy.start_call()
+        attempts = itertools.count()
+
+        def grade(question):
+            # The first request stalls; the hedged duplicate answers quickly
+            if next(attempts) == 0:
+                time.sleep(0.5)
+                return "slow"
+            return "fast"
+
+        with use_cassette(self.path, "record") as cassette:
+            self.assertEqual(call_upstream("llm:grader", grade, "q"), "fast")
+        time.sleep(0.6)
+        self.assertEqual(cassette.recorded, 1)
+        with use_cassette(self.path, "replay", latency="zero"):
+            self.assertEqual(call_upstream("llm:grader", grade, "q"), "fast")
+
+    def test_failures_replay_with_their_type(self):
+        class TooManyRequests(Exception):
+            status_code = 429
+
+        def limited(text):
+            raise TooManyRequests("slow down")
+
+        with use_cassette(self.path, "record"):
+            with self.assertRaises(TooManyRequests):
+                call_upstream("embedding:query", limited, "hello")
+            with deadline_scope(deadline_after(0.05)):
+                with self.assertRaises(DeadlineExceeded):
+                    call_upstream("weather", time.sleep, 0.5)
+
+        with use_cassette(self.path, "replay", latency="zero"):
+            with self.assertRaises(Exception) as raised:
+                call_upstream("embedding:query", limited, "hello")
+            self.assertTrue(is_rate_limit_error(raised.exception))
+            with self.assertRaises(DeadlineExceeded):
+                call_upstream("weather", time.sleep, 0.5)
+
+    def test_fast_path_turn_replays(self):
+        from agents.rag_agent import build_rag_agent
+        from perf.stubs import stubbed_upstreams
+
+        question = {"messages": [HumanMessage(content="What is the weather in London?")]}
+        with stubbed_upstreams():
+            with use_cassette(self.path, "record"):
+                recorded = build_rag_agent(fast_path=True).invoke(question)
+            # The router gives its tool call a new ID on every run
+            with use_cassette(self.path, "replay", latency="zero") as cassette:
+                replayed = build_rag_agent(fast_path=True).invoke(question)
+        self.assertGreater(cassette.replayed, 0)
+        self.assertNotEqual(recorded["messages"][1].tool_calls[0]["id"], replayed["messages"][1].tool_calls[0]["id"])
+        self.assertEqual(replayed["messages"][-1].content, recorded["messages"][-1].content)
+
+if __name__ == '__main__':
+    unittest.main()
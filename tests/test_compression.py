@@ -0,0 +1,60 @@
+import unittest
+from unittest.mock import patch, MagicMock
+from langchain_core.documents import Document
+from integrations.embedding_cache import EmbeddingCache
+from tools.compression import split_sentences, compress_documents, embed_sentences
+
+def _embed(text):
+    # One dimension per topic word, so sentences about the query score highest
+    return [float(word in text.lower()) for word in ("skills", "python", "garden", "weather")]
+
+class TestCompression(unittest.TestCase):
+
+    def setUp(self):
+        self.embeddings = MagicMock()
+        self.embeddings.model = "test-model"
+        self.embeddings.embed_documents.side_effect = lambda texts: [_embed(t) for t in texts]
+        self.embeddings.embed_query.side_effect = _embed
+        self.cache = EmbeddingCache(":memory:")
+        patchers = [
+            patch('tools.compression.get_embeddings', return_value=self.embeddings),
+            patch('tools.compression.get_sentence_cache', return_value=self.cache),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_split_sentences(self):
+        text = "Akash works as a developer at TCS.\nHe builds RAG systems! Really.\n\nSkills include Python and Qdrant"
+        self.assertEqual(split_sentences(text), [
+            "Akash works as a developer at TCS.",
+            "He builds RAG systems! Really.",
+            "Skills include Python and Qdrant",
+        ])
+
+    def test_keeps_top_sentences_with_neighbors(self):
+        docs = [
+            Document(page_content="The garden has roses. The garden has tulips. His skills include Python. "
+                                  "The garden has a pond. The garden has a fence.", metadata={"page": 1}),
+            Document(page_content="Weather was sunny all week. Weather turned rainy later on.", metadata={"page": 2}),
+        ]
+
+        compressed = compress_documents("What are his skills in Python?", docs, max_sentences=1, neighbors=1)
+
+        self.assertEqual(len(compressed), 1)
+        self.assertEqual(compressed[0].page_content,
+                         "The garden has tulips. His skills include Python. The garden has a pond.")
+        self.assertEqual(compressed[0].metadata, {"page": 1})
+
+    def test_sentence_embeddings_cached(self):
+        embed_sentences(["His skills include Python.", "The garden has roses."])
+        embed_sentences(["His skills include Python.", "Weather was sunny all week."])
+
+        embedded = [call.args[0] for call in self.embeddings.embed_documents.call_args_list]
+        self.assertEqual(embedded, [
+            ["His skills include Python.", "The garden has roses."],
+            ["Weather was sunny all week."],
+        ])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,34 @@
+import unittest
+from langchain_core.documents import Document
+from loaders.dedup import NearDuplicateFilter, simhash, hamming_distance
+
+class TestDedup(unittest.TestCase):
+
+    def test_simhash_near_duplicates_are_close(self):
+        text = "The quick brown fox jumps over the lazy dog near the river bank on a sunny afternoon in May."
+        near = text.replace("May", "June")
+        other = "Quarterly revenue grew by twelve percent driven by strong demand for cloud services."
+
+        self.assertLessEqual(hamming_distance(simhash(text), simhash(near)), 12)
+        self.assertGreater(hamming_distance(simhash(text), simhash(other)), 12)
+
+    def test_filter_keeps_first_and_records_provenance(self):
+        footer = "Page footer: Copyright 2025 Example Corp. All rights reserved."
+        docs = [
+            Document(page_content=footer, metadata={"source": "a.pdf", "page": 0}),
+            Document(page_content="Unique content about rainfall.", metadata={"source": "a.pdf", "page": 0}),
+            Document(page_content=footer, metadata={"source": "a.pdf", "page": 1}),
+            Document(page_content=footer, metadata={"source": "b.pdf", "page": 4}),
+        ]
+        dup_filter = NearDuplicateFilter(key=lambda doc: f"{doc.metadata['source']}:{doc.metadata['page']}")
+
+        kept = list(dup_filter.filter(docs))
+
+        self.assertEqual([doc.page_content for doc in kept], [footer, "Unique content about rainfall."])
+        self.assertEqual(dup_filter.provenance, {
+            "a.pdf:0": [{"source": "a.pdf", "page": 1}, {"source": "b.pdf", "page": 4}],
+        })
+        self.assertEqual((dup_filter.kept, dup_filter.dropped), (2, 2))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from workers.ingest_worker import IngestWorker, PRIORITY_WATCHED, submit_job, read_status
+
+class TestIngestWorker(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.data_dir = os.path.join(self.tmp.name, "data")
+        self.state_dir = os.path.join(self.tmp.name, "state")
+        os.makedirs(self.data_dir)
+        self.worker = IngestWorker(watch_dir=self.data_dir, state_dir=self.state_dir, poll_interval=0)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _write_pdf(self, name, content=b"%PDF-1.4 test"):
+        path = os.path.join(self.data_dir, name)
+        with open(path, "wb") as f:
+            f.write(content)
+        return path
+
+    @patch('workers.ingest_worker.delete_documents')
+    @patch('workers.ingest_worker.index_pdf_documents', return_value=["id1", "id2"])
+    def test_new_file_indexed_once_stable(self, mock_index, mock_delete):
+        path = self._write_pdf("a.pdf")
+
+        # First scan only records the file; it is indexed once unchanged on the next
+        self.assertEqual(self.worker.run_once(), 0)
+        self.assertEqual(self.worker.run_once(), 1)
+        self.assertEqual(mock_index.call_args.args[0], [path])
+        mock_delete.assert_not_called()
+
+        # Unchanged file: nothing to do
+        self.assertEqual(self.worker.run_once(), 0)
+        jobs = read_status(self.state_dir)["jobs"]
+        self.assertEqual([(j["status"], j["chunks"]) for j in jobs], [("done", 2)])
+
+    @patch('workers.ingest_worker.delete_documents')
+    @patch('workers.ingest_worker.index_pdf_documents', return_value=["id3"])
+    def test_changed_file_replaces_stale_chunks(self, mock_index, mock_delete):
+        path = self._write_pdf("a.pdf")
+        self.worker.manifest[path] = {"mtime": 0, "size": 1, "sha1": "old"}
+
+        self.worker.scan_directory()
+        self.worker.run_once()
+
+        mock_delete.assert_called_once_with(self.worker.collection_name, path, keep_ids=["id3"])
+
+    @patch('workers.ingest_worker.delete_documents')
+    @patch('workers.ingest_worker.index_pdf_documents', return_value=[])
+    def test_removed_file_deleted_from_index(self, mock_index, mock_delete):
+        path = os.path.join(self.data_dir, "gone.pdf")
+        self.worker.manifest[path] = {"mtime": 0, "size": 1, "sha1": "old"}
+
+        self.worker.run_once()
+
+        mock_delete.assert_called_once_with(self.worker.collection_name, path)
+        self.assertNotIn(path, self.worker.manifest)
+
+    @patch('workers.ingest_worker.delete_documents', side_effect=RuntimeError("qdrant down"))
+    @patch('workers.ingest_worker.index_pdf_documents', return_value=[])
+    def test_failed_delete_waits_before_retry(self, mock_index, mock_delete):
+        path = os.path.join(self.data_dir, "gone.pdf")
+        self.worker.manifest[path] = {"mtime": 0, "size": 1, "sha1": "old"}
+
+        self.assertEqual(self.worker.run_once(), 1)
+        # Not re-queued on the next scans while the retry delay runs
+        self.assertEqual(self.worker.run_once(), 0)
+        self.assertEqual(self.worker.run_once(), 0)
+        mock_delete.assert_called_once()
+        self.assertIn(path, self.worker.manifest)
+
+    @patch('workers.ingest_worker.delete_documents')
+    @patch('workers.ingest_worker.index_pdf_documents', return_value=["id"])
+    def test_submitted_job_runs_before_watched(self, mock_index, mock_delete):
+        watched = self._write_pdf("watched.pdf")
+        self.worker.scan_directory()
+        self.worker.scan_directory()
+        submitted = os.path.join(self.tmp.name, "submitted.pdf")
+        with open(submitted, "wb") as f:
+            f.write(b"%PDF-1.4 submitted")
+        submit_job(submitted, state_dir=self.state_dir)
+
+        self.worker.run_once()
+
+        order = [call.args[0][0] for call in mock_index.call_args_list]
+        self.assertEqual(order, [submitted, watched])
+
+    @patch('workers.ingest_worker.delete_documents')
+    @patch('workers.ingest_worker.index_pdf_documents', side_effect=RuntimeError("quota exceeded"))
+    def test_failed_job_reported(self, mock_index, mock_delete):
+        self._write_pdf("a.pdf")
+        self.worker.scan_directory()
+
+        self.worker.run_once()
+
+        job = read_status(self.state_dir)["jobs"][0]
+        self.assertEqual(job["status"], "failed")
+        self.assertIn("quota exceeded", job["error"])
+        self.assertEqual(job["priority"], PRIORITY_WATCHED)
+        # Not retried on the next scan
+        self.assertEqual(self.worker.run_once(), 0)
+
+if __name__ == '__main__':
+    unittest.main()
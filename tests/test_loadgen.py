@@ -0,0 +1,30 @@
+import unittest
+from perf.loadgen import percentile, run_load
+
+class TestLoadgen(unittest.TestCase):
+
+    def test_percentile(self):
+        values = [float(v) for v in range(1, 101)]
+        self.assertAlmostEqual(percentile(values, 50), 50.5)
+        self.assertAlmostEqual(percentile(values, 99), 99.01)
+        self.assertEqual(percentile([], 95), 0.0)
+
+    def test_run_load_carries_history_and_counts_errors(self):
+        seen = []
+
+        def run_turn(history):
+            seen.append([m["content"] for m in history])
+            if history[-1]["content"] == "boom":
+                raise RuntimeError("upstream failed")
+            return f"answer to {history[-1]['content']}"
+
+        report = run_load(run_turn, [["a", "b"], ["boom", "never sent"]], concurrency=2)
+
+        self.assertIn(["a", "answer to a", "b"], seen)
+        self.assertNotIn("never sent", [turns[-1] for turns in seen])
+        self.assertEqual(len(report.latencies), 2)
+        self.assertEqual(report.errors, ["RuntimeError: upstream failed"])
+        self.assertAlmostEqual(report.summary()["error_rate"], 1 / 3, places=3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import os
+import pstats
+import tempfile
+import threading
+import time
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+from perf.profiling import profiling
+
+def busy_worker(seconds=0.2):
+    end = time.perf_counter() + seconds
+    blocks = []
+    while time.perf_counter() < end:
+        blocks.append(bytearray(1024))
+        sum(range(1000))
+    return blocks
+
+def run_in_thread():
+    thread = threading.Thread(target=busy_worker)
+    thread.start()
+    thread.join()
+
+class TestProfiling(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.prefix = os.path.join(self.tmp.name, "out", "run")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_sampler_writes_folded_stacks_and_allocations(self):
+        with redirect_stdout(StringIO()):
+            with profiling("sample", self.prefix, interval=0.001):
+                run_in_thread()
+
+        with open(f"{self.prefix}.folded", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        worker_lines = [line for line in lines if "busy_worker (tests/test_profiling.py" in line]
+        self.assertTrue(worker_lines)
+        # Collapsed-stack format: "frame;frame;... count"
+        self.assertTrue(all(line.rsplit(" ", 1)[1].isdigit() for line in lines))
+        with open(f"{self.prefix}.alloc.txt", encoding="utf-8") as f:
+            self.assertIn("Top 25 allocation sites", f.read())
+
+    def test_cprofile_covers_threads_started_inside(self):
+        with redirect_stdout(StringIO()):
+            with profiling("cprofile", self.prefix, trace_allocations=False):
+                run_in_thread()
+
+        stats = pstats.Stats(f"{self.prefix}.prof")
+        functions = {name for _, _, name in stats.stats}
+        self.assertIn("busy_worker", functions)
+        self.assertFalse(os.path.exists(f"{self.prefix}.alloc.txt"))
+
+if __name__ == '__main__':
+    unittest.main()
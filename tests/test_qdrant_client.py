@@ -0,0 +1,272 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch, MagicMock
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+from integrations import qdrant_client
+from integrations.qdrant_client import (
+    create_collection, get_search_params, build_filter, export_collection, import_collection,
+    swap_alias, resolve_alias, next_version_name, get_collections_for, merge_results, search_collections,
+    delete_documents, resolve_question_hits, upsert_documents
+)
+from perf.stubs import EMBEDDING_SIZE, StubEmbeddings
+from integrations.upstream import deadline_after, deadline_scope, remaining
+from langchain_core.documents import Document
+
+class TestQdrantClient(unittest.TestCase):
+
+    def setUp(self):
+        qdrant_client._search_params_cache.clear()
+        qdrant_client._alias_cache.clear()
+
+    @patch('integrations.qdrant_client.get_qdrant_client')
+    def test_create_collection_scalar_quantization(self, mock_get_client):
+        mock_client = MagicMock()
+        mock_client.get_collection.side_effect = Exception("not found")
+        mock_get_client.return_value = mock_client
+
+        create_collection("test", vector_size=1024, quantization="scalar", on_disk=True)
+
+        kwargs = mock_client.create_collection.call_args.kwargs
+        self.assertTrue(kwargs["vectors_config"].on_disk)
+        self.assertEqual(kwargs["quantization_config"].scalar.type, models.ScalarType.INT8)
+
+        indexed = {call.kwargs["field_name"] for call in mock_client.create_payload_index.call_args_list}
+        self.assertEqual(indexed, {"metadata.source", "metadata.file_name", "metadata.page", "metadata.kind"})
+
+    @patch('integrations.qdrant_client.get_qdrant_client')
+    def test_create_collection_rejects_unknown_quantization(self, mock_get_client):
+        with self.assertRaises(ValueError):
+            create_collection("test", quantization="pq8")
+
+    @patch('integrations.qdrant_client.get_qdrant_client')
+    def test_search_params_rescore_binary(self, mock_get_client):
+        info = MagicMock()
+        info.config.quantization_config = models.BinaryQuantization(binary=models.BinaryQuantizationConfig())
+        mock_get_client.return_value.get_collection.return_value = info
+
+        params = get_search_params("test")
+
+        self.assertTrue(params.quantization.rescore)
+        self.assertEqual(params.quantization.oversampling, 3.0)
+
+    @patch('integrations.qdrant_client.get_qdrant_client')
+    def test_search_params_unquantized(self, mock_get_client):
+        mock_get_client.return_value.get_collection.return_value.config.quantization_config = None
+        self.assertIsNone(get_search_params("test"))
+
+    @patch('integrations.qdrant_client.get_qdrant_client')
+    def test_search_params_follow_alias_swapped_elsewhere(self, mock_get_client):
+        client = mock_get_client.return_value
+        alias = MagicMock(alias_name="docs", collection_name="docs_v1")
+        client.get_aliases.return_value.aliases = [alias]
+        quantized = MagicMock()
+        quantized.config.quantization_config = models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(type=models.ScalarType.INT8)
+        )
+        plain = MagicMock()
+        plain.config.quantization_config = None
+        client.get_collection.side_effect = lambda name: quantized if name == "docs_v2" else plain
+
+        self.assertIsNone(get_search_params("docs"))
+        self.assertIsNone(get_search_params("docs"))
+        # The alias resolution is reused within the TTL
+        self.assertEqual(client.get_aliases.call_count, 1)
+        # Another process (migrate_collection.py) repoints the alias
+        alias.collection_name = "docs_v2"
+        with patch("integrations.qdrant_client.time.monotonic", return_value=time.monotonic() + 60):
+            self.assertTrue(get_search_params("docs").quantization.rescore)
+        self.assertEqual(client.get_aliases.call_count, 2)
+
+    def test_build_filter(self):
+        qdrant_filter = build_filter({"file_name": "report.pdf", "page": [0, 1], "source": None})
+
+        self.assertEqual(qdrant_filter.must, [
+            models.FieldCondition(key="metadata.file_name", match=models.MatchValue(value="report.pdf")),
+            models.FieldCondition(key="metadata.page", match=models.MatchAny(any=[0, 1])),
+        ])
+
+    def test_build_filter_empty(self):
+        self.assertIsNone(build_filter(None))
+        self.assertIsNone(build_filter({"page": None}))
+
+    @patch('integrations.qdrant_client.get_qdrant_client')
+    def test_snapshot_round_trip(self, mock_get_client):
+        client = QdrantClient(location=":memory:")
+        mock_get_client.return_value = client
+        create_collection("source", vector_size=4)
+        client.upsert("source", points=[
+            models.PointStruct(id=i, vector=[float(i), 1.0, 0.0, 0.5], payload={"page_content": f"chunk {i}", "metadata": {"page": i}})
+            for i in range(1, 301)
+        ])
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "source.jsonl.gz")
+            self.assertEqual(export_collection("source", path), 300)
+            self.assertEqual(import_collection(path, "restored"), 300)
+
+        restored = client.retrieve("restored", ids=[7], with_vectors=True)[0]
+        original = client.retrieve("source", ids=[7], with_vectors=True)[0]
+        self.assertEqual(restored.payload, original.payload)
+        self.assertEqual(restored.vector, original.vector)
+
+    @patch('integrations.qdrant_client.get_embeddings', return_value=StubEmbeddings())
+    def test_on_disk_store_round_trip(self, mock_embeddings):
+        def reopen():
+            # A fresh client on the same QDRANT_PATH, as after a restart
+            qdrant_client.get_qdrant_client().close()
+            qdrant_client.get_qdrant_client.cache_clear()
+            qdrant_client.get_vector_store.cache_clear()
+
+        self.addCleanup(qdrant_client.get_vector_store.cache_clear)
+        self.addCleanup(qdrant_client.get_qdrant_client.cache_clear)
+        docs = [
+            Document(page_content="Akash works at TCS as a Gen AI developer.", metadata={"file_name": "cv.pdf", "page": 0}),
+            Document(page_content="The garden has roses and tulips.", metadata={"file_name": "garden.pdf", "page": 0}),
+        ]
+        with tempfile.TemporaryDirectory() as tmp, \
+                patch.dict(os.environ, {"QDRANT_URL": "", "QDRANT_PATH": os.path.join(tmp, "qdrant")}):
+            qdrant_client.get_qdrant_client.cache_clear()
+            qdrant_client.get_vector_store.cache_clear()
+            create_collection("docs", vector_size=EMBEDDING_SIZE)
+            upsert_documents("docs", docs)
+            reopen()
+
+            hits = search_collections("Where does Akash work?", ["docs"], k=1)
+            self.assertEqual(hits[0][0].page_content, docs[0].page_content)
+            self.assertEqual(hits[0][0].metadata["file_name"], "cv.pdf")
+
+            path = os.path.join(tmp, "docs.jsonl.gz")
+            self.assertEqual(export_collection("docs", path), 2)
+            self.assertEqual(import_collection(path, "restored"), 2)
+            reopen()
+
+            restored = search_collections("Where does Akash work?", ["restored"], k=1)
+            self.assertEqual([(doc.page_content, score) for doc, score in restored],
+                             [(doc.page_content, score) for doc, score in hits])
+            qdrant_client.get_qdrant_client().close()
+
+    @patch('integrations.qdrant_client.get_qdrant_client')
+    def test_swap_alias_and_rollback(self, mock_get_client):
+        client = QdrantClient(location=":memory:")
+        mock_get_client.return_value = client
+        self.assertEqual(next_version_name("kb"), "kb_v1")
+        create_collection("kb_v1", vector_size=4)
+        create_collection("kb_v2", vector_size=4)
+        self.assertEqual(next_version_name("kb"), "kb_v3")
+
+        self.assertIsNone(swap_alias("kb", "kb_v1"))
+        self.assertEqual(swap_alias("kb", "kb_v2"), "kb_v1")
+        self.assertEqual(resolve_alias("kb"), "kb_v2")
+
+        self.assertEqual(swap_alias("kb", "kb_v1"), "kb_v2")
+        self.assertEqual(resolve_alias("kb"), "kb_v1")
+
+    @patch('integrations.qdrant_client.get_qdrant_client')
+    def test_delete_documents_keeps_new_chunks(self, mock_get_client):
+        client = QdrantClient(location=":memory:")
+        mock_get_client.return_value = client
+        create_collection("kb", vector_size=2)
+        client.upsert("kb", points=[
+            models.PointStruct(id=i, vector=[1.0, float(i)],
+                               payload={"metadata": {"source": "data/a.pdf" if i < 3 else "data/b.pdf"}})
+            for i in range(5)
+        ])
+
+        delete_documents("kb", "data/a.pdf", keep_ids=[1])
+
+        self.assertEqual(sorted(p.id for p in client.scroll("kb")[0]), [1, 3, 4])
+
+    def _hit(self, collection, point_id, score):
+        return (Document(page_content=f"{collection}-{point_id}",
+                         metadata={"_collection_name": collection, "_id": point_id}), score)
+
+    def test_merge_results_by_score(self):
+        merged = merge_results([
+            [self._hit("a", 1, 0.9), self._hit("a", 2, 0.5)],
+            [self._hit("b", 1, 0.7), self._hit("a", 1, 0.8)],
+        ], k=2)
+
+        self.assertEqual([(doc.page_content, score) for doc, score in merged], [("a-1", 0.9), ("b-1", 0.7)])
+
+    def test_merge_results_rrf(self):
+        # a-2 is ranked second in both lists, so it beats each list's unique winner
+        merged = merge_results([
+            [self._hit("a", 1, 0.9), self._hit("a", 2, 0.8)],
+            [self._hit("a", 3, 0.9), self._hit("a", 2, 0.8)],
+        ], k=1, fusion="rrf")
+
+        self.assertEqual(merged[0][0].page_content, "a-2")
+
+    @patch.dict(os.environ, {"QDRANT_COLLECTIONS": "shard_a, shard_b",
+                             "QDRANT_TENANT_COLLECTIONS": '{"acme": ["acme_docs"]}'})
+    def test_get_collections_for(self):
+        self.assertEqual(get_collections_for(), ["shard_a", "shard_b"])
+        self.assertEqual(get_collections_for("acme"), ["acme_docs"])
+        self.assertEqual(get_collections_for("unknown"), ["shard_a", "shard_b"])
+
+    @patch('integrations.qdrant_client.get_search_params', return_value=None)
+    @patch('integrations.qdrant_client.get_vector_store')
+    @patch('integrations.qdrant_client.get_embeddings')
+    def test_search_collections_skips_failed_shard(self, mock_embeddings, mock_get_store, mock_params):
+        mock_embeddings.return_value.embed_query.return_value = [0.1, 0.2]
+        stores = {"a": MagicMock(), "b": MagicMock()}
+        stores["a"].distance = models.Distance.COSINE
+        stores["a"].similarity_search_with_score_by_vector.return_value = [self._hit("a", 1, 0.6), self._hit("a", 2, -0.2)]
+        stores["b"].similarity_search_with_score_by_vector.side_effect = Exception("shard down")
+        mock_get_store.side_effect = stores.get
+
+        hits = search_collections("query", ["a", "b"], k=3, score_threshold=0.5)
+
+        # Cosine 0.6 -> relevance 0.8 passes the threshold; cosine -0.2 -> 0.4 does not
+        self.assertEqual([(doc.page_content, score) for doc, score in hits], [("a-1", 0.8)])
+        # The query is embedded once for every shard
+        mock_embeddings.return_value.embed_query.assert_called_once_with("query")
+
+    @patch('integrations.qdrant_client.search_collection')
+    @patch('integrations.qdrant_client.get_embeddings')
+    def test_fanout_searches_see_the_request_deadline(self, mock_embeddings, mock_search):
+        mock_embeddings.return_value.embed_query.return_value = [0.1, 0.2]
+        seen = []
+        mock_search.side_effect = lambda *args: seen.append(remaining()) or []
+
+        with deadline_scope(deadline_after(30)):
+            search_collections("query", ["a", "b"], k=3)
+
+        self.assertEqual(len(seen), 2)
+        self.assertTrue(all(left is not None and left <= 30 for left in seen))
+
+    @patch('integrations.qdrant_client.search_collection', return_value=[])
+    @patch('integrations.qdrant_client.get_embeddings')
+    def test_oversampling_only_with_question_index(self, mock_embeddings, mock_search):
+        mock_embeddings.return_value.embed_query.return_value = [0.1, 0.2]
+
+        with patch.dict(os.environ, {"RAG_QUESTION_INDEX": "false"}):
+            search_collections("query", ["a"], k=3)
+        with patch.dict(os.environ, {"RAG_QUESTION_INDEX": "true"}):
+            search_collections("query", ["a"], k=3)
+
+        self.assertEqual([call.args[-1] for call in mock_search.call_args_list], [1, qdrant_client.QUESTION_OVERSAMPLING])
+
+    @patch('integrations.qdrant_client.get_qdrant_client')
+    def test_question_hits_resolve_to_parent_chunk(self, mock_get_client):
+        parent = MagicMock(id="chunk-1", payload={"page_content": "Akash works at TCS.", "metadata": {"page": 0}})
+        mock_get_client.return_value.retrieve.return_value = [parent]
+        question = Document(page_content="Where does Akash work?",
+                            metadata={"kind": "question", "chunk_id": "chunk-1", "_id": "q-1"})
+        chunk = Document(page_content="Akash works at TCS.", metadata={"page": 0, "_id": "chunk-1"})
+        other = Document(page_content="Other chunk", metadata={"_id": "chunk-2"})
+
+        hits = resolve_question_hits("docs", [(question, 0.9), (chunk, 0.7), (other, 0.6)])
+
+        # The chunk is returned once, at its question's score
+        self.assertEqual([(doc.metadata["_id"], score) for doc, score in hits], [("chunk-1", 0.9), ("chunk-2", 0.6)])
+        self.assertEqual(hits[0][0].metadata["matched_question"], "Where does Akash work?")
+        mock_get_client.return_value.retrieve.assert_called_once_with(
+            "docs", ids=["chunk-1"], with_payload=True, with_vectors=False
+        )
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+from unittest.mock import patch, MagicMock
+from langchain_core.documents import Document
+from integrations.qdrant_client import document_id
+from tools.question_index import SyntheticQuestions, PassageQuestions, index_questions
+
+class TestQuestionIndex(unittest.TestCase):
+
+    @patch('tools.question_index.upsert_documents')
+    @patch('tools.question_index.get_question_llm')
+    def test_questions_point_back_to_their_chunk(self, mock_get_llm, mock_upsert):
+        docs = [
+            Document(page_content="Akash works at TCS.", metadata={"source": "data/a.pdf", "file_name": "a.pdf", "page": 0}),
+            Document(page_content="Page footer", metadata={"source": "data/a.pdf", "file_name": "a.pdf", "page": 1}),
+        ]
+        mock_llm = MagicMock()
+        mock_llm.invoke.return_value = SyntheticQuestions(passages=[
+            PassageQuestions(passage=1, questions=["Where does Akash work?", " ", "Who employs Akash?"]),
+            # Out-of-range passage numbers are ignored
+            PassageQuestions(passage=7, questions=["Unrelated?"]),
+        ])
+        mock_get_llm.return_value = mock_llm
+
+        ids = index_questions("docs", docs)
+
+        # One batched LLM call for both chunks
+        mock_llm.invoke.assert_called_once()
+        self.assertIn("[2] Page footer", mock_llm.invoke.call_args.args[0][0]["content"])
+        points = mock_upsert.call_args.args[1]
+        self.assertEqual([p.page_content for p in points], ["Where does Akash work?", "Who employs Akash?"])
+        self.assertEqual(points[0].metadata, {
+            "source": "data/a.pdf", "file_name": "a.pdf", "page": 0,
+            "kind": "question", "chunk_id": document_id(docs[0]),
+        })
+        self.assertEqual(ids, [document_id(p) for p in points])
+
+    @patch('tools.question_index.upsert_documents')
+    @patch('tools.question_index.get_question_llm')
+    def test_same_question_from_two_chunks_keeps_both_points(self, mock_get_llm, mock_upsert):
+        docs = [
+            Document(page_content="Akash is a Gen AI developer.", metadata={"source": "data/a.pdf", "page": 2}),
+            Document(page_content="Akash leads the RAG team.", metadata={"source": "data/a.pdf", "page": 2}),
+        ]
+        mock_get_llm.return_value.invoke.return_value = SyntheticQuestions(passages=[
+            PassageQuestions(passage=1, questions=["What is Akash role?"]),
+            PassageQuestions(passage=2, questions=["What is Akash role?"]),
+        ])
+
+        ids = index_questions("docs", docs)
+
+        points = mock_upsert.call_args.args[1]
+        self.assertEqual([p.metadata["chunk_id"] for p in points], [document_id(d) for d in docs])
+        self.assertEqual(len(set(ids)), 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+from integrations.rate_limiter import (
+    INGESTION, INTERACTIVE, LLM_OUTPUT_TOKENS, ProviderLimiter, estimate_tokens, flow_scope, priority_scope
+)
+from integrations.upstream import DeadlineExceeded, call_upstream, deadline_after, deadline_scope
+
+class TestRateLimiter(unittest.TestCase):
+
+    def _empty_limiter(self, rpm=1200, tpm=0):
+        limiter = ProviderLimiter("test", rpm=rpm, tpm=tpm, headroom=1.0)
+        limiter.requests.level = 0.0
+        return limiter
+
+    def _run(self, limiter, label, order, priority=INTERACTIVE, flow=None):
+        def target():
+            with priority_scope(priority), flow_scope(flow or label):
+                limiter.acquire()
+            order.append(label)
+        thread = threading.Thread(target=target)
+        thread.start()
+        # Let the caller queue up before the next one arrives
+        time.sleep(0.01)
+        return thread
+
+    def test_interactive_served_before_ingestion(self):
+        limiter = self._empty_limiter()
+        order = []
+        threads = [
+            self._run(limiter, "ingest", order, priority=INGESTION),
+            self._run(limiter, "query", order),
+        ]
+        for thread in threads:
+            thread.join(timeout=2)
+
+        self.assertEqual(order, ["query", "ingest"])
+
+    def test_flows_served_round_robin(self):
+        limiter = self._empty_limiter()
+        order = []
+        threads = [self._run(limiter, f"a{i}", order, flow="a") for i in range(3)]
+        threads.append(self._run(limiter, "b0", order, flow="b"))
+        for thread in threads:
+            thread.join(timeout=2)
+
+        self.assertEqual(order, ["a0", "b0", "a1", "a2"])
+
+    def test_token_estimate_settled_with_actual_usage(self):
+        limiter = ProviderLimiter("test", rpm=0, tpm=6000, headroom=1.0)
+        tokens = estimate_tokens("llm:chatbot", ([{"role": "user", "content": "x" * 400}],))
+        self.assertEqual(tokens, 100 + LLM_OUTPUT_TOKENS)
+
+        limiter.acquire(tokens)
+        limiter.settle(tokens, 120)
+
+        self.assertAlmostEqual(limiter.tokens.level, 200 - 120, delta=1)
+
+    def test_call_not_admitted_before_deadline(self):
+        limiter = self._empty_limiter(rpm=6)
+        fn = MagicMock()
+
+        with patch('integrations.upstream.get_limiter', return_value=limiter):
+            with deadline_scope(deadline_after(0.05)):
+                with self.assertRaises(DeadlineExceeded):
+                    call_upstream("llm:chatbot", fn, [])
+
+        fn.assert_not_called()
+        self.assertEqual(limiter.stats()["timed_out"], 1)
+        self.assertEqual(limiter.stats()["queued"], 0)
+
+if __name__ == '__main__':
+    unittest.main()
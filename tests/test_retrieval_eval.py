@@ -0,0 +1,21 @@
+import unittest
+from perf.retrieval_eval import compare
+
+BASELINE = {"recall_at_k": 0.9, "avg_rewrites": 0.3, "avg_llm_calls": 1.5, "p95_latency_s": 2.0}
+
+class TestRetrievalEval(unittest.TestCase):
+
+    def test_no_regression_within_tolerance(self):
+        metrics = {"recall_at_k": 0.89, "avg_rewrites": 0.35, "avg_llm_calls": 1.55, "p95_latency_s": 3.0}
+        self.assertEqual(compare(metrics, BASELINE), [])
+
+    def test_quality_and_cost_regressions(self):
+        metrics = {"recall_at_k": 0.8, "avg_rewrites": 0.6, "avg_llm_calls": 2.1, "p95_latency_s": 3.0}
+
+        regressions = compare(metrics, BASELINE, check_latency=True)
+
+        self.assertEqual(len(regressions), 4)
+        self.assertTrue(regressions[0].startswith("recall@k dropped"))
+
+if __name__ == '__main__':
+    unittest.main()
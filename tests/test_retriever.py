@@ -1,16 +1,15 @@
 import unittest
 from unittest.mock import patch, MagicMock
+from langchain_core.documents import Document
 from tools.retriever import retrieve_documents, index_pdf_documents
 
 class TestRetriever(unittest.TestCase):
 
-    @patch('tools.retriever.get_retriever')
-    def test_retrieve_documents(self, mock_get_retriever):
-        mock_retriever = MagicMock()
+    @patch('tools.retriever.search_collections')
+    def test_retrieve_documents(self, mock_search):
         mock_doc = MagicMock()
         mock_doc.page_content = "This is a test document."
-        mock_retriever.invoke.return_value = [mock_doc]
-        mock_get_retriever.return_value = mock_retriever
+        mock_search.return_value = [(mock_doc, 0.9)]
 
         result = retrieve_documents("test query")
         self.assertIn("This is a test document.", result)
@@ -21,7 +20,7 @@ class TestRetriever(unittest.TestCase):
     @patch('tools.retriever.upsert_documents')
     def test_index_pdf_documents(self, mock_upsert, mock_create, mock_chunk, mock_load):
         mock_load.return_value = ["raw_doc"]
-        mock_chunk.return_value = ["chunk1", "chunk2"]
+        mock_chunk.return_value = [Document(page_content="chunk1"), Document(page_content="chunk2")]
 
         index_pdf_documents(["test.pdf"])
 
@@ -30,5 +29,59 @@ class TestRetriever(unittest.TestCase):
         mock_create.assert_called()
         mock_upsert.assert_called()
 
+    @patch('tools.retriever.load_pdf')
+    @patch('tools.retriever.chunk_documents')
+    @patch('tools.retriever.create_collection')
+    @patch('tools.retriever.upsert_documents')
+    def test_index_pdf_documents_flushes_batches(self, mock_upsert, mock_create, mock_chunk, mock_load):
+        mock_load.return_value = iter(["page1", "page2", "page3"])
+        mock_chunk.side_effect = lambda pages: [
+            Document(page_content=f"{pages[0]}-a"), Document(page_content=f"{pages[0]}-b")
+        ]
+
+        index_pdf_documents(["test.pdf"], batch_size=4)
+
+        self.assertEqual(mock_chunk.call_count, 3)
+        mock_create.assert_called_once()
+        batches = [[doc.page_content for doc in call.args[1]] for call in mock_upsert.call_args_list]
+        self.assertEqual(batches, [
+            ["page1-a", "page1-b", "page2-a", "page2-b"],
+            ["page3-a", "page3-b"],
+        ])
+
+    @patch('tools.retriever.load_pdf')
+    @patch('tools.retriever.create_collection')
+    @patch('tools.retriever.upsert_documents')
+    def test_index_pdf_documents_empty(self, mock_upsert, mock_create, mock_load):
+        mock_load.return_value = iter([])
+
+        index_pdf_documents(["empty.pdf"])
+
+        mock_create.assert_not_called()
+        mock_upsert.assert_not_called()
+
+    @patch('tools.retriever.load_pdf')
+    @patch('tools.retriever.chunk_documents')
+    @patch('tools.retriever.create_collection')
+    @patch('tools.retriever.upsert_documents')
+    @patch('tools.retriever.add_duplicate_provenance')
+    def test_index_pdf_documents_skips_duplicates(self, mock_provenance, mock_upsert, mock_create, mock_chunk, mock_load):
+        footer = "Confidential. Do not distribute without written permission from the author."
+        mock_load.return_value = iter([
+            Document(page_content="p1", metadata={"source": "a.pdf", "page": 0}),
+            Document(page_content="p2", metadata={"source": "a.pdf", "page": 1}),
+        ])
+        mock_chunk.side_effect = lambda pages: [
+            Document(page_content=f"Body text of {pages[0].page_content} about weather stations.", metadata=pages[0].metadata),
+            Document(page_content=footer, metadata=pages[0].metadata),
+        ]
+
+        index_pdf_documents(["a.pdf"])
+
+        upserted = [doc for call in mock_upsert.call_args_list for doc in call.args[1]]
+        self.assertEqual(len(upserted), 3)
+        provenance = mock_provenance.call_args.args[1]
+        self.assertEqual(list(provenance.values()), [[{"source": "a.pdf", "page": 1}]])
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+from unittest.mock import patch
+from agents import router
+from agents.router import extract_weather_city, KnowledgeBaseClassifier, route_message, warm_up
+
+class FakeEmbeddings:
+    """Maps text to a 3-d vector: (mentions Akash, mentions weather, other)."""
+
+    def _embed(self, text):
+        text = text.lower()
+        return [1.0 if "akash" in text else 0.0, 1.0 if "weather" in text else 0.0, 0.3]
+
+    def embed_documents(self, texts):
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+class TestWeatherRules(unittest.TestCase):
+
+    def test_extracts_city(self):
+        self.assertEqual(extract_weather_city("What is the weather in London?"), "London")
+        self.assertEqual(extract_weather_city("what's the weather like in New York right now"), "New York")
+        self.assertEqual(extract_weather_city("weather in Tokyo"), "Tokyo")
+        self.assertEqual(extract_weather_city("How cold is it in Oslo today?"), "Oslo")
+
+    def test_ignores_unclear_requests(self):
+        self.assertIsNone(extract_weather_city("What will the weather be in Paris tomorrow?"))
+        self.assertIsNone(extract_weather_city("What is the weather in Paris and who is Akash?"))
+        self.assertIsNone(extract_weather_city("Compare the weather in Rome vs Milan"))
+        self.assertIsNone(extract_weather_city("Who is Akash Kumar Shaw?"))
+
+class TestKnowledgeBaseClassifier(unittest.TestCase):
+
+    @patch('agents.router.get_embeddings')
+    def test_classifies_kb_queries(self, mock_get_embeddings):
+        mock_get_embeddings.return_value = FakeEmbeddings()
+        classifier = KnowledgeBaseClassifier()
+
+        self.assertTrue(classifier.is_knowledge_base_query("Tell me about Akash's work history"))
+        self.assertFalse(classifier.is_knowledge_base_query("What is the capital of Peru?"))
+        # Follow-ups that depend on earlier turns go to the LLM
+        self.assertFalse(classifier.is_knowledge_base_query("What is his role at Akash's company?"))
+
+    @patch('agents.router.get_embeddings')
+    def test_warm_up_embeds_examples_once(self, mock_get_embeddings):
+        embeddings = FakeEmbeddings()
+        mock_get_embeddings.return_value = embeddings
+        with patch.object(router, "_kb_classifier", KnowledgeBaseClassifier()), \
+                patch.object(embeddings, "embed_documents", wraps=embeddings.embed_documents) as embed_documents:
+            warm_up()
+            embed_documents.assert_called_once()
+            self.assertTrue(route_message("Tell me about Akash's work history"))
+            embed_documents.assert_called_once()
+
+    @patch('agents.router._kb_classifier')
+    def test_route_message(self, mock_classifier):
+        mock_classifier.is_knowledge_base_query.return_value = False
+        self.assertEqual(route_message("What is the weather in London?"),
+                         {"name": "weather_tool", "args": {"city": "London"}})
+        self.assertIsNone(route_message("Hello there"))
+
+        mock_classifier.is_knowledge_base_query.side_effect = RuntimeError("no API key")
+        self.assertIsNone(route_message("Who is Akash?"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import itertools
+import time
+import unittest
+from integrations import upstream
+from integrations.upstream import (
+    DeadlineExceeded, call_upstream, current_deadline, deadline_after, deadline_scope, remaining,
+    configure_hedging, hedge_stats
+)
+
+class TestUpstreamDeadlines(unittest.TestCase):
+
+    def test_no_deadline_calls_directly(self):
+        self.assertIsNone(remaining())
+        self.assertEqual(call_upstream("llm", lambda x: x * 2, 21), 42)
+
+    def test_slow_call_cut_off_at_deadline(self):
+        started = time.monotonic()
+        with deadline_scope(deadline_after(0.1)):
+            with self.assertRaises(DeadlineExceeded):
+                call_upstream("llm", time.sleep, 1.0)
+        self.assertLess(time.monotonic() - started, 0.5)
+
+    def test_nested_scope_only_tightens(self):
+        outer = deadline_after(10)
+        with deadline_scope(outer):
+            with deadline_scope(deadline_after(60)):
+                self.assertEqual(current_deadline(), outer)
+            with deadline_scope(deadline_after(1)):
+                self.assertLess(remaining(), 2)
+                # The deadline is visible inside the upstream call
+                self.assertLess(call_upstream("qdrant", remaining), 2)
+            self.assertEqual(current_deadline(), outer)
+        self.assertIsNone(current_deadline())
+
+class TestHedging(unittest.TestCase):
+
+    def setUp(self):
+        configure_hedging(["llm"], percentile=95, budget=0.5)
+        self.addCleanup(configure_hedging, [])
+
+    def _warm_up(self, name, latency=0.01):
+        policy = upstream._hedge_policy(name)
+        for _ in range(upstream.HEDGE_MIN_SAMPLES):
+            policy.record(latency)
+            policy.start_call()
+
+    def test_duplicate_wins_when_first_call_is_slow(self):
+        self._warm_up("llm:grader")
+        attempts = itertools.count()
+
+        def grade():
+            # The first request stalls; the hedged duplicate answers quickly
+            if next(attempts) == 0:
+                time.sleep(1.0)
+                return "slow"
+            return "fast"
+
+        started = time.monotonic()
+        self.assertEqual(call_upstream("llm:grader", grade), "fast")
+        self.assertLess(time.monotonic() - started, 0.5)
+        stats = hedge_stats()["llm:grader"]
+        self.assertEqual((stats["hedges"], stats["hedge_wins"]), (1, 1))
+
+    def test_budget_caps_duplicates(self):
+        configure_hedging(budget=0.0)
+        self._warm_up("llm:grader")
+
+        self.assertEqual(call_upstream("llm:grader", lambda: time.sleep(0.05) or "done"), "done")
+        self.assertEqual(hedge_stats()["llm:grader"]["hedges"], 0)
+
+    def test_unhedged_provider_untouched(self):
+        self.assertEqual(call_upstream("weather", lambda: "sunny"), "sunny")
+        self.assertNotIn("weather", hedge_stats())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,22 +6,49 @@ This module implements a self-contained LangGraph sub-graph that:
 2. Grades them for relevance using an LLM
 3. Rewrites the query if documents are not relevant (max 2 retries)
 4. Returns the relevant context or an empty string if nothing found
+
+Under a request deadline (see integrations/upstream.py) the loop stops
+rewriting once too little time is left and returns the best-scoring context
+retrieved so far.
 """
 
-from typing import TypedDict, Literal
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from contextvars import copy_context
+from functools import lru_cache
+from typing import List, Optional, Tuple, TypedDict, Literal
+from langchain_core.documents import Document
 from pydantic import BaseModel, Field
-from langchain_openai import ChatOpenAI
 from langgraph.graph import StateGraph, END
-from integrations.qdrant_client import get_retriever
+from integrations.llm import get_chat_model
+from integrations.qdrant_client import (
+    COLLECTION_NAME, embed_query, get_vector_store, get_collections_for, get_documents_by_id, search_collections
+)
+from integrations.upstream import (
+    DeadlineExceeded, call_upstream, current_deadline, remaining, with_state_deadline
+)
+from tools.compression import compression_enabled, maybe_compress
 from tools.prompts import GRADE_PROMPT, REWRITE_PROMPT
-from dotenv import load_dotenv
-load_dotenv()
-# Collection name (must match the one used in retriever.py)
-COLLECTION_NAME = "rag_weather_cohere2"
+from tools.tool_results import retrieval_result
 
 # Maximum number of query rewrite attempts
 MAX_RETRIES = 2
 
+# Chunks returned per search and the minimum similarity they need.
+# Both directly change how often the rewrite loop fires; check changes with
+# scripts/eval_retrieval.py.
+RETRIEVAL_K = 3
+SCORE_THRESHOLD = 0.3
+
+# Seconds a rewrite + retrieve + grade cycle needs. With less time left before
+# the deadline, the loop stops and returns the best context seen so far.
+RETRY_MIN_BUDGET = float(os.getenv("RAG_RETRY_MIN_BUDGET", "2.0"))
+
 
 # --- State Schema ---
 
@@ -33,9 +60,19 @@ class AdvancedRetrieverState(TypedDict):
     """State for the advanced retriever sub-graph."""
     query: str                # Current query (may be rewritten)
     original_query: str       # Original user query (preserved)
+    query_vector: Optional[List[float]]  # Embedding of original_query, once computed
     context: str              # Retrieved document content
     retry_count: int          # Number of rewrite attempts
     is_relevant: bool         # Whether final documents were graded as relevant
+    filters: Optional[dict]   # Metadata filters applied to every search (see build_filter)
+    collections: List[str]    # Collections (shards) searched and merged
+    documents: List[Document] # Documents behind the context (empty if not relevant)
+    llm_calls: int            # Grader and rewriter calls made so far
+    deadline: Optional[float] # time.monotonic() deadline for the whole run, if any
+    best_score: float         # Top relevance score of the best retrieval so far
+    best_context: str         # Context of that retrieval
+    best_documents: List[Document]
+    timed_out: bool           # Whether the deadline cut the loop short
 
 
 # --- Pydantic Model for Structured Output ---
@@ -48,40 +85,197 @@ class GradeDocuments(BaseModel):
 
 
 # --- LLM Setup ---
+# Clients are created on first use (see integrations/llm.py) so importing this
+# module does not require API keys or pull in the OpenAI SDK.
+
+GRADER_MODEL = "gpt-4.1-nano"
+REWRITER_MODEL = "gpt-4.1-mini"
+
+
+@lru_cache(maxsize=None)
+def get_grader_llm():
+    """Return the structured-output grader LLM."""
+    return get_chat_model(GRADER_MODEL, temperature=0).with_structured_output(GradeDocuments)
+
+
+def get_rewriter_llm():
+    """Return the query rewriter LLM."""
+    return get_chat_model(REWRITER_MODEL, temperature=0)
+
+
+# --- Search ---
+
+def search_documents(query: str, filters: Optional[dict] = None, collections: Optional[List[str]] = None,
+                     embedding: Optional[List[float]] = None) -> List[Document]:
+    """
+    Embed the query (unless embedding is given) and run the thresholded vector
+    search. With several collections the search fans out concurrently and the
+    top-k are merged. Each document's relevance score is kept in
+    metadata["relevance_score"].
+    """
+    collections = collections or [COLLECTION_NAME]
+    hits = search_collections(
+        query, collections, k=RETRIEVAL_K, score_threshold=SCORE_THRESHOLD, filters=filters, timeout=remaining(),
+        embedding=embedding,
+    )
+    for doc, score in hits:
+        doc.metadata["relevance_score"] = score
+    return [doc for doc, _ in hits]
+
+
+# --- Speculative Prefetch ---
+# The agent can start a search on the raw user message while its first LLM
+# call is still deciding whether to call retriever_tool. If the tool query
+# turns out to cover the same content words, the first retrieve reuses those
+# results instead of searching again. Grading and rewriting are unchanged.
+
+# Share of the prefetched message's content words the tool query must contain
+PREFETCH_MIN_OVERLAP = 0.6
+# Pending prefetches kept around; older ones (e.g. weather questions) are dropped
+PREFETCH_CACHE_SIZE = 32
+# Seconds an unclaimed prefetch stays usable; the tool call follows within one LLM round
+PREFETCH_MAX_AGE = 30.0
+
+_STOPWORDS = {
+    "a", "an", "the", "is", "are", "was", "were", "be", "of", "in", "on", "at", "to", "for",
+    "and", "or", "what", "who", "how", "when", "where", "which", "why", "do", "does", "did",
+    "about", "me", "tell", "can", "you", "please", "his", "her", "their", "it", "its", "with",
+}
+_WORD_RE = re.compile(r"\w+")
 
-grader_llm = ChatOpenAI(model="gpt-4.1-nano", temperature=0)
-rewriter_llm = ChatOpenAI(model="gpt-4.1-mini", temperature=0)
+_prefetch_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="prefetch")
+# message -> (search future, monotonic start time), oldest first
+_prefetches: "OrderedDict[str, Tuple[Future, float]]" = OrderedDict()
+_prefetch_lock = threading.Lock()
+
+
+def _content_words(text: str) -> set:
+    return {w for w in _WORD_RE.findall(text.lower()) if w not in _STOPWORDS}
+
+
+def _drop_expired_prefetches(now: float) -> None:
+    # Callers hold _prefetch_lock
+    while _prefetches and (len(_prefetches) > PREFETCH_CACHE_SIZE
+                           or now - next(iter(_prefetches.values()))[1] > PREFETCH_MAX_AGE):
+        _prefetches.popitem(last=False)
+
+
+def prefetch(query: str) -> None:
+    """
+    Start an unfiltered search of the default collections for query in the
+    background, in the caller's context (deadline, rate-limit priority, cassette).
+    """
+    key = query.strip()
+    if not _content_words(key):
+        return
+    now = time.monotonic()
+    with _prefetch_lock:
+        _drop_expired_prefetches(now)
+        if key in _prefetches:
+            return
+        future = _prefetch_executor.submit(copy_context().run, search_documents, key, None, get_collections_for())
+        _prefetches[key] = (future, now)
+        _drop_expired_prefetches(now)
+
+
+def take_prefetched(query: str) -> Optional[List[Document]]:
+    """
+    Return (and consume) prefetched results whose message is covered by query,
+    or None when there is no usable prefetch.
+    """
+    query_words = _content_words(query)
+    with _prefetch_lock:
+        _drop_expired_prefetches(time.monotonic())
+        match = None
+        for key in reversed(_prefetches):
+            key_words = _content_words(key)
+            if len(key_words & query_words) / len(key_words) >= PREFETCH_MIN_OVERLAP:
+                match = key
+                break
+        if match is None:
+            return None
+        future, _ = _prefetches.pop(match)
+    try:
+        return future.result(timeout=remaining())
+    except FutureTimeout:
+        return None
+    except Exception:
+        # Fall back to a normal search
+        return None
 
 
 # --- Node Functions ---
 
+def _out_of_time() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def _low_on_time() -> bool:
+    left = remaining()
+    return left is not None and left < RETRY_MIN_BUDGET
+
+
+@with_state_deadline
 def retrieve_node(state: AdvancedRetrieverState) -> dict:
     """Retrieve documents from Qdrant based on the current query."""
     query = state["query"]
+    original_query = state.get("original_query") or query
+    filters = state.get("filters")
+    collections = state.get("collections") or get_collections_for()
+    query_vector = state.get("query_vector")
     
-    # Get retriever with score threshold
-    retriever = get_retriever(COLLECTION_NAME, k=3, score_threshold=0.3)
-    docs = retriever.invoke(query)
+    docs = None
+    if state["retry_count"] == 0 and not filters and collections == get_collections_for():
+        docs = take_prefetched(query)
+    try:
+        if query_vector is None and compression_enabled():
+            # Embedded once per run: every compression pass and the original
+            # query's search reuse the vector
+            query_vector = embed_query(original_query)
+        if docs is None and query == original_query and query_vector is not None:
+            docs = search_documents(query, filters, collections, embedding=query_vector)
+        elif docs is None:
+            docs = search_documents(query, filters, collections)
+    except DeadlineExceeded:
+        return {"context": "", "documents": [], "timed_out": True}
+    # Optionally keep only the sentences that answer the question (RAG_COMPRESSION)
+    docs = maybe_compress(original_query, docs, query_vector=query_vector)
     
     # Concatenate document content
     context = "\n\n".join([doc.page_content for doc in docs])
+    update = {"context": context, "documents": docs, "query_vector": query_vector}
+
+    # Remember the best-scoring retrieval in case the deadline ends the loop early
+    if state.get("deadline") is not None and context.strip():
+        score = max(doc.metadata.get("relevance_score", 0.0) for doc in docs)
+        if not state.get("best_context") or score > state.get("best_score", 0.0):
+            update.update({"best_score": score, "best_context": context, "best_documents": docs})
     
-    return {"context": context}
+    # Non-empty context is graded next, which costs one LLM call
+    graded = bool(context.strip()) and not _out_of_time()
+    update["llm_calls"] = state.get("llm_calls", 0) + (1 if graded else 0)
+    return update
 
 
+@with_state_deadline
 def rewrite_question_node(state: AdvancedRetrieverState) -> dict:
     """Rewrite the query to improve retrieval results."""
     query = state["query"]
     retry_count = state["retry_count"]
     
     prompt = REWRITE_PROMPT.format(question=query)
-    response = rewriter_llm.invoke([{"role": "user", "content": prompt}])
+    try:
+        response = call_upstream("llm:rewriter", get_rewriter_llm().invoke, [{"role": "user", "content": prompt}])
+    except DeadlineExceeded:
+        return {"retry_count": retry_count + 1, "timed_out": True, "llm_calls": state.get("llm_calls", 0) + 1}
     
     new_query = str(response.content).strip()
     
     return {
         "query": new_query,
-        "retry_count": retry_count + 1
+        "retry_count": retry_count + 1,
+        "llm_calls": state.get("llm_calls", 0) + 1
     }
 
 
@@ -94,35 +288,56 @@ def return_context_irrelevant_node(state: AdvancedRetrieverState) -> dict:
     """Return default message when no relevant documents found after max retries."""
     return {
         "context": NO_RELEVANT_DOCS_MESSAGE,
-        "is_relevant": False
+        "is_relevant": False,
+        "documents": []
+    }
+
+
+def return_best_context_node(state: AdvancedRetrieverState) -> dict:
+    """Return the best-scoring context seen so far when the deadline ends the loop."""
+    if not state.get("best_context"):
+        return return_context_irrelevant_node(state)
+    return {
+        "context": state["best_context"],
+        "documents": state.get("best_documents", []),
+        "is_relevant": False,
+        "timed_out": True
     }
 
 
 # --- Conditional Edge Function ---
 
-def grade_documents(state: AdvancedRetrieverState) -> Literal["return_context_relevant", "return_context_irrelevant", "rewrite_question"]:
+@with_state_deadline
+def grade_documents(state: AdvancedRetrieverState) -> Literal["return_context_relevant", "return_context_irrelevant", "return_best_context", "rewrite_question"]:
     """
     Grade retrieved documents for relevance.
     Routes to 'return_context_relevant' if documents are relevant.
     Routes to 'return_context_irrelevant' if max retries reached with irrelevant docs.
+    Routes to 'return_best_context' if the deadline leaves no time to grade or retry.
     Routes to 'rewrite_question' if not relevant and retries remaining.
     """
     query = state["original_query"]
     context = state["context"]
     retry_count = state["retry_count"]
+
+    if state.get("timed_out") or _out_of_time():
+        return "return_best_context"
     
     # If no context retrieved, check if we should retry
     if not context or context.strip() == "":
         if retry_count >= MAX_RETRIES:
             return "return_context_irrelevant"
+        if _low_on_time():
+            return "return_best_context"
         return "rewrite_question"
     
     # Grade the documents using LLM
     prompt = GRADE_PROMPT.format(question=query, context=context)
     
-    response = grader_llm.with_structured_output(GradeDocuments).invoke(
-        [{"role": "user", "content": prompt}]
-    )
+    try:
+        response = call_upstream("llm:grader", get_grader_llm().invoke, [{"role": "user", "content": prompt}])
+    except DeadlineExceeded:
+        return "return_best_context"
     
     if isinstance(response, dict):
         score = response.get("binary_score", "no").lower()
@@ -136,6 +351,8 @@ def grade_documents(state: AdvancedRetrieverState) -> Literal["return_context_re
         if retry_count >= MAX_RETRIES:
             # Max retries reached, return default message
             return "return_context_irrelevant"
+        if _low_on_time():
+            return "return_best_context"
         return "rewrite_question"
 
 
@@ -150,6 +367,7 @@ def build_advanced_retriever_graph():
     graph_builder.add_node("rewrite_question", rewrite_question_node)
     graph_builder.add_node("return_context_relevant", return_context_relevant_node)
     graph_builder.add_node("return_context_irrelevant", return_context_irrelevant_node)
+    graph_builder.add_node("return_best_context", return_best_context_node)
     
     # Set entry point
     graph_builder.set_entry_point("retrieve")
@@ -161,6 +379,7 @@ def build_advanced_retriever_graph():
         {
             "return_context_relevant": "return_context_relevant",
             "return_context_irrelevant": "return_context_irrelevant",
+            "return_best_context": "return_best_context",
             "rewrite_question": "rewrite_question"
         }
     )
@@ -171,6 +390,7 @@ def build_advanced_retriever_graph():
     # Terminal nodes
     graph_builder.add_edge("return_context_relevant", END)
     graph_builder.add_edge("return_context_irrelevant", END)
+    graph_builder.add_edge("return_best_context", END)
     
     return graph_builder.compile()
 
@@ -188,28 +408,119 @@ def _get_graph():
     return _retriever_graph
 
 
-def advanced_retrieve(query: str) -> str:
+def warm_up():
     """
-    Retrieve relevant documents with automatic grading and query rewriting.
-    
-    Args:
-        query: The user's query to search for.
-        
-    Returns:
-        Retrieved document content if relevant documents found,
-        empty string if no relevant documents after max retries.
+    Eagerly build the retriever graph and its LLM, embedding and Qdrant clients.
+    Servers call this once at startup so the first request does not pay for it.
+    """
+    _get_graph()
+    get_grader_llm()
+    get_rewriter_llm()
+    try:
+        get_vector_store(COLLECTION_NAME)
+    except Exception as e:
+        # The collection may not be ingested yet; retrieval will retry on first use.
+        print(f"Warning: could not open collection '{COLLECTION_NAME}': {e}")
+
+
+def run_advanced_retriever(
+    query: str,
+    filters: Optional[dict] = None,
+    tenant: Optional[str] = None,
+    deadline: Optional[float] = None,
+) -> AdvancedRetrieverState:
+    """
+    Run the retriever sub-graph to completion and return its final state,
+    including the retrieved documents, rewrite count and LLM call count.
+    tenant selects the collections to search (see get_collections_for).
+    deadline (time.monotonic()) defaults to the caller's current deadline.
     """
     graph = _get_graph()
     
     initial_state: AdvancedRetrieverState = {
         "query": query,
         "original_query": query,
+        "query_vector": None,
         "context": "",
         "retry_count": 0,
-        "is_relevant": False
+        "is_relevant": False,
+        "filters": filters,
+        "collections": get_collections_for(tenant),
+        "documents": [],
+        "llm_calls": 0,
+        "deadline": deadline if deadline is not None else current_deadline(),
+        "best_score": 0.0,
+        "best_context": "",
+        "best_documents": [],
+        "timed_out": False
     }
     
     # Run the graph to completion
-    final_state = graph.invoke(initial_state)
+    return graph.invoke(initial_state)
+
+
+def advanced_retrieve(
+    query: str,
+    filters: Optional[dict] = None,
+    tenant: Optional[str] = None,
+    deadline: Optional[float] = None,
+) -> str:
+    """
+    Retrieve relevant documents with automatic grading and query rewriting.
     
+    Args:
+        query: The user's query to search for.
+        filters: Optional metadata filters, e.g. {"file_name": "report.pdf", "page": 2}.
+        tenant: Optional tenant whose collections are searched.
+        deadline: Optional time.monotonic() deadline; when it gets close, the
+            best context found so far is returned instead of retrying.
+        
+    Returns:
+        Retrieved document content if relevant documents found,
+        empty string if no relevant documents after max retries.
+    """
+    final_state = run_advanced_retriever(query, filters, tenant, deadline)
     return final_state.get("context", "")
+
+
+def retrieve_results(
+    query: str,
+    filters: Optional[dict] = None,
+    tenant: Optional[str] = None,
+    deadline: Optional[float] = None,
+) -> dict:
+    """
+    Like advanced_retrieve, but returns the typed result that retriever_tool
+    sends to the LLM: chunk IDs, scores, citations and trimmed text (see
+    tools/tool_results.py).
+    """
+    final_state = run_advanced_retriever(query, filters, tenant, deadline)
+    documents = final_state.get("documents") or []
+    return retrieval_result(
+        query,
+        documents,
+        message=None if documents else NO_RELEVANT_DOCS_MESSAGE,
+        partial=bool(documents) and final_state.get("timed_out", False) and not final_state.get("is_relevant"),
+    )
+
+
+def read_chunks(query: str, chunk_ids: List[str], tenant: Optional[str] = None) -> dict:
+    """
+    Reads chunks from earlier retrieval results again by ID, in the order
+    given. IDs that are malformed or not found are left out.
+    """
+    ids = []
+    for chunk_id in chunk_ids:
+        try:
+            ids.append(str(uuid.UUID(str(chunk_id))))
+        except ValueError:
+            continue
+    found = {}
+    for collection in get_collections_for(tenant):
+        missing = [chunk_id for chunk_id in ids if chunk_id not in found]
+        if not missing:
+            break
+        for doc in call_upstream("qdrant", get_documents_by_id, collection, missing):
+            found[doc.metadata["_id"]] = doc
+    documents = [found[chunk_id] for chunk_id in ids if chunk_id in found]
+    return retrieval_result(query, documents, message=None if documents else "No chunks found for these IDs.")
@@ -0,0 +1,134 @@
+"""
+Sentence-level extractive compression of retrieved chunks.
+
+Retrieved chunks (~1000 characters) usually hold only one or two sentences
+that answer the question. Chunks are split into sentences, every sentence is
+scored against the query embedding in one matrix product, and only the best
+sentences (plus their neighbours, for context) are passed on to the grader
+and the chatbot LLM.
+
+Sentence embeddings are computed at ingest (see precompute_sentence_embeddings)
+and read from the shared cache at query time; only cache misses are embedded,
+in a single batched call.
+"""
+
+import os
+import re
+from typing import List, Optional
+from langchain_core.documents import Document
+from integrations.embeddings import get_embeddings
+from integrations.embedding_cache import get_sentence_cache
+from integrations.upstream import call_upstream
+
+# Sentences kept across all retrieved chunks
+COMPRESSION_MAX_SENTENCES = int(os.getenv("RAG_COMPRESSION_MAX_SENTENCES", "4"))
+# Sentences kept on each side of a selected sentence, within its chunk
+COMPRESSION_NEIGHBORS = 1
+# Fragments shorter than this are merged into the preceding sentence
+MIN_SENTENCE_CHARS = 20
+
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+(?=[\"'(\[]?[A-Z0-9])|\n\s*\n")
+
+
+def compression_enabled() -> bool:
+    return os.getenv("RAG_COMPRESSION", "false").lower() in ("1", "true", "yes")
+
+
+def split_sentences(text: str) -> List[str]:
+    """Splits text into sentences; short fragments (list markers, headings) join their predecessor."""
+    sentences = []
+    for part in _SENTENCE_BOUNDARY.split(text):
+        part = " ".join(part.split())
+        if not part:
+            continue
+        if sentences and len(part) < MIN_SENTENCE_CHARS:
+            sentences[-1] = f"{sentences[-1]} {part}"
+        else:
+            sentences.append(part)
+    return sentences
+
+
+def _model_name(embeddings) -> str:
+    return getattr(embeddings, "model", None) or type(embeddings).__name__
+
+
+def embed_sentences(sentences: List[str]):
+    """
+    Returns an (n, d) float32 matrix of sentence embeddings, taking cached
+    vectors where available and embedding the rest in one call.
+    """
+    import numpy as np
+
+    embeddings = get_embeddings()
+    model = _model_name(embeddings)
+    cache = get_sentence_cache()
+    cached = cache.get_many(model, sentences)
+    missing = list(dict.fromkeys(s for s in sentences if s not in cached))
+    if missing:
+        vectors = call_upstream("embedding:documents", embeddings.embed_documents, missing)
+        cache.put_many(model, missing, vectors)
+        cached.update({s: np.asarray(v, dtype=np.float32) for s, v in zip(missing, vectors)})
+    return np.vstack([cached[s] for s in sentences])
+
+
+def precompute_sentence_embeddings(docs: List[Document]) -> int:
+    """
+    Embeds and caches the sentences of freshly ingested chunks, so queries only
+    have to embed the question. Returns the number of sentences.
+    """
+    sentences = [s for doc in docs for s in split_sentences(doc.page_content)]
+    if sentences:
+        embed_sentences(sentences)
+    return len(sentences)
+
+
+def compress_documents(
+    query: str,
+    docs: List[Document],
+    max_sentences: int = COMPRESSION_MAX_SENTENCES,
+    neighbors: int = COMPRESSION_NEIGHBORS,
+    query_vector: Optional[List[float]] = None,
+) -> List[Document]:
+    """
+    Returns the documents reduced to their most query-relevant sentences,
+    in original order. Documents without a selected sentence are dropped.
+    query_vector is the query's embedding, if the caller already has it.
+    """
+    import numpy as np
+
+    split = [split_sentences(doc.page_content) for doc in docs]
+    owners = [(d, s) for d, sentences in enumerate(split) for s in range(len(sentences))]
+    if len(owners) <= max_sentences:
+        return docs
+
+    matrix = embed_sentences([split[d][s] for d, s in owners])
+    if query_vector is None:
+        query_vector = call_upstream("embedding:query", get_embeddings().embed_query, query)
+    query_vector = np.asarray(query_vector, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1) * (np.linalg.norm(query_vector) or 1.0)
+    scores = (matrix @ query_vector) / np.where(norms == 0, 1.0, norms)
+    top = np.argpartition(-scores, max_sentences - 1)[:max_sentences]
+
+    keep = [set() for _ in docs]
+    for index in top:
+        d, s = owners[index]
+        keep[d].update(range(max(0, s - neighbors), min(len(split[d]), s + neighbors + 1)))
+
+    compressed = []
+    for doc, sentences, kept in zip(docs, split, keep):
+        if kept:
+            text = " ".join(sentences[s] for s in sorted(kept))
+            compressed.append(doc.model_copy(update={"page_content": text}))
+    return compressed
+
+
+def maybe_compress(query: str, docs: List[Document], enabled: Optional[bool] = None,
+                   query_vector: Optional[List[float]] = None) -> List[Document]:
+    """compress_documents when RAG_COMPRESSION is on; falls back to the full chunks on errors."""
+    if not docs or not (compression_enabled() if enabled is None else enabled):
+        return docs
+    try:
+        return compress_documents(query, docs, query_vector=query_vector)
+    except Exception as e:
+        print(f"Warning: context compression failed, using full chunks: {e}")
+        return docs
@@ -0,0 +1,85 @@
+"""
+Synthetic question index built at ingest.
+
+User questions often embed far from the declarative prose of the chunks that
+answer them, which is what sends most queries into the rewrite loop. With
+RAG_QUESTION_INDEX on, ingestion asks an LLM for a few questions each chunk
+answers (several chunks per call) and stores them, embedded, in the chunk
+collection as extra points pointing back to their chunk. Searches then match
+questions and chunks together (see integrations/qdrant_client.py).
+"""
+
+import os
+from functools import lru_cache
+from typing import List
+from langchain_core.documents import Document
+from pydantic import BaseModel, Field
+from integrations.llm import get_chat_model
+from integrations.qdrant_client import QUESTION_KIND, document_id, question_index_enabled, upsert_documents
+from integrations.upstream import call_upstream
+from tools.prompts import SYNTHETIC_QUESTIONS_PROMPT
+
+# Questions generated per chunk
+QUESTIONS_PER_CHUNK = int(os.getenv("RAG_QUESTIONS_PER_CHUNK", "3"))
+# Chunks sent to the LLM per call
+QUESTION_BATCH_SIZE = 8
+
+QUESTION_MODEL = "gpt-4.1-nano"
+
+# Chunk metadata copied onto its questions, so filtered searches and
+# per-file deletes cover them too
+QUESTION_METADATA_KEYS = ("source", "file_name", "page")
+
+
+class PassageQuestions(BaseModel):
+    passage: int = Field(description="Number of the passage the questions are about")
+    questions: List[str] = Field(description="Questions the passage answers")
+
+
+class SyntheticQuestions(BaseModel):
+    """Questions answered by each numbered passage."""
+    passages: List[PassageQuestions]
+
+
+@lru_cache(maxsize=None)
+def get_question_llm():
+    """Return the structured-output question generator LLM."""
+    return get_chat_model(QUESTION_MODEL, temperature=0).with_structured_output(SyntheticQuestions)
+
+
+def generate_questions(docs: List[Document], count: int = QUESTIONS_PER_CHUNK) -> List[List[str]]:
+    """Asks the LLM for up to `count` questions per chunk, in one call. Returns them in chunk order."""
+    passages = "\n\n".join(f"[{number}] {doc.page_content}" for number, doc in enumerate(docs, 1))
+    prompt = SYNTHETIC_QUESTIONS_PROMPT.format(count=count, passages=passages)
+    result = call_upstream("llm:questions", get_question_llm().invoke, [{"role": "user", "content": prompt}])
+
+    questions = [[] for _ in docs]
+    for item in result.passages:
+        if 1 <= item.passage <= len(docs):
+            questions[item.passage - 1] = [q.strip() for q in item.questions if q.strip()][:count]
+    return questions
+
+
+def question_documents(docs: List[Document], questions: List[List[str]]) -> List[Document]:
+    """Builds the question points for the chunks, each pointing back to its chunk's ID."""
+    points = []
+    for doc, chunk_questions in zip(docs, questions):
+        metadata = {key: doc.metadata[key] for key in QUESTION_METADATA_KEYS if key in doc.metadata}
+        metadata.update({"kind": QUESTION_KIND, "chunk_id": document_id(doc)})
+        points.extend(Document(page_content=question, metadata=dict(metadata)) for question in chunk_questions)
+    return points
+
+
+def index_questions(collection_name: str, docs: List[Document], batch_size: int = QUESTION_BATCH_SIZE) -> List[str]:
+    """
+    Generates, embeds and upserts the questions for freshly ingested chunks.
+    Returns the IDs of the question points.
+    """
+    ids = []
+    for start in range(0, len(docs), batch_size):
+        batch = docs[start:start + batch_size]
+        points = question_documents(batch, generate_questions(batch))
+        if points:
+            upsert_documents(collection_name, points)
+            ids.extend(document_id(point) for point in points)
+    return ids
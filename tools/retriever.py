@@ -1,37 +1,125 @@
-from typing import List
+import os
+import time
+from typing import Iterable, Iterator, List, Optional
+from langchain_core.documents import Document
 from loaders.pdf_loader import load_pdf, chunk_documents
-from integrations.qdrant_client import create_collection, upsert_documents, get_retriever
+from loaders.dedup import NearDuplicateFilter
+from tools.compression import compression_enabled, precompute_sentence_embeddings
+from tools.question_index import index_questions, question_index_enabled
+from integrations.rate_limiter import INGESTION, priority_scope
+from integrations.qdrant_client import (
+    COLLECTION_NAME, create_collection, upsert_documents, search_collections, document_id, add_duplicate_provenance
+)
 
-COLLECTION_NAME = "rag_weather_cohere2"
+# Number of chunks embedded and upserted per request during ingestion.
+# Peak ingestion memory is bounded by this, not by the corpus size.
+INGEST_BATCH_SIZE = 64
 
-def retrieve_documents(query: str) -> str:
+def retrieve_documents(query: str, filters: Optional[dict] = None) -> str:
     """
     Retrieves relevant documents for a given query using Qdrant.
+    filters optionally scopes the search by chunk metadata, e.g. {"file_name": "report.pdf"}.
     """
-    # Use a score threshold to filter out irrelevant documents
-    retriever = get_retriever(COLLECTION_NAME, score_threshold=0.5, k=3)
-    docs = retriever.invoke(query)
+    # Use a score threshold to filter out irrelevant documents. search_collections
+    # sends the embedding and search through call_upstream (deadlines, rate limits).
+    hits = search_collections(query, [COLLECTION_NAME], k=3, score_threshold=0.5, filters=filters)
     
     # Concatenate document content
-    return "\n\n".join([doc.page_content for doc in docs])
+    return "\n\n".join([doc.page_content for doc, _ in hits])
 
-def index_pdf_documents(paths: List[str]):
+def iter_pdf_chunks(paths: Iterable[str]) -> Iterator[Document]:
     """
-    Indexes PDF documents from the given paths.
+    Yields chunks page by page from the given PDF paths.
     """
-    all_docs = []
     for path in paths:
         print(f"Loading {path}...")
-        raw_docs = load_pdf(path)
-        chunks = chunk_documents(raw_docs)
-        all_docs.extend(chunks)
-    
-    if not all_docs:
+        file_name = os.path.basename(path)
+        for page in load_pdf(path):
+            for chunk in chunk_documents([page]):
+                chunk.metadata["file_name"] = file_name
+                yield chunk
+
+def batched(items: Iterable, batch_size: int) -> Iterator[list]:
+    """
+    Groups an iterable into lists of at most batch_size items.
+    """
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def index_pdf_documents(
+    paths: List[str],
+    batch_size: int = INGEST_BATCH_SIZE,
+    dedupe: bool = True,
+    collection_name: str = COLLECTION_NAME,
+    max_chunks_per_second: Optional[float] = None,
+    cache_sentences: Optional[bool] = None,
+    questions: Optional[bool] = None,
+) -> List[str]:
+    """
+    Indexes PDF documents from the given paths.
+    Pages are read lazily, chunked as they arrive and flushed to Qdrant in
+    batches of batch_size chunks.
+    With dedupe, near-duplicate chunks (boilerplate, repeated pages) are
+    dropped and their source/page is stored on the kept chunk instead.
+    max_chunks_per_second throttles embedding, e.g. for background rebuilds.
+    Embedding runs in the rate limiter's ingestion class, behind queries.
+    cache_sentences precomputes sentence embeddings for context compression
+    (default: on when RAG_COMPRESSION is set).
+    questions adds synthetic question points for every chunk (default: on
+    when RAG_QUESTION_INDEX is set).
+    Returns the IDs of the indexed points, question points included.
+    """
+    if cache_sentences is None:
+        cache_sentences = compression_enabled()
+    if questions is None:
+        questions = question_index_enabled()
+    chunks = iter_pdf_chunks(paths)
+    dup_filter = None
+    if dedupe:
+        dup_filter = NearDuplicateFilter(key=document_id)
+        chunks = dup_filter.filter(chunks)
+
+    total = 0
+    indexed_ids = []
+    with priority_scope(INGESTION):
+        for batch in batched(chunks, batch_size):
+            started = time.monotonic()
+            if total == 0:
+                print(f"Indexing into Qdrant collection '{collection_name}'...")
+                # Cohere embed-english-v3.0 has 1024 dimensions
+                create_collection(collection_name, vector_size=1024)
+            upsert_documents(collection_name, batch)
+            indexed_ids.extend(document_id(doc) for doc in batch)
+            if cache_sentences:
+                try:
+                    precompute_sentence_embeddings(batch)
+                except Exception as e:
+                    # Compression embeds missing sentences at query time instead
+                    print(f"Warning: could not cache sentence embeddings: {e}")
+            if questions:
+                try:
+                    indexed_ids.extend(index_questions(collection_name, batch))
+                except Exception as e:
+                    # The chunks stay searchable by their own text
+                    print(f"Warning: could not index synthetic questions: {e}")
+            total += len(batch)
+            print(f"  {total} chunks indexed")
+            if max_chunks_per_second:
+                time.sleep(max(0.0, len(batch) / max_chunks_per_second - (time.monotonic() - started)))
+
+    if total == 0:
         print("No documents to index.")
-        return
+        return indexed_ids
+
+    if dup_filter is not None and dup_filter.provenance:
+        add_duplicate_provenance(collection_name, dup_filter.provenance)
+        print(f"Skipped {dup_filter.dropped} near-duplicate chunks.")
 
-    print(f"Indexing {len(all_docs)} chunks into Qdrant collection '{COLLECTION_NAME}'...")
-    # Cohere embed-english-v3.0 has 1024 dimensions
-    create_collection(COLLECTION_NAME, vector_size=1024)
-    upsert_documents(COLLECTION_NAME, all_docs)
-    print("Indexing complete.")
+    print(f"Indexing complete ({total} chunks).")
+    return indexed_ids
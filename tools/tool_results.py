@@ -0,0 +1,104 @@
+"""
+Compact, typed tool results for the agent.
+
+Tool results become ToolMessage content, and the chatbot LLM re-reads the
+whole history on every call. Retrieval results are therefore JSON with one
+entry per chunk: its ID, relevance score, source/page citation and trimmed
+text. Weather results are a handful of fields (see tools/weather.py).
+
+Chunk text is only kept for the current turn. When a new user message
+arrives, compact_history() strips the text from earlier retrieval results
+and keeps the references; retriever_tool can read those chunks again by ID.
+"""
+
+import json
+import os
+from typing import List, Optional
+from langchain_core.documents import Document
+from langchain_core.messages import BaseMessage, HumanMessage, ToolMessage
+from integrations.qdrant_client import document_id
+
+# Characters of chunk text kept per retrieval result
+TOOL_TEXT_CHARS = int(os.getenv("RAG_TOOL_TEXT_CHARS", "1200"))
+
+
+def trim_text(text: str, limit: int = TOOL_TEXT_CHARS) -> str:
+    """Collapses whitespace and cuts text at a word boundary after at most `limit` characters."""
+    text = " ".join(text.split())
+    if len(text) <= limit:
+        return text
+    cut = text.rfind(" ", 0, limit)
+    return text[:cut if cut > 0 else limit] + "…"
+
+
+def chunk_reference(doc: Document) -> dict:
+    """ID, relevance score and citation of a retrieved chunk (pages are 1-based, as in retriever_tool)."""
+    metadata = doc.metadata
+    reference = {"id": metadata.get("_id") or document_id(doc)}
+    if metadata.get("relevance_score") is not None:
+        reference["score"] = round(metadata["relevance_score"], 3)
+    source = metadata.get("file_name") or os.path.basename(metadata.get("source") or "")
+    if source:
+        reference["source"] = source
+    if metadata.get("page") is not None:
+        reference["page"] = metadata["page"] + 1
+    return reference
+
+
+def retrieval_result(query: str, documents: List[Document], message: Optional[str] = None,
+                     partial: bool = False) -> dict:
+    """
+    The retriever_tool result: {"query", "results": [{"id", "score", "source",
+    "page", "text"}], ...}. `message` explains an empty result; `partial`
+    marks the best context found before the deadline, which was not graded.
+    """
+    result = {
+        "query": query,
+        "results": [{**chunk_reference(doc), "text": trim_text(doc.page_content)} for doc in documents],
+    }
+    if message:
+        result["message"] = message
+    if partial:
+        result["partial"] = True
+    return result
+
+
+def tool_content(result) -> str:
+    """ToolMessage content for a tool result: compact JSON for dicts, the text otherwise."""
+    if isinstance(result, dict):
+        return json.dumps(result, ensure_ascii=False, separators=(",", ":"))
+    return str(result)
+
+
+def compact_content(content) -> Optional[str]:
+    """A retrieval result's content without chunk text, or None if there is nothing to drop."""
+    if not isinstance(content, str) or not content.startswith("{"):
+        return None
+    try:
+        result = json.loads(content)
+    except ValueError:
+        return None
+    results = result.get("results") if isinstance(result, dict) else None
+    if not isinstance(results, list) or not any("text" in item for item in results if isinstance(item, dict)):
+        return None
+    result["results"] = [
+        {key: value for key, value in item.items() if key != "text"} if isinstance(item, dict) else item
+        for item in results
+    ]
+    return tool_content(result)
+
+
+def compact_history(messages: List[BaseMessage]) -> List[ToolMessage]:
+    """
+    Compact copies of the retrieval results from before the latest user
+    message. They keep their message IDs, so returning them from a node
+    replaces the originals in the state (see add_messages).
+    """
+    last_human = max((i for i, m in enumerate(messages) if isinstance(m, HumanMessage)), default=0)
+    compacted = []
+    for message in messages[:last_human]:
+        if isinstance(message, ToolMessage) and message.id:
+            content = compact_content(message.content)
+            if content is not None:
+                compacted.append(message.model_copy(update={"content": content}))
+    return compacted
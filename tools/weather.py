@@ -1,27 +1,78 @@
 import os
 import requests
 from typing import Dict, Any
+from integrations.upstream import upstream_timeout
 
-def get_weather(city: str) -> str:
+# Seconds to wait for OpenWeatherMap (less if the request deadline is closer)
+WEATHER_TIMEOUT = 10.0
+
+BASE_URL = "http://api.openweathermap.org/data/2.5/weather"
+MISSING_API_KEY = "OPENWEATHER_API_KEY not found in environment variables."
+
+def _request_weather(city: str, api_key: str) -> Dict[str, Any]:
+    """Calls the OpenWeatherMap API; raises requests.exceptions.RequestException on failure."""
+    params = {
+        "q": city,
+        "appid": api_key,
+        "units": "metric"
+    }
+    response = requests.get(BASE_URL, params=params, timeout=upstream_timeout(WEATHER_TIMEOUT))
+    response.raise_for_status()
+    return response.json()
+
+def fetch_weather(city: str) -> Dict[str, Any]:
     """
     Fetches the current weather for a given city using the OpenWeatherMap API.
+    Returns the fields the agent needs (see weather_report), or {"error": ...}.
     """
     api_key = os.environ.get("OPENWEATHER_API_KEY")
     if not api_key:
-        return "Error: OPENWEATHER_API_KEY not found in environment variables."
+        return {"error": MISSING_API_KEY}
 
-    base_url = "http://api.openweathermap.org/data/2.5/weather"
-    params = {
-        "q": city,
-        "appid": api_key,
-        "units": "metric"
+    try:
+        return weather_report(_request_weather(city, api_key))
+    except requests.exceptions.RequestException as e:
+        return {"error": f"Could not fetch weather data: {e}"}
+
+def _report_fields(data: Dict[str, Any]) -> Dict[str, Any]:
+    # Raises KeyError or IndexError on an unexpected response
+    return {
+        "city": data.get("name", "Unknown City"),
+        "description": data["weather"][0]["description"],
+        "temp_c": data["main"]["temp"],
+        "humidity_pct": data["main"]["humidity"],
+        "wind_mps": data["wind"]["speed"],
     }
 
+def weather_report(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Extracts city, conditions, temperature (°C), humidity (%) and wind speed
+    (m/s) from an OpenWeatherMap API response.
+    """
+    try:
+        return _report_fields(data)
+    except (KeyError, IndexError) as e:
+        return {"error": f"Could not parse weather data: {e}"}
+
+def format_weather(report: Dict[str, Any]) -> str:
+    """Formats a successful weather_report() result as a human-readable string."""
+    return (
+        f"Weather in {report['city']}: {report['description']}. "
+        f"Temperature: {report['temp_c']}°C. "
+        f"Humidity: {report['humidity_pct']}%. "
+        f"Wind Speed: {report['wind_mps']} m/s."
+    )
+
+def get_weather(city: str) -> str:
+    """
+    Fetches the current weather for a given city using the OpenWeatherMap API.
+    """
+    api_key = os.environ.get("OPENWEATHER_API_KEY")
+    if not api_key:
+        return f"Error: {MISSING_API_KEY}"
+
     try:
-        response = requests.get(base_url, params=params)
-        response.raise_for_status()
-        data = response.json()
-        return parse_weather_response(data)
+        return parse_weather_response(_request_weather(city, api_key))
     except requests.exceptions.RequestException as e:
         return f"Error fetching weather data: {e}"
 
@@ -30,17 +81,6 @@ def parse_weather_response(data: Dict[str, Any]) -> str:
     Parses the OpenWeatherMap API response into a human-readable string.
     """
     try:
-        city_name = data.get("name", "Unknown City")
-        weather_desc = data["weather"][0]["description"]
-        temp = data["main"]["temp"]
-        humidity = data["main"]["humidity"]
-        wind_speed = data["wind"]["speed"]
-
-        return (
-            f"Weather in {city_name}: {weather_desc}. "
-            f"Temperature: {temp}°C. "
-            f"Humidity: {humidity}%. "
-            f"Wind Speed: {wind_speed} m/s."
-        )
+        return format_weather(_report_fields(data))
     except (KeyError, IndexError) as e:
         return f"Error parsing weather data: {e}"
@@ -0,0 +1,316 @@
+"""
+Background ingestion worker.
+
+Watches a directory for new, changed and removed PDFs and accepts jobs
+submitted through a local spool directory (see submit_job). Jobs run one at a
+time in priority order with embedding throttled, so ingestion does not compete
+with serving processes for CPU or API quota. Job status is written to a JSON
+file that `scripts/ingest_worker.py status` reads.
+
+State lives in INGEST_STATE_DIR:
+    manifest.json   fingerprint of every indexed file
+    status.json     worker info and recent jobs
+    spool/          submitted jobs waiting to be picked up
+"""
+
+import hashlib
+import heapq
+import itertools
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional
+from integrations.qdrant_client import COLLECTION_NAME, delete_documents
+from tools.retriever import index_pdf_documents
+
+INGEST_STATE_DIR = os.getenv("INGEST_STATE_DIR", ".ingest")
+
+# Job priorities; lower runs first
+PRIORITY_SUBMITTED = 0
+PRIORITY_WATCHED = 10
+
+# Seconds between directory scans. A new or changed file is picked up once its
+# size and mtime are the same on two consecutive scans (i.e. fully written).
+POLL_INTERVAL = float(os.getenv("INGEST_POLL_INTERVAL", "2"))
+# Small batches make the first chunks of a new file searchable quickly
+WORKER_BATCH_SIZE = 16
+# Seconds before a file whose job failed is retried
+RETRY_DELAY = 60.0
+# Finished jobs kept in status.json
+MAX_JOB_HISTORY = 200
+
+
+@dataclass
+class IngestJob:
+    path: str
+    action: str = "index"               # "index" or "delete"
+    priority: int = PRIORITY_WATCHED
+    id: str = field(default_factory=lambda: uuid.uuid4().hex[:12])
+    status: str = "queued"              # queued | running | done | failed
+    submitted_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    chunks: int = 0
+    error: Optional[str] = None
+
+
+def _write_json(path: str, data):
+    """Writes JSON atomically, so readers never see a partial file."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path: str, default):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def file_fingerprint(path: str) -> dict:
+    stat = os.stat(path)
+    return {"mtime": stat.st_mtime, "size": stat.st_size}
+
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def submit_job(path: str, priority: int = PRIORITY_SUBMITTED, action: str = "index",
+               state_dir: str = INGEST_STATE_DIR) -> str:
+    """
+    Queues a job for a running worker (or the next one to start).
+    Returns the job ID to look up in the status file.
+    """
+    if action not in ("index", "delete"):
+        raise ValueError(f"Unknown ingestion action '{action}'")
+    spool_dir = os.path.join(state_dir, "spool")
+    os.makedirs(spool_dir, exist_ok=True)
+    job = IngestJob(path=os.path.normpath(path), action=action, priority=priority)
+    _write_json(os.path.join(spool_dir, f"{time.time():.6f}-{job.id}.json"), asdict(job))
+    return job.id
+
+
+def read_status(state_dir: str = INGEST_STATE_DIR) -> dict:
+    """Returns the worker's last written status ({"worker": ..., "jobs": [...]})."""
+    return _read_json(os.path.join(state_dir, "status.json"), {"worker": None, "jobs": []})
+
+
+def lower_process_priority(niceness: int):
+    """Yields CPU to serving processes on the same host."""
+    if niceness and hasattr(os, "nice"):
+        try:
+            os.nice(niceness)
+        except OSError as e:
+            print(f"Warning: could not lower process priority: {e}")
+
+
+class IngestWorker:
+    """
+    Incrementally indexes the PDFs in watch_dir into collection_name.
+
+    Changed files are re-indexed by upserting their new chunks and then deleting
+    the stale ones, so they stay searchable throughout. Files whose content is
+    unchanged (e.g. only touched) are not re-embedded.
+    """
+
+    def __init__(
+        self,
+        watch_dir: str = "data",
+        state_dir: str = INGEST_STATE_DIR,
+        collection_name: str = COLLECTION_NAME,
+        max_chunks_per_second: Optional[float] = None,
+        poll_interval: float = POLL_INTERVAL,
+        batch_size: int = WORKER_BATCH_SIZE,
+    ):
+        self.watch_dir = os.path.normpath(watch_dir)
+        self.state_dir = state_dir
+        self.spool_dir = os.path.join(state_dir, "spool")
+        self.manifest_path = os.path.join(state_dir, "manifest.json")
+        self.status_path = os.path.join(state_dir, "status.json")
+        self.collection_name = collection_name
+        self.max_chunks_per_second = max_chunks_per_second
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+
+        os.makedirs(self.spool_dir, exist_ok=True)
+        self.manifest: Dict[str, dict] = _read_json(self.manifest_path, {})
+        self.jobs: "OrderedDict[str, IngestJob]" = OrderedDict()
+        self._queue: List[tuple] = []
+        self._sequence = itertools.count()
+        self._queued: Dict[tuple, IngestJob] = {}
+        # Fingerprints of new/changed files seen on the last scan, awaiting a stable second look
+        self._settling: Dict[str, dict] = {}
+        self._retry_after: Dict[str, float] = {}
+
+    # --- Queue ---
+
+    def enqueue(self, job: IngestJob) -> IngestJob:
+        """
+        Adds a job. A job for a path that is already queued with the same action
+        is merged into the queued one, which takes the higher priority.
+        """
+        key = (job.path, job.action)
+        queued = self._queued.get(key)
+        if queued is not None:
+            if job.priority < queued.priority:
+                queued.priority = job.priority
+                heapq.heappush(self._queue, (queued.priority, next(self._sequence), queued))
+            return queued
+        self._queued[key] = job
+        self.jobs[job.id] = job
+        heapq.heappush(self._queue, (job.priority, next(self._sequence), job))
+        return job
+
+    def _next_job(self) -> Optional[IngestJob]:
+        while self._queue:
+            priority, _, job = heapq.heappop(self._queue)
+            # Skip heap entries left behind by a priority bump
+            if job.status == "queued" and priority == job.priority:
+                del self._queued[(job.path, job.action)]
+                return job
+        return None
+
+    # --- Discovery ---
+
+    def scan_spool(self):
+        """Picks up jobs submitted with submit_job."""
+        for name in sorted(os.listdir(self.spool_dir)):
+            if not name.endswith(".json"):
+                continue
+            spool_path = os.path.join(self.spool_dir, name)
+            data = _read_json(spool_path, None)
+            os.remove(spool_path)
+            if not data or "path" not in data:
+                print(f"Warning: ignoring malformed job file '{name}'")
+                continue
+            fields = {k: data[k] for k in ("path", "action", "priority", "id", "submitted_at") if k in data}
+            self.enqueue(IngestJob(**fields))
+
+    def scan_directory(self):
+        """Queues new, changed and removed PDFs in watch_dir."""
+        if not os.path.isdir(self.watch_dir):
+            return
+        now = time.time()
+        current = set()
+        for name in os.listdir(self.watch_dir):
+            if not name.lower().endswith(".pdf"):
+                continue
+            path = os.path.join(self.watch_dir, name)
+            current.add(path)
+            try:
+                fingerprint = file_fingerprint(path)
+            except OSError:
+                continue
+            known = self.manifest.get(path)
+            if known and known["mtime"] == fingerprint["mtime"] and known["size"] == fingerprint["size"]:
+                self._settling.pop(path, None)
+                continue
+            if self._retry_after.get(path, 0) > now:
+                continue
+            # Wait until the file stops changing, so half-copied files are not indexed
+            if self._settling.get(path) != fingerprint:
+                self._settling[path] = fingerprint
+                continue
+            del self._settling[path]
+            self.enqueue(IngestJob(path=path, action="index", priority=PRIORITY_WATCHED))
+
+        for path in list(self.manifest):
+            if os.path.dirname(path) == self.watch_dir and path not in current:
+                if self._retry_after.get(path, 0) > now:
+                    continue
+                self.enqueue(IngestJob(path=path, action="delete", priority=PRIORITY_WATCHED))
+
+    # --- Processing ---
+
+    def process(self, job: IngestJob):
+        job.status = "running"
+        job.started_at = time.time()
+        self.save_status()
+        print(f"[{job.id}] {job.action} {job.path}")
+        try:
+            if job.action == "delete":
+                delete_documents(self.collection_name, job.path)
+                self.manifest.pop(job.path, None)
+            else:
+                self._index(job)
+            job.status = "done"
+            self._retry_after.pop(job.path, None)
+        except Exception as e:
+            job.status = "failed"
+            job.error = f"{type(e).__name__}: {e}"
+            self._retry_after[job.path] = time.time() + RETRY_DELAY
+            print(f"[{job.id}] failed: {job.error}")
+        job.finished_at = time.time()
+        _write_json(self.manifest_path, self.manifest)
+        self.save_status()
+
+    def _index(self, job: IngestJob):
+        fingerprint = file_fingerprint(job.path)
+        digest = file_digest(job.path)
+        known = self.manifest.get(job.path)
+        if not (known and known.get("sha1") == digest):
+            ids = index_pdf_documents(
+                [job.path],
+                batch_size=self.batch_size,
+                collection_name=self.collection_name,
+                max_chunks_per_second=self.max_chunks_per_second,
+            )
+            if known:
+                delete_documents(self.collection_name, job.path, keep_ids=ids)
+            job.chunks = len(ids)
+        self.manifest[job.path] = {**fingerprint, "sha1": digest}
+
+    def run_once(self) -> int:
+        """
+        Scans for work and runs every queued job. The spool is rechecked between
+        jobs so submitted jobs overtake queued watched files.
+        Returns the number of jobs run.
+        """
+        self.scan_spool()
+        self.scan_directory()
+        count = 0
+        job = self._next_job()
+        while job is not None:
+            self.process(job)
+            count += 1
+            self.scan_spool()
+            job = self._next_job()
+        return count
+
+    def run(self, niceness: int = 10):
+        lower_process_priority(niceness)
+        print(f"Watching '{self.watch_dir}' (state in '{self.state_dir}'), indexing into '{self.collection_name}'...")
+        while True:
+            if self.run_once() == 0:
+                self.save_status()
+            time.sleep(self.poll_interval)
+
+    # --- Status ---
+
+    def save_status(self):
+        while len(self.jobs) > MAX_JOB_HISTORY:
+            oldest_id = next(iter(self.jobs))
+            if self.jobs[oldest_id].status in ("queued", "running"):
+                break
+            del self.jobs[oldest_id]
+        _write_json(self.status_path, {
+            "worker": {
+                "pid": os.getpid(),
+                "watch_dir": self.watch_dir,
+                "collection": self.collection_name,
+                "queued": len(self._queued),
+                "updated_at": time.time(),
+            },
+            "jobs": [asdict(job) for job in self.jobs.values()],
+        })